@@ -0,0 +1,156 @@
+# aioserver.py
+import asyncio
+import json
+
+from serverTCP import GameServer, HOST, PORT
+from settings import FPS
+from outqueue import OutboundQueue, MAX_QUEUED_MESSAGES
+from framing import MAX_HELLO_SIZE
+
+
+class AsyncConnection:
+    """Соединение asyncio с очередью OutboundQueue и задачей-писателем.
+
+    send() не блокирует: данные ложатся в очередь (устаревшие снимки
+    вытесняются свежими), а задача writer_loop пишет их в сокет и ждёт
+    drain() — так медленный клиент копит очередь у себя, не тормозя тик.
+    """
+
+    def __init__(self, writer, max_messages=MAX_QUEUED_MESSAGES):
+        self.writer = writer
+        self.queue = OutboundQueue(max_messages)
+        self.ready = asyncio.Event()
+        self.closed = False
+        self.task = asyncio.create_task(self.writer_loop())
+
+    @property
+    def stats(self):
+        return self.queue.stats
+
+    def send(self, data, droppable=False):
+        if self.closed or self.writer.is_closing():
+            raise ConnectionError("connection is closed")
+        self.queue.put(data, droppable)
+        self.ready.set()
+
+    async def writer_loop(self):
+        try:
+            while not self.closed:
+                await self.ready.wait()
+                self.ready.clear()
+                batch = self.queue.pop_batch()
+                if batch is None:
+                    continue
+                self.writer.write(batch)
+                await self.writer.drain()
+                self.queue.written(len(batch))
+        except (ConnectionError, OSError) as e:
+            print(f"[SERVER] Connection writer failed: {e}")
+            self.closed = True
+
+    def close(self):
+        self.closed = True
+        self.ready.set()
+        self.writer.close()
+
+
+class UdpProtocol(asyncio.DatagramProtocol):
+    """Датаграммы UDP-канала -> UdpEndpoint сервера."""
+
+    def __init__(self, endpoint):
+        self.endpoint = endpoint
+
+    def datagram_received(self, data, addr):
+        self.endpoint.handle_datagram(data, addr)
+
+
+class AsyncGameServer(GameServer):
+    """GameServer на asyncio: одно событийное ядро вместо потока на соединение.
+
+    Правила hello, обработка сообщений (process_message) и рассылка —
+    те же, что у GameServer; меняется только транспорт. Тик симуляции
+    крутится отдельной задачей asyncio на том же FixedStepScheduler.
+    """
+
+    async def serve(self):
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                            limit=MAX_HELLO_SIZE)
+        print(f"[SERVER] Async server started on {self.host}:{self.port}")
+        if self.udp is not None:
+            loop = asyncio.get_running_loop()
+            transport, _ = await loop.create_datagram_endpoint(lambda: UdpProtocol(self.udp),
+                                                               local_addr=(self.host, self.port))
+            if self.udp.netsim is not None:
+                # NetSim доставляет из своего потока, а транспорт asyncio — только из цикла событий
+                self.udp.attach(lambda data, addr: loop.call_soon_threadsafe(transport.sendto, data, addr))
+            else:
+                self.udp.attach(transport.sendto)
+        tick_task = asyncio.create_task(self.tick_loop())
+        try:
+            async with server:
+                await tick_task
+        finally:
+            self.running = False
+            tick_task.cancel()
+
+    async def tick_loop(self):
+        """Игровой цикл как задача asyncio."""
+        while self.running:
+            wait = self.scheduler.run_frame(self.tick, self.broadcast_state)
+            await asyncio.sleep(wait)
+        print(f"[SERVER] tick_loop finished. Tick stats: {self.scheduler.stats}, rooms: {self.rooms.stats}")
+
+    async def handle_connection(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        conn = AsyncConnection(writer)
+        print(f"[SERVER] New raw connection from {addr}")
+        try:
+            # hello всегда приходит JSON-строкой
+            line = await reader.readline()
+            line = line.strip()
+            if not line:
+                print("[SERVER] No JSON on first line, closing.")
+                conn.close()
+                return
+            try:
+                msg = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"[SERVER] Invalid JSON on hello: {e}")
+                conn.close()
+                return
+        except (asyncio.LimitOverrunError, ValueError, ConnectionError) as e:
+            print(f"[SERVER] Bad hello from {addr}: {e}")
+            conn.close()
+            return
+
+        claimed = self.claim_slot(msg, conn, addr)
+        if claimed is None:
+            conn.close()
+            return
+        room, slot_id, codec = claimed
+
+        decoder = codec.decoder()
+        try:
+            while self.running:
+                data = await reader.read(4096)
+                if not data:
+                    print(f"[SERVER] Room {room.room_id}: slot {slot_id} disconnected (no data).")
+                    break
+                if not room.owns(slot_id, conn):
+                    break
+                for msg in decoder.feed(data):
+                    room.process_message(msg, slot_id)
+        except ConnectionError as e:
+            print(f"[SERVER] Room {room.room_id}: slot {slot_id} - {e!r}")
+        except Exception as e:
+            print(f"[SERVER] Room {room.room_id}: slot {slot_id} exception: {e}")
+        finally:
+            self.release_slot(room, slot_id, conn)
+
+    def start(self):
+        asyncio.run(self.serve())
+
+
+if __name__ == "__main__":
+    server = AsyncGameServer(HOST, PORT, sim_rate=FPS, broadcast_rate=FPS)
+    server.start()
@@ -0,0 +1,141 @@
+# assets.py
+# Картинки меню (menu.py, predgame.py): ленивая загрузка и кеш масштабированных вариантов.
+#
+# PNG декодируется только при первом обращении и сразу переводится в формат экрана
+# (convert/convert_alpha) — иначе каждый blit пересчитывает пиксели. Вариант под размер
+# окна масштабируется один раз и хранится в памяти: пока приложение работает, переходы
+# между сценами (scenes.py) берут готовые Surface. Кроме того, вариант пишется на диск
+# (CACHE_DIR): имя файла — хеш исходного PNG и размер, так что при следующем запуске фон
+# не декодируется и не масштабируется заново, а читается готовыми пикселями.
+# Изменился PNG — изменился хеш, старый файл просто не используется.
+import hashlib
+import io
+import os
+
+import pygame
+
+ASSET_DIR = os.path.dirname(os.path.abspath(__file__))  # PNG лежат рядом с кодом
+CACHE_DIR = os.path.join(ASSET_DIR, '.asset_cache')
+
+
+class AssetCache:
+    """Исходные и масштабированные картинки по имени файла.
+
+    Масштабированные варианты на диске — сырые пиксели (RGB или RGBA, без сжатия):
+    прочитать их быстрее, чем декодировать PNG. Если каталог кеша недоступен,
+    всё работает, только без диска.
+
+    Счётчики в stats: loads (декодировано PNG), scales, hits (из памяти),
+    disk_hits, disk_writes, disk_errors.
+    """
+
+    def __init__(self, base_dir=ASSET_DIR, cache_dir=CACHE_DIR):
+        self.base_dir = base_dir
+        self.cache_dir = cache_dir
+        self.sources = {}  # name -> байты PNG, пока картинка не декодирована (или нашлась на диске)
+        self.hashes = {}  # name -> sha1 байтов PNG
+        self.images = {}  # name -> Surface в формате экрана
+        self.scaled_images = {}  # (name, (w, h)) -> Surface
+        self.stats = {
+            'loads': 0,
+            'scales': 0,
+            'hits': 0,
+            'disk_hits': 0,
+            'disk_writes': 0,
+            'disk_errors': 0,
+        }
+
+    def source(self, name):
+        """Байты PNG (читаются с диска один раз, до декодирования)."""
+        data = self.sources.get(name)
+        if data is None:
+            with open(os.path.join(self.base_dir, name), 'rb') as f:
+                data = self.sources[name] = f.read()
+            self.hashes[name] = hashlib.sha1(data).hexdigest()[:16]
+        return data
+
+    def image(self, name):
+        """Картинка в исходном размере."""
+        surface = self.images.get(name)
+        if surface is None:
+            surface = pygame.image.load(io.BytesIO(self.source(name)), name)
+            self.sources.pop(name)  # Хеш уже посчитан, байты PNG больше не нужны
+            self.stats['loads'] += 1
+            surface = self.images[name] = self.convert(surface)
+        return surface
+
+    def scaled(self, name, size):
+        """Картинка, растянутая до size = (w, h)."""
+        size = (int(size[0]), int(size[1]))
+        key = (name, size)
+        surface = self.scaled_images.get(key)
+        if surface is not None:
+            self.stats['hits'] += 1
+            return surface
+        surface = self.load_scaled(name, size)
+        if surface is None:
+            surface = pygame.transform.scale(self.image(name), size)
+            self.stats['scales'] += 1
+            self.save_scaled(name, size, surface)
+        else:
+            # Вариант с диска: байты PNG читались только ради хеша — декодировать их не нужно
+            self.sources.pop(name, None)
+        self.scaled_images[key] = surface
+        return surface
+
+    def cache_path(self, name, size, mode):
+        if name not in self.hashes:
+            self.source(name)
+        stem = os.path.splitext(name)[0]
+        return os.path.join(self.cache_dir, f"{stem}-{self.hashes[name]}-{size[0]}x{size[1]}.{mode.lower()}")
+
+    def load_scaled(self, name, size):
+        """Масштабированный вариант с диска или None."""
+        for mode in ('RGBA', 'RGB'):
+            path = self.cache_path(name, size, mode)
+            try:
+                with open(path, 'rb') as f:
+                    data = f.read()
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                print(f"[ASSETS] Cannot read {path}: {e}")
+                self.stats['disk_errors'] += 1
+                return None
+            if len(data) != size[0] * size[1] * len(mode):
+                self.stats['disk_errors'] += 1  # Недописанный или чужой файл — масштабируем заново
+                return None
+            self.stats['disk_hits'] += 1
+            return self.convert(pygame.image.frombytes(data, size, mode))
+        return None
+
+    def save_scaled(self, name, size, surface):
+        mode = 'RGBA' if surface.get_flags() & pygame.SRCALPHA else 'RGB'
+        path = self.cache_path(name, size, mode)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            with open(tmp, 'wb') as f:
+                f.write(pygame.image.tobytes(surface, mode))
+            os.replace(tmp, path)  # Другой процесс не увидит файл наполовину записанным
+            self.stats['disk_writes'] += 1
+        except OSError as e:
+            print(f"[ASSETS] Cannot write {path}: {e}")
+            self.stats['disk_errors'] += 1
+
+    @staticmethod
+    def convert(surface):
+        """В формат экрана (если окно уже создано)."""
+        if pygame.display.get_surface() is None:
+            return surface
+        if surface.get_flags() & pygame.SRCALPHA:
+            return surface.convert_alpha()
+        return surface.convert()
+
+    def clear(self):
+        """Забывает всё, что в памяти (диск не трогает) — например, после pygame.quit()."""
+        self.images.clear()
+        self.scaled_images.clear()
+
+
+assets = AssetCache()  # Общий для menu.py и predgame.py
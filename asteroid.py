@@ -1,8 +1,21 @@
 # asteroid.py
 import random
 import math
-import pygame
-from utils import WIDTH, HEIGHT, GREY
+from settings import WIDTH, HEIGHT, GREY
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для ArrayAsteroidManager
+    np = None
+
+
+def random_asteroid_params():
+    """Случайные параметры нового астероида: (x, y, vx, vy, radius)."""
+    size = random.randint(20, 45)
+    speed = max(1, 3 - size // 7)
+    x, y = random.randint(0, WIDTH), random.randint(0, HEIGHT)
+    vx, vy = random.choice([-speed, speed]), random.choice([-speed, speed])
+    return x, y, vx, vy, size
 
 
 class AsteroidManager:
@@ -11,19 +24,25 @@ class AsteroidManager:
     def __init__(self, max_asteroids=10):
         self.max_asteroids = max_asteroids
         self.asteroids = []
+        self.next_id = 0  # Стабильные id астероидов (для дельт снимков)
+
+    def __len__(self):
+        return len(self.asteroids)
 
     def spawn_asteroid(self):
         """Создаёт и возвращает новый астероид."""
-        size = random.randint(20, 45)
-        speed = max(1, 3 - size // 7)
+        x, y, vx, vy, size = random_asteroid_params()
         new_ast = {
-            'pos': [random.randint(0, WIDTH), random.randint(0, HEIGHT)],
-            'vel': [random.choice([-speed, speed]), random.choice([-speed, speed])],
+            'id': self.next_id,
+            'pos': [x, y],
+            'vel': [vx, vy],
             'radius': size,
             'hp': 1,
             'color': GREY
         }
+        self.next_id += 1
         self.asteroids.append(new_ast)
+        return new_ast
 
     def update(self):
         """Обновляет позиции астероидов и удаляет уничтоженные."""
@@ -35,20 +54,175 @@ class AsteroidManager:
 
         # Можно добавить любую дополнительную логику (разделение при попадании и т.д.)
 
+    def get_bulk(self):
+        """Списки (pos, radius, hp) живых астероидов — для кода столкновений."""
+        return ([ast['pos'] for ast in self.asteroids],
+                [ast['radius'] for ast in self.asteroids],
+                [ast['hp'] for ast in self.asteroids])
+
+    def query_circle(self, x, y, radius):
+        """Индексы астероидов, пересекающихся с кругом (x, y, radius)."""
+        return [i for i, ast in enumerate(self.asteroids)
+                if math.hypot(x - ast['pos'][0], y - ast['pos'][1]) < radius + ast['radius']]
+
+    def damage(self, index, amount=1):
+        """Наносит урон астероиду. Возвращает True, если астероид уничтожен."""
+        ast = self.asteroids[index]
+        ast['hp'] -= amount
+        return ast['hp'] <= 0
+
+    def remove_many(self, indices):
+        """Удаляет астероиды по набору индексов (индексы берутся до удаления)."""
+        for i in sorted(set(indices), reverse=True):
+            del self.asteroids[i]
+
+    def clear(self):
+        self.asteroids.clear()
+
+    def sprites(self):
+        """(x, y, radius, color) живых астероидов — для отрисовки."""
+        return ((ast['pos'][0], ast['pos'][1], ast['radius'], ast['color']) for ast in self.asteroids)
+
     def draw(self, screen):
-        """Рисуем астероиды, учитывая выход за края."""
-        for ast in self.asteroids:
-            x, y = ast['pos']
-            radius = ast['radius']
-            color = ast['color']
-            pygame.draw.circle(screen, color, (int(x), int(y)), radius)
-
-            # Если астероид пересекает границы, дорисуем "копию" с другой стороны
-            if x < radius:
-                pygame.draw.circle(screen, color, (int(x + WIDTH), int(y)), radius)
-            if (WIDTH - x) < radius:
-                pygame.draw.circle(screen, color, (int(x - WIDTH), int(y)), radius)
-            if y < radius:
-                pygame.draw.circle(screen, color, (int(x), int(y + HEIGHT)), radius)
-            if (HEIGHT - y) < radius:
-                pygame.draw.circle(screen, color, (int(x), int(y - HEIGHT)), radius)
+        """Рисуем астероиды, учитывая выход за края (только на клиенте)."""
+        from render import draw_asteroids
+        draw_asteroids(screen, self.sprites())
+
+
+class ArrayAsteroidManager:
+    """Менеджер астероидов со структурой массивов (struct-of-arrays) на numpy.
+
+    Позиции, скорости, радиусы, hp и цвета лежат в заранее выделенных массивах,
+    живые астероиды занимают первые ``count`` строк. Движение и перенос через
+    края считаются одной векторной операцией, удаление — swap-remove
+    (на место удаляемого ставится последний элемент), поэтому индексы
+    астероидов между кадрами не стабильны.
+    """
+
+    def __init__(self, max_asteroids=10, capacity=None):
+        if np is None:
+            raise ImportError("ArrayAsteroidManager requires numpy")
+        self.max_asteroids = max_asteroids
+        self.capacity = capacity or max(max_asteroids, 64)
+        self.count = 0
+        self.pos = np.zeros((self.capacity, 2), dtype=np.float64)
+        self.vel = np.zeros((self.capacity, 2), dtype=np.float64)
+        self.radius = np.zeros(self.capacity, dtype=np.float64)
+        self.hp = np.zeros(self.capacity, dtype=np.int32)
+        self.color = np.zeros((self.capacity, 3), dtype=np.uint8)
+        self.ids = np.zeros(self.capacity, dtype=np.int64)  # Стабильные id (для дельт снимков)
+        self.next_id = 0
+        self._bounds = np.array([WIDTH, HEIGHT], dtype=np.float64)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        """Удваивает ёмкость массивов (на случай, если max_asteroids превышен)."""
+        new_capacity = self.capacity * 2
+        for name in ('pos', 'vel', 'radius', 'hp', 'color', 'ids'):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.capacity = new_capacity
+
+    def add(self, x, y, vx, vy, radius, hp=1, color=GREY):
+        """Добавляет астероид с заданными параметрами, возвращает его индекс."""
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        self.pos[i] = (x, y)
+        self.vel[i] = (vx, vy)
+        self.radius[i] = radius
+        self.hp[i] = hp
+        self.color[i] = color
+        self.ids[i] = self.next_id
+        self.next_id += 1
+        self.count += 1
+        return i
+
+    def spawn_asteroid(self):
+        """Создаёт новый астероид и возвращает его индекс."""
+        x, y, vx, vy, size = random_asteroid_params()
+        return self.add(x, y, vx, vy, size)
+
+    def update(self):
+        """Сдвигает все астероиды и переносит их через края одной операцией."""
+        n = self.count
+        if n == 0:
+            return
+        pos = self.pos[:n]
+        pos += self.vel[:n]
+        np.mod(pos, self._bounds, out=pos)
+
+    def get_bulk(self):
+        """Представления (views) живых строк: (pos[n, 2], radius[n], hp[n]).
+
+        Массивы не копируются — их можно читать в коде столкновений,
+        но до вызова remove_many/add, которые переставляют строки.
+        """
+        n = self.count
+        return self.pos[:n], self.radius[:n], self.hp[:n]
+
+    def query_circle(self, x, y, radius):
+        """Индексы астероидов, пересекающихся с кругом (x, y, radius)."""
+        n = self.count
+        if n == 0:
+            return []
+        d = self.pos[:n] - (x, y)
+        reach = self.radius[:n] + radius
+        hit = np.einsum('ij,ij->i', d, d) < reach * reach
+        return np.flatnonzero(hit).tolist()
+
+    def damage(self, index, amount=1):
+        """Наносит урон астероиду. Возвращает True, если астероид уничтожен."""
+        self.hp[index] -= amount
+        return self.hp[index] <= 0
+
+    def remove_many(self, indices):
+        """Swap-remove по набору индексов (индексы берутся до удаления)."""
+        # Идём с конца, чтобы переставленный последний элемент не был из удаляемых
+        for i in sorted(set(indices), reverse=True):
+            last = self.count - 1
+            if i != last:
+                self.pos[i] = self.pos[last]
+                self.vel[i] = self.vel[last]
+                self.radius[i] = self.radius[last]
+                self.hp[i] = self.hp[last]
+                self.color[i] = self.color[last]
+                self.ids[i] = self.ids[last]
+            self.count -= 1
+
+    def clear(self):
+        self.count = 0
+
+    @property
+    def asteroids(self):
+        """Совместимость со списочным API: список словарей (копия, только чтение)."""
+        n = self.count
+        return [
+            {
+                'id': eid,
+                'pos': pos,
+                'vel': vel,
+                'radius': int(radius),
+                'hp': hp,
+                'color': tuple(color),
+            }
+            for eid, pos, vel, radius, hp, color in zip(self.ids[:n].tolist(), self.pos[:n].tolist(),
+                                                        self.vel[:n].tolist(), self.radius[:n].tolist(),
+                                                        self.hp[:n].tolist(), self.color[:n].tolist())
+        ]
+
+    def sprites(self):
+        """(x, y, radius, color) живых астероидов — для отрисовки."""
+        n = self.count
+        return ((x, y, radius, color) for (x, y), radius, color
+                in zip(self.pos[:n].tolist(), self.radius[:n].tolist(), self.color[:n].tolist()))
+
+    def draw(self, screen):
+        """Рисуем астероиды, учитывая выход за края (только на клиенте)."""
+        from render import draw_asteroids
+        draw_asteroids(screen, self.sprites())
+
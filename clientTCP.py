@@ -1,4 +1,5 @@
 import socket
+import select
 import threading
 import json
 import pygame
@@ -6,135 +7,319 @@ import sys
 import time
 # Импорт классов/констант для отрисовки
 from utils import WIDTH, HEIGHT, BLACK, FPS
+from settings import DIRTY_RECTS
 from ship import Ship
-from asteroid import AsteroidManager
-from laser import LaserManager
-from gamelogic import GameLogic
+from render import draw_world, cache, DirtyRenderer
+from snapshot import SnapshotApplier, LatestState, snapshot_to_state
+from protocol import CODECS, JSON_CODEC, SUPPORTED_CODECS
+from framing import LineReader
+from inputs import InputBatcher, movement_flags
+from prediction import ShipPredictor
+from interpolation import SnapshotBuffer
+from udptransport import UdpChannel, PROBE_INTERVAL
+from scenes import load_winners, draw_leaderboard, parse_address
 
 HOST = "192.168.22.175"
 PORT = 12355
+MAX_DRAIN_READS = 16  # Сколько раз подряд дочитываем уже пришедшие данные перед разбором
+CONNECT_TIMEOUT = 5.0  # Секунд на подключение и hello_ack: неверный IP не должен вешать окно
+IDLE_FPS = 10  # Кадров/с на экранах GAME OVER и таблицы лидеров: там только ждут клавишу
 
 
 class GameClient:
     """
-    Клиент отправляет 'hello' со своим player_id (0 или 1).
+    Клиент отправляет 'hello' со своим player_id (0, 1 или None — любой свободный слот);
+    выданный слот приходит в hello_ack.
     Получает update_state, game_over и т.д. от сервера.
     Локально отрисовывает (ship, asteroids, lasers).
-    При нажатии SPACE отправляет shoot, при движении - update_position.
+    Каждый кадр записывает управление (повороты, тяга, SPACE — выстрел) в кадр input;
+    кадры уходят пачками при изменении управления, двигает корабль сервер.
     """
 
-    def __init__(self, server_host=HOST, server_port=PORT, player_id=0):
+    def __init__(self, server_host=HOST, server_port=PORT, player_id=0, room=None, send_rate=None,
+                 udp=True, netsim=None, dirty_rects=DIRTY_RECTS, nickname=None, screen=None):
         self.server_host = server_host
         self.server_port = server_port
         self.player_id = player_id
+        self.room = room  # Комната на сервере (None — сервер подберёт сам)
+        self.nickname = nickname  # Ник из predgame (пока только в заголовке окна)
+        self.send_rate = send_rate  # Наибольшая частота снимков от сервера, Гц (None — как решит сервер)
+        # Снимки, ввод и ack — по UDP, если сервер согласится (см. udptransport.py);
+        # netsim — имитатор потерь и задержки для проверки на loopback
+        self.udp = udp
+        self.netsim = netsim
+        self.udp_socket = None
+        self.udp_channel = None
+        self.udp_ready = False  # Сервер ответил по UDP — можно слать ввод и ack датаграммами
+        self.next_probe = 0.0
 
         self.client_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-
-        pygame.init()
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption(f"Asteroids Client {player_id}")
-
-        # Локальный корабль (только для отрисовки и управления)
-        self.ship = Ship(self.screen, player_id)
-        self.enemy_ship = Ship(self.screen, abs(1 - player_id))  # Противоположный ID
-
-        # Вспомогательные менеджеры для отрисовки (не для логики столкновений!)
-        # Так как сервер сам ведёт "game logic", клиент лишь визуализирует.
-        self.asteroid_manager = AsteroidManager()
-        self.laser_manager = LaserManager()
+        self.send_lock = threading.Lock()
+        self.recv_lock = threading.Lock()  # Сообщения приходят из потоков TCP и UDP
+        self.codec = CODECS[JSON_CODEC]  # До hello_ack общаемся JSON-строками
+
+        # Внутри приложения (scenes.py) окно уже открыто и переживает матч;
+        # запущенный отдельно клиент открывает и закрывает его сам
+        self.owns_display = screen is None
+        if self.owns_display:
+            pygame.init()
+            screen = pygame.display.set_mode((WIDTH, HEIGHT))
+        self.screen = screen
+        # Кадр целиком (flip) или только изменившиеся прямоугольники
+        self.renderer = DirtyRenderer(self.screen, enabled=dirty_rects)
+
+        # Локальный корабль (только для отрисовки и управления); без player_id —
+        # пока как слот 0, настоящий номер придёт в hello_ack
+        self.assign_slot(player_id if player_id is not None else 0)
+        self.player_id = player_id  # В hello уходит запрошенный слот (None — любой)
+
+        # Астероиды, лазеры и вражеский корабль рисуются из буфера снимков
+        # с интерполяцией (сервер сам ведёт "game logic", клиент лишь визуализирует)
+        self.interpolation = SnapshotBuffer()
 
         self.running = True
         self.game_state = {}
+        self.snapshots = SnapshotApplier()  # Сборка update_state из дельт
+        # Поток приёма отдаёт отрисовке только самое свежее состояние
+        self.latest_state = LatestState()
+        self.recv_stats = {'states': 0, 'skipped': 0, 'decode_time': 0.0, 'max_decode_time': 0.0}
+        self.inputs = InputBatcher()  # Кадры управления для сервера
+        self.predictor = ShipPredictor()  # Неподтверждённые кадры для сверки со снимками
+        self.server_ship = None  # Последняя серверная запись своего корабля, ещё не сверенная
         self.clock = pygame.time.Clock()
-        self.game_over = False
+        self.game_over = False  # Ставит поток приёма по событию game_over
+        # Что показывает цикл: 'playing', 'game_over' или 'leaderboard'
+        self.screen_mode = 'playing'
+        self.overlay_key = None  # Что сейчас нарисовано на экране ожидания (None — перерисовать)
+        self.leaderboard = []  # Строки winners.txt для экрана таблицы лидеров
+
+    def assign_slot(self, slot_id):
+        """Номер своего корабля: пересоздаёт свой и вражеский Ship под этот слот."""
+        self.player_id = slot_id
+        self.ship = Ship(self.screen, slot_id)
+        self.enemy_ship = Ship(self.screen, abs(1 - slot_id))  # Противоположный ID
+        pygame.display.set_caption(f"Asteroids Client {slot_id}"
+                                   + (f" — {self.nickname}" if self.nickname else ""))
 
     def connect(self):
+        # Подключение и hello_ack — с таймаутом (OSError/socket.timeout уходит вызывающему),
+        # дальше сокет снова блокирующий: поток приёма ждёт данных сколько угодно
+        self.client_socket.settimeout(CONNECT_TIMEOUT)
         self.client_socket.connect((self.server_host, self.server_port))
         # Первым делом шлём hello
         hello_msg = {
             'action': 'hello',
             'payload': {
-                'player_id': self.player_id
+                'player_id': self.player_id,
+                'codecs': SUPPORTED_CODECS,  # Предлагаем бинарный протокол, JSON — запасной
             }
         }
+        if self.room is not None:
+            hello_msg['payload']['room'] = self.room
+        if self.send_rate is not None:
+            hello_msg['payload']['send_rate'] = self.send_rate
+        if self.udp:
+            hello_msg['payload']['udp'] = True
         self.send_raw(hello_msg)
+        pending = self.wait_hello_ack()
+        self.client_socket.settimeout(None)
 
         # Поток получения
-        t = threading.Thread(target=self.listen_server, daemon=True)
+        t = threading.Thread(target=self.listen_server, args=(pending,), daemon=True)
         t.start()
 
         # Игровой цикл
         self.game_loop()
 
-    def listen_server(self):
-        """Построчно читаем JSON от сервера."""
-        buffer = ""
+    def wait_hello_ack(self):
+        """Ждёт ответ на hello (JSON-строка) и переключается на выбранный сервером кодек.
+
+        Возвращает байты, пришедшие после первой строки.
+        """
+        reader = LineReader()
+        line = None
+        while line is None:
+            if not reader.recv_into(self.client_socket):
+                return b''
+            line = reader.next_frame()
+        msg = json.loads(bytes(line))
+        remainder = reader.take()
+        if msg.get('event') == 'hello_ack':
+            self.codec = CODECS.get(msg.get('payload', {}).get('codec'), CODECS[JSON_CODEC])
+            self.interpolation.tick_rate = msg.get('payload', {}).get('tick_rate', FPS)
+            # Запоминаем комнату, чтобы переподключиться в тот же матч
+            self.room = msg.get('payload', {}).get('room', self.room)
+            # Слот выдаёт сервер (hello с player_id=None получает любой свободный)
+            slot_id = msg.get('payload', {}).get('player_id')
+            if slot_id in (0, 1):
+                self.assign_slot(slot_id)
+            elif self.player_id is None:
+                self.assign_slot(0)  # Сервер без player_id в hello_ack
+            print(f"[CLIENT] Using codec {self.codec.name}, room {self.room}, slot {self.player_id}")
+            offer = msg.get('payload', {}).get('udp')
+            if self.udp and offer:
+                self.open_udp(offer)
+        else:
+            # Старый сервер не знает о кодеках — остаёмся на JSON
+            if self.player_id is None:
+                self.assign_slot(0)
+            self.handle_server_message(msg)
+        return remainder
+
+    def open_udp(self, offer):
+        """Открывает UDP-канал к порту и с токеном из hello_ack."""
+        self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sendto = self.udp_socket.sendto
+        if self.netsim is not None:
+            sendto = self.netsim.wrap(sendto)
+        self.udp_channel = UdpChannel(sendto, offer['token'], self.codec,
+                                      addr=(self.server_host, offer['port']))
+        threading.Thread(target=self.listen_udp, daemon=True).start()
+
+    def probe_udp(self):
+        """Пока сервер не ответил по UDP, периодически шлём пустую датаграмму."""
+        now = time.monotonic()
+        if self.udp_channel is not None and not self.udp_ready and now >= self.next_probe:
+            self.next_probe = now + PROBE_INTERVAL
+            self.udp_channel.send()
+
+    def listen_udp(self):
+        """Приём датаграмм: снимки (update_state) от сервера."""
+        while self.running:
+            try:
+                data, _ = self.udp_socket.recvfrom(65535)
+            except OSError:
+                break
+            body = self.udp_channel.receive(data)
+            if body is None:
+                continue
+            if not self.udp_ready:
+                print("[CLIENT] UDP channel is up.")
+                self.udp_ready = True
+            decoder = self.codec.decoder()
+            decoder.append(body)
+            self.process_frames(decoder)
+
+    def listen_server(self, pending=b''):
+        """Читаем сообщения от сервера в выбранном кодеке."""
+        decoder = self.codec.decoder()
+        decoder.append(pending)
+        self.process_frames(decoder)
         while self.running:
             try:
-                data = self.client_socket.recv(4096).decode('utf-8')
-                if not data:
+                if not self.receive(decoder):
                     print("[CLIENT] Server closed connection.")
                     break
-                buffer += data
-                while '\n' in buffer:
-                    line, buffer = buffer.split('\n', 1)
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        msg = json.loads(line)
-                        self.handle_server_message(msg)
-                    except json.JSONDecodeError as e:
-                        print(f"[CLIENT] JSON error: {e}, line={repr(line)}")
+                self.process_frames(decoder)
             except Exception as e:
                 print(f"[CLIENT] listen_server error: {e}")
                 break
         self.running = False
         print("[CLIENT] listen_server ended")
 
+    def receive(self, decoder):
+        """Читает всё, что уже пришло в сокет. False — сервер закрыл соединение."""
+        # Читаем прямо в буфер декодера, кадры разбираются без копирования потока
+        if not decoder.recv_into(self.client_socket):
+            return False
+        # Если клиент отстал, в сокете лежит пачка снимков — заберём её целиком
+        for _ in range(MAX_DRAIN_READS):
+            if not select.select([self.client_socket], [], [], 0)[0]:
+                break
+            if not decoder.recv_into(self.client_socket):
+                return False
+        return True
+
+    def process_frames(self, decoder):
+        """Разбирает принятые кадры; из снимков (update_state) — только самый свежий."""
+        states = []
+        for frame in decoder.frames():
+            if decoder.is_state(frame):
+                states.append(frame)
+                continue
+            msg = decoder.decode(frame)
+            if msg is not None:
+                with self.recv_lock:
+                    self.handle_server_message(msg)
+        if not states:
+            return
+
+        stats = self.recv_stats
+        stats['skipped'] += len(states) - 1
+        started = time.perf_counter()
+        # Дельты строятся к подтверждённому нами снимку, так что пропуск промежуточных безопасен
+        msg = decoder.decode(states[-1])
+        if msg is not None:
+            with self.recv_lock:
+                self.apply_snapshot(msg.get('payload', {}))
+        elapsed = time.perf_counter() - started
+        stats['states'] += 1
+        stats['decode_time'] += elapsed
+        stats['max_decode_time'] = max(stats['max_decode_time'], elapsed)
+
+    def apply_snapshot(self, payload):
+        """Собирает снимок из дельты, подтверждает его и передаёт отрисовке."""
+        snapshot = self.snapshots.apply(payload)
+        if snapshot is None:
+            # Нет базы для дельты — просим у сервера ключевой кадр
+            self.send_unreliable('ack', {'seq': None})
+            return
+        if snapshot is not self.snapshots.latest:
+            return  # Датаграммы переставились — более новый снимок уже применён
+        self.send_unreliable('ack', {'seq': snapshot['seq']})
+        self.interpolation.push(snapshot, time.monotonic())
+        self.latest_state.publish(snapshot_to_state(snapshot))
+
+    def apply_state(self, state):
+        """Переносит состояние из снимка на корабли (в потоке отрисовки)."""
+        self.game_state = state
+        ships_data = self.game_state['ships']
+
+        # Обновляем локальный корабль
+        for ship_data in ships_data:
+            if ship_data['id'] == self.player_id:
+                self.ship.hp = ship_data['hp']
+                self.ship.shots = ship_data['shots']
+                # Позицию и угол сверяет с предсказанием игровой цикл (см. ShipPredictor)
+                self.server_ship = ship_data
+
+                # Синхронизация флагов респауна и перезарядки
+                self.ship.is_respawning = ship_data.get('is_respawning', False)
+                is_reloading = ship_data.get('is_reloading', False)
+                if is_reloading:
+                    # Если началась новая перезарядка
+                    if not self.ship.is_reloading:
+                        self.ship.reload_start_time = time.time()
+                    self.ship.is_reloading = True
+                else:
+                    self.ship.is_reloading = False
+            else:
+                # Обновляем вражеский корабль
+                # Позицию и угол врага задаёт интерполяция при отрисовке
+                self.enemy_ship.hp = ship_data['hp']
+                self.enemy_ship.shots = ship_data['shots']
+
+                # Синхронизация флагов респауна и перезарядки
+                self.enemy_ship.is_respawning = ship_data.get('is_respawning', False)
+                is_reloading = ship_data.get('is_reloading', False)
+                if is_reloading:
+                    # Если началась новая перезарядка
+                    if not self.enemy_ship.is_reloading:
+                        self.enemy_ship.reload_start_time = time.time()
+                    self.enemy_ship.is_reloading = True
+                else:
+                    self.enemy_ship.is_reloading = False
+
     def handle_server_message(self, msg):
         event = msg.get('event')
         payload = msg.get('payload', {})
 
-        if event == 'update_state':
-            self.game_state = payload
-            ships_data = payload.get('ships', [])
-
-            # Обновляем локальный корабль
-            for ship_data in ships_data:
-                if ship_data['id'] == self.player_id:
-                    self.ship.hp = ship_data['hp']
-                    self.ship.shots = ship_data['shots']
-                    self.ship.rect.center = ship_data['pos']
-                    self.ship.angle = ship_data['angle']
-
-                    # Синхронизация флагов респауна и перезарядки
-                    self.ship.is_respawning = ship_data.get('is_respawning', False)
-                    is_reloading = ship_data.get('is_reloading', False)
-                    if is_reloading:
-                        # Если началась новая перезарядка
-                        if not self.ship.is_reloading:
-                            self.ship.reload_start_time = time.time()
-                        self.ship.is_reloading = True
-                    else:
-                        self.ship.is_reloading = False
-                else:
-                    # Обновляем вражеский корабль
-                    self.enemy_ship.hp = ship_data['hp']
-                    self.enemy_ship.shots = ship_data['shots']
-                    self.enemy_ship.rect.center = ship_data['pos']
-                    self.enemy_ship.angle = ship_data['angle']
+        if event == 'ping':
+            # Сервер меряет RTT для компенсации задержки — отвечаем сразу
+            self.send_message('pong', payload)
 
-                    # Синхронизация флагов респауна и перезарядки
-                    self.enemy_ship.is_respawning = ship_data.get('is_respawning', False)
-                    is_reloading = ship_data.get('is_reloading', False)
-                    if is_reloading:
-                        # Если началась новая перезарядка
-                        if not self.enemy_ship.is_reloading:
-                            self.enemy_ship.reload_start_time = time.time()
-                        self.enemy_ship.is_reloading = True
-                    else:
-                        self.enemy_ship.is_reloading = False
+        elif event == 'update_state':
+            self.apply_snapshot(payload)
 
         elif event == 'waiting_for_players':
             print("[CLIENT] Waiting for another player...")
@@ -156,9 +341,11 @@ class GameClient:
             print(f"[CLIENT] Unknown event: {event}")
 
     def send_raw(self, obj):
-        data = (json.dumps(obj) + "\n").encode('utf-8')
+        data = self.codec.encode(obj)
         try:
-            self.client_socket.sendall(data)
+            # Шлют и игровой цикл, и поток приёма (ack) — не даём сообщениям перемешаться
+            with self.send_lock:
+                self.client_socket.sendall(data)
         except Exception as e:
             print(f"[CLIENT] sendall error: {e}")
             self.running = False
@@ -170,42 +357,89 @@ class GameClient:
         }
         self.send_raw(msg)
 
+    def send_unreliable(self, action, payload, redundant=False):
+        """input/ack — датаграммой, если UDP-канал работает, иначе по TCP.
+
+        redundant=True: повторять в следующих датаграммах до подтверждения (кадры ввода).
+        """
+        if self.udp_ready:
+            data = self.codec.encode({'action': action, 'payload': payload})
+            if self.udp_channel.send(data, redundant):
+                return
+        self.send_message(action, payload)
+
     def game_loop(self):
         while self.running:
-            self.clock.tick(FPS)
+            if self.game_over and self.screen_mode == 'playing':
+                self.screen_mode = 'game_over'
+            waiting = self.screen_mode != 'playing'
+            # На экранах ожидания кадры не нужны — крутимся редко, чтобы не занимать ядро
+            self.clock.tick(IDLE_FPS if waiting else FPS)
+            shoot = False  # Выстрел уходит битом кадра ввода, в котором нажат SPACE
             for event in pygame.event.get():
                 if event.type == pygame.QUIT:
-                    self.running = False
+                    self.quit(event)
+                elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):
+                    self.renderer.invalidate()  # Окно перекрывали — прямоугольников прошлого кадра мало
+                    self.overlay_key = None
                 elif event.type == pygame.KEYDOWN:
-                    if self.game_over:
-                        # Обработка выбора на экране GAME OVER
-                        if event.key == pygame.K_r:  # Нажатие 'R' для рестарта
-                            self.restart_game()
-                        elif event.key == pygame.K_l:  # Нажатие 'L' для таблицы лидеров
-                            self.show_leaderboard()
+                    if waiting:
+                        self.handle_waiting_key(event.key)
+                    elif event.key == pygame.K_ESCAPE:  # Выход из матча (в меню, если оно есть)
+                        self.running = False
                     else:
                         if event.key == pygame.K_SPACE:
-                            self.send_message('shoot', {})
+                            shoot = True
+            if not self.running:
+                break
 
-            if self.game_over:
-                # Покажем на экране "Game Over" и ждем ввода
-                self.draw_game_over()
+            # Забираем самое свежее состояние из потока приёма (и на экранах ожидания —
+            # поток приёма работает всё время, счёт на экране GAME OVER остаётся актуальным)
+            state = self.latest_state.take()
+            if state is not None:
+                self.apply_state(state)
+
+            if self.screen_mode != 'playing':
+                self.draw_waiting_screen()
                 continue
 
-            # Локально двигаем корабль (чисто для анимации)
+            # Сверяем свой корабль с последним снимком сервера
+            server_ship, self.server_ship = self.server_ship, None
+            if server_ship is not None:
+                self.predictor.reconcile(self.ship, server_ship)
+
+            # Предсказание: двигаем корабль по вводу сразу, не дожидаясь сервера
             keys = pygame.key.get_pressed()
-            self.ship.update(keys)
+            bits = self.ship.input_bits(keys, shoot)
+            self.ship.step(*movement_flags(bits))
 
-            # Отправляем координаты на сервер
-            self.send_message('update_position', {
-                'pos': [self.ship.rect.centerx, self.ship.rect.centery],
-                'angle': self.ship.angle
-            })
+            # Отправляем серверу кадр ввода (пачкой — только при изменении или раз в несколько кадров)
+            packet = self.inputs.record(bits)
+            self.predictor.record(self.inputs.seq, bits)
+            if packet is not None:
+                self.send_unreliable('input', packet, redundant=True)
+            self.probe_udp()
 
             self.draw()
 
-        pygame.quit()
+        print(f"[CLIENT] Prediction stats: {self.predictor.stats}")
+        print(f"[CLIENT] Interpolation stats: {self.interpolation.stats}")
+        print(f"[CLIENT] Receive stats: {self.recv_stats}, state buffer: {self.latest_state.stats}")
+        if self.udp_channel is not None:
+            print(f"[CLIENT] UDP stats: {self.udp_channel.stats}")
+        print(f"[CLIENT] Render cache stats: {cache.stats}, renderer: {self.renderer.stats}")
+        if self.owns_display:
+            cache.clear()
+            pygame.quit()
         self.client_socket.close()
+        if self.udp_socket is not None:
+            self.udp_socket.close()
+
+    def quit(self, event):
+        """Окно закрыли: завершаем матч и возвращаем событие — его увидит менеджер сцен."""
+        self.running = False
+        if not self.owns_display:
+            pygame.event.post(event)
 
     def restart_game(self):
         """Отправить запрос на перезапуск игры и перезапустить локальные объекты."""
@@ -213,71 +447,64 @@ class GameClient:
         self.game_over = False
         self.ship.reset()
         self.enemy_ship.reset()
+        self.predictor.clear()
+        self.interpolation.clear()
+        self.latest_state.clear()
+        self.server_ship = None
         self.game_state = {}
+        self.screen_mode = 'playing'
+        self.overlay_key = None
+        self.renderer.invalidate()  # Экран ожидания был нарисован целиком — игру тоже рисуем целиком
         print("[CLIENT] Requesting game restart...")
 
-    def show_leaderboard(self):
-        """Отображает таблицу лидеров."""
-        self.screen.fill(BLACK)
-        font = pygame.font.Font(None, 36)
-
-        # Заглушка: таблица лидеров (можно заменить на данные от сервера)
-        leaderboard = [
-            ("Player1", 120),
-            ("Player2", 100),
-            ("Player3", 80),
-        ]
-
-        title = font.render("LEADERBOARD", True, (255, 255, 255))
-        self.screen.blit(title, (WIDTH // 2 - title.get_width() // 2, 50))
-
-        for idx, (name, score) in enumerate(leaderboard):
-            entry = font.render(f"{idx + 1}. {name} - {score} pts", True, (255, 255, 255))
-            self.screen.blit(entry, (WIDTH // 2 - entry.get_width() // 2, 100 + idx * 40))
+    def handle_waiting_key(self, key):
+        """Клавиши на экранах GAME OVER и таблицы лидеров."""
+        if key == pygame.K_r:  # Нажатие 'R' для рестарта
+            self.restart_game()
+        elif key == pygame.K_l and self.screen_mode == 'game_over':  # Нажатие 'L' для таблицы лидеров
+            self.screen_mode = 'leaderboard'
+            self.leaderboard = load_winners()  # Читаем при входе на экран: сервер мог дописать результат
+        elif key in (pygame.K_q, pygame.K_ESCAPE):  # Выход из матча
+            self.running = False
 
-        prompt = font.render("Press R to restart or Q to quit", True, (255, 255, 255))
-        self.screen.blit(prompt, (WIDTH // 2 - prompt.get_width() // 2, HEIGHT - 100))
+    def draw_waiting_screen(self):
+        """Экран GAME OVER или таблица лидеров — перерисовывается, только когда меняется содержимое."""
+        key = (self.screen_mode, tuple(self.game_state.get('score', [0, 0])))
+        if key == self.overlay_key:
+            return
+        self.overlay_key = key
+        if self.screen_mode == 'leaderboard':
+            self.draw_leaderboard()
+        else:
+            self.draw_game_over()
 
+    def draw_leaderboard(self):
+        """Отображает таблицу лидеров (winners.txt, как в меню)."""
+        draw_leaderboard(self.screen, self.leaderboard, "Press R to restart or Q to quit")
         pygame.display.flip()
 
-        # Ожидание нажатия клавиш
-        while True:
-            for event in pygame.event.get():
-                if event.type == pygame.QUIT:
-                    self.running = False
-                    return
-                elif event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_r:
-                        self.restart_game()
-                        return
-                    elif event.key == pygame.K_q:
-                        self.running = False
-                        return
-
     def draw_game_over(self):
         """Отрисовка экрана завершения."""
         self.screen.fill(BLACK)
-        font = pygame.font.Font(None, 60)
-        text = font.render("GAME OVER!", True, (255, 0, 0))
+        text = cache.text("GAME OVER!", 60, (255, 0, 0))
         rect = text.get_rect(center=(WIDTH // 2, HEIGHT // 2 - 50))
         self.screen.blit(text, rect)
 
         # Отрисовка счета
         scores = self.game_state.get('score', [0, 0])
-        score_text = font.render(f"Final Score: P1={scores[0]} P2={scores[1]}", True, (255, 255, 255))
+        score_text = cache.text(f"Final Score: P1={scores[0]} P2={scores[1]}", 60, (255, 255, 255))
         score_rect = score_text.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 20))
         self.screen.blit(score_text, score_rect)
 
         # Отрисовка победителя
         winner = 0 if scores[0] == scores[1] else (1 if scores[0] > scores[1] else 2)
         winner_text = "DRAW!" if winner == 0 else f"Player {winner} Wins!"
-        winner_surface = font.render(winner_text, True, (0, 255, 0))
+        winner_surface = cache.text(winner_text, 60, (0, 255, 0))
         winner_rect = winner_surface.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 80))
         self.screen.blit(winner_surface, winner_rect)
 
         # Добавьте подсказки для игроков
-        prompt_font = pygame.font.Font(None, 36)
-        restart_prompt = prompt_font.render("Press R to Restart or L for Leaderboard", True, (255, 255, 255))
+        restart_prompt = cache.text("Press R to Restart or L for Leaderboard", 36, (255, 255, 255))
         prompt_rect = restart_prompt.get_rect(center=(WIDTH // 2, HEIGHT // 2 + 140))
         self.screen.blit(restart_prompt, prompt_rect)
 
@@ -285,66 +512,47 @@ class GameClient:
 
     def draw(self):
         """Отрисовка текущего состояния: корабли, астероиды, лазеры, очки, время."""
-        self.screen.fill(BLACK)
+        renderer = self.renderer
+        renderer.begin()
 
         # Проверка состояния ожидания
         if not self.game_state.get('time_left', 0):
-            font = pygame.font.Font(None, 36)
-            waiting_text = font.render("Waiting for another player...", True, (255, 255, 255))
-            self.screen.blit(waiting_text, (WIDTH // 2 - 150, HEIGHT // 2))
-            pygame.display.flip()
+            waiting_text = cache.text("Waiting for another player...", 36, (255, 255, 255))
+            renderer.add(self.screen.blit(waiting_text, (WIDTH // 2 - 150, HEIGHT // 2)))
+            renderer.present()
             return
 
+        # Удалённые сущности — на момент "сервер минус INTERP_DELAY", между снимками
+        view = self.interpolation.sample(time.monotonic())
+        if view is not None:
+            for ship_data in view['ships']:
+                if ship_data['id'] != self.player_id:
+                    self.enemy_ship.rect.center = ship_data['pos']
+                    self.enemy_ship.angle = ship_data['angle']
+
         # 1) Рисуем локальный корабль (он у нас Ship(screen,...))
-        self.ship.draw()
+        renderer.add_all(self.ship.draw())
         # Рисуем вражеский корабль
-        self.enemy_ship.draw()
+        renderer.add_all(self.enemy_ship.draw())
 
-        # 2) Рисуем пришедшее от сервера:
-        #    asteroids, lasers, ships, score, time_left
-        asteroids_data = self.game_state.get('asteroids', [])
-        lasers_data = self.game_state.get('lasers', [])
-        ships_data = self.game_state.get('ships', [])
+        # 2) Рисуем пришедшее от сервера: asteroids, lasers, score, time_left
         score = self.game_state.get('score', [0, 0])
         time_left = self.game_state.get('time_left', 0)
-
-        # Астероиды
-        # (у нас есть asteroid_manager, но логика появления/движения
-        #  идёт на сервере, здесь мы только отображаем)
-        self.asteroid_manager.asteroids = []
-        for ast in asteroids_data:
-            # Восстанавливаем словарь, чтобы использовать .draw()
-            new_ast = {
-                'pos': ast['pos'],
-                'vel': [0, 0],  # нам не важно, сервер уже двигает
-                'radius': ast['radius'],
-                'hp': 1,
-                'color': ast['color']
-            }
-            self.asteroid_manager.asteroids.append(new_ast)
-        self.asteroid_manager.draw(self.screen)
-
-        # Лазеры
-        self.laser_manager.lasers = []
-        for lz in lasers_data:
-            laser = {
-                'pos': lz['pos'],
-                'vel': [0, 0],
-                'owner': lz['owner']
-            }
-            self.laser_manager.lasers.append(laser)
-        self.laser_manager.draw(self.screen)
+        if view is not None:
+            renderer.add_all(draw_world(
+                self.screen,
+                ((ast['pos'][0], ast['pos'][1], ast['radius'], ast['color']) for ast in view['asteroids']),
+                (lz['pos'] for lz in view['lasers'])))
 
         # Отрисуем счёт
-        font = pygame.font.Font(None, 36)
-        score_text = font.render(f"Score: P1={score[0]}  P2={score[1]}", True, (255, 255, 255))
-        self.screen.blit(score_text, (20, 20))
+        score_text = cache.text(f"Score: P1={score[0]}  P2={score[1]}", 36, (255, 255, 255))
+        renderer.add(self.screen.blit(score_text, (20, 20)))
 
         # Таймер
-        time_text = font.render(f"Time Left: {time_left}", True, (255, 255, 255))
-        self.screen.blit(time_text, (WIDTH // 2 - 50, 20))
+        time_text = cache.text(f"Time Left: {time_left}", 36, (255, 255, 255))
+        renderer.add(self.screen.blit(time_text, (WIDTH // 2 - 50, 20)))
 
-        pygame.display.flip()
+        renderer.present()
 
 
 if __name__ == "__main__":
@@ -354,15 +562,21 @@ if __name__ == "__main__":
     else:
         pid = 0
 
+    # Аргумент 2: адрес сервера ("host" или "host:port")
+    if len(sys.argv) > 2:
+        host, port = parse_address(sys.argv[2], PORT)
+    else:
+        host, port = HOST, PORT
+
     # Аргумент 3: Ник игрока (не обязательно, если не нужно — можно удалить)
     if len(sys.argv) > 3:
         nickname = sys.argv[3]
     else:
         nickname = "Player"
 
-    # Теперь передаём host и nickname в конструктор (добавим в __init__ при необходимости)
-    client = GameClient(server_host=HOST, server_port=12355, player_id=pid)
-    # Если хотим и ник где-то использовать — тоже можно хранить:
-    # client.nickname = nickname
+    # Аргумент 4: комната (не обязательно — без неё сервер подберёт ожидающую)
+    room = sys.argv[4] if len(sys.argv) > 4 else None
+
+    client = GameClient(server_host=host, server_port=port, player_id=pid, room=room, nickname=nickname)
 
     client.connect()
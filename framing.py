@@ -0,0 +1,147 @@
+# framing.py
+# Разбор потока байт (TCP) на кадры: общий для сервера, клиента и отладочных утилит.
+#
+# Данные читаются прямо в bytearray (socket.recv_into или feed), кадры отдаются
+# срезами memoryview без копирования. Буфер сдвигается к началу, только когда в конце
+# не хватает места, и растёт (удваиваясь) лишь под кадр, который в него не влезает.
+# Кадр длиннее max_frame — ошибка протокола (FrameTooLarge): такое соединение закрывают,
+# а не копят мусор в памяти.
+#
+# Срезы действительны до следующего recv_into()/feed(): разобрать кадр нужно раньше.
+# Перебор frames() буфер не двигает, так что кадры одной пачки можно собрать и разобрать выборочно.
+import struct
+
+MAX_FRAME_SIZE = 1 << 20  # 1 МиБ: ни одно сообщение игры не бывает больше
+MAX_HELLO_SIZE = 4096  # hello — одна короткая JSON-строка
+RECV_SIZE = 16384  # Сколько свободного места держим перед recv_into
+
+
+class FrameTooLarge(ValueError):
+    """Кадр длиннее допустимого — поток испорчен или собеседник шлёт мусор."""
+
+
+class FrameReader:
+    """Буфер потока: непрочитанные байты лежат в buffer[start:end].
+
+    Подклассы определяют next_frame() — где в потоке кончается кадр.
+
+    Счётчики в stats: frames, bytes, compactions (сдвиги к началу буфера), grows.
+    """
+
+    def __init__(self, max_frame=MAX_FRAME_SIZE, recv_size=RECV_SIZE):
+        self.max_frame = max_frame
+        self.recv_size = recv_size
+        self.buffer = bytearray(recv_size)
+        self.start = 0
+        self.end = 0
+        self.stats = {'frames': 0, 'bytes': 0, 'compactions': 0, 'grows': 0}
+
+    def __len__(self):
+        return self.end - self.start
+
+    def reserve(self, size):
+        """Освобождает в конце буфера место под size байт."""
+        pending = self.end - self.start
+        if not pending:
+            self.start = self.end = 0
+        if len(self.buffer) - self.end >= size:
+            return
+        if pending + size <= len(self.buffer):
+            # Сдвиг без изменения размера: старые срезы остаются валидными объектами
+            self.buffer[:pending] = self.buffer[self.start:self.end]
+            self.stats['compactions'] += 1
+        else:
+            # Новый буфер, а не resize: bytearray с живыми memoryview менять размер не даёт
+            grown = bytearray(max(2 * len(self.buffer), pending + size))
+            grown[:pending] = self.buffer[self.start:self.end]
+            self.buffer = grown
+            self.stats['grows'] += 1
+        self.start = 0
+        self.end = pending
+
+    def recv_into(self, sock):
+        """Читает из сокета прямо в буфер. Возвращает число байт (0 — соединение закрыто)."""
+        self.reserve(self.recv_size)
+        view = memoryview(self.buffer)[self.end:]
+        try:
+            n = sock.recv_into(view)
+        finally:
+            view.release()
+        self.end += n
+        self.stats['bytes'] += n
+        return n
+
+    def feed(self, data):
+        """Добавляет уже прочитанные байты (asyncio, pipe, датаграмма)."""
+        size = len(data)
+        self.reserve(size)
+        self.buffer[self.end:self.end + size] = data
+        self.end += size
+        self.stats['bytes'] += size
+
+    def take(self):
+        """Забирает все непрочитанные байты (например, после hello — в декодер кодека)."""
+        data = bytes(self.buffer[self.start:self.end])
+        self.start = self.end = 0
+        return data
+
+    def frames(self):
+        """Все полностью принятые кадры (memoryview)."""
+        while True:
+            frame = self.next_frame()
+            if frame is None:
+                return
+            yield frame
+
+    def next_frame(self):
+        raise NotImplementedError
+
+    def cut(self, begin, end, next_start):
+        """Срез кадра buffer[begin:end]; чтение продолжится с next_start."""
+        self.start = next_start
+        self.stats['frames'] += 1
+        return memoryview(self.buffer)[begin:end]
+
+
+class LineReader(FrameReader):
+    """Кадры, разделённые '\\n' (JSON-строки, hello).
+
+    Уже просмотренный хвост без '\\n' повторно не сканируется.
+    """
+
+    def __init__(self, max_frame=MAX_FRAME_SIZE, recv_size=RECV_SIZE):
+        super().__init__(max_frame, recv_size)
+        self.scanned = 0  # Байт после start, в которых '\n' точно нет
+
+    def next_frame(self):
+        newline = self.buffer.find(b'\n', self.start + self.scanned, self.end)
+        if newline < 0:
+            self.scanned = self.end - self.start
+            if self.scanned > self.max_frame:
+                raise FrameTooLarge(f"line longer than {self.max_frame} bytes")
+            return None
+        self.scanned = 0
+        if newline - self.start > self.max_frame:
+            # Целая строка могла прийти одним recv — предел тот же, что и для недочитанной
+            raise FrameTooLarge(f"line longer than {self.max_frame} bytes")
+        return self.cut(self.start, newline, newline + 1)
+
+
+class LengthPrefixedReader(FrameReader):
+    """Кадры с префиксом длины (uint32, big-endian), как в bin1.
+
+    Отдаёт кадр без префикса: для bin1 это байт типа и тело.
+    """
+
+    HEADER = struct.Struct('!I')
+
+    def next_frame(self):
+        if self.end - self.start < self.HEADER.size:
+            return None
+        length, = self.HEADER.unpack_from(self.buffer, self.start)
+        if length > self.max_frame:
+            raise FrameTooLarge(f"frame of {length} bytes, limit {self.max_frame}")
+        begin = self.start + self.HEADER.size
+        if self.end - begin < length:
+            return None
+        return self.cut(begin, begin + length, begin + length)
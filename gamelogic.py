@@ -2,6 +2,10 @@
 import math
 import time
 
+from settings import FPS
+from spatialhash import SpatialHash
+from lagcomp import ShipHistory, history_size
+
 
 class GameLogic:
     """Класс, отвечающий за:
@@ -10,23 +14,35 @@ class GameLogic:
        - Общее управление длительностью игры и т.д.
     """
 
-    def __init__(self, ship_list, asteroid_manager, laser_manager, max_time=30):
+    def __init__(self, ship_list, asteroid_manager, laser_manager, max_time=30, history_ticks=history_size(FPS)):
         self.ships = ship_list
         self.asteroid_manager = asteroid_manager
         self.laser_manager = laser_manager
         self.start_time = time.time()
         self.max_time = max_time
         self.points = [0] * len(ship_list)  # Для каждого корабля
+        self.broadphase = SpatialHash()  # Сетка астероидов, перестраивается каждый тик
+        self.tick = 0  # Номер тика симуляции (seq снимков состояния)
+        # Прошлые позиции кораблей и текущий откат целей (в тиках) каждого стрелка;
+        # лазер запоминает откат при выстреле (shoot_laser(..., rewind=...))
+        self.history = ShipHistory(history_ticks)
+        self.rewind = [0] * len(ship_list)
 
     def update(self):
         """Общее обновление игры — вызывается каждый кадр."""
         current_time = time.time()
+        self.tick += 1
 
         # Обновляем астероиды и лазеры
         self.asteroid_manager.update()
         self.laser_manager.update()
 
+        # Перестраиваем broadphase: дальше точная проверка идёт только для соседних ячеек
+        positions, radii, _ = self.asteroid_manager.get_bulk()
+        self.broadphase.rebuild(positions, radii)
+
         # Сталкиваем корабли с астероидами
+        destroyed = set()  # Индексы уничтоженных за тик астероидов
         for i, ship in enumerate(self.ships):
             # Управление перезарядкой
             if ship.is_reloading:
@@ -43,46 +59,58 @@ class GameLogic:
                     print(f"[SERVER] Ship {i} respawned.")
                 continue
 
-            for asteroid in self.asteroid_manager.asteroids:
-                dist = math.hypot(ship.rect.centerx - asteroid['pos'][0],
-                                  ship.rect.centery - asteroid['pos'][1])
-                if dist < (ship.radius + asteroid['radius']):
-                    ship.take_damage()
-                    asteroid['hp'] -= 1
-                    if asteroid['hp'] <= 0:
-                        self.asteroid_manager.asteroids.remove(asteroid)
+            for j in self.broadphase.query_circle(ship.rect.centerx, ship.rect.centery, ship.radius):
+                if j in destroyed:
+                    continue
+                ship.take_damage()
+                if self.asteroid_manager.damage(j):
+                    destroyed.add(j)
 
-                        # Сталкиваем лазеры с астероидами и другими кораблями
-        for laser in self.laser_manager.lasers[:]:
-            lx, ly = laser['pos']
+        # Позиции после движения и респаунов — те же, что уйдут в снимок этого тика
+        self.history.record(self.tick, self.ships)
 
+        # Сталкиваем лазеры с астероидами и другими кораблями
+        for k, lx, ly, owner_id in self.laser_manager.iter_lasers():
+            # Чужие корабли — там, где их видел стрелок (см. lagcomp.py): на откат,
+            # записанный при выстреле; проверяемый тик идёт с реальной скоростью
+            # и никогда не забегает вперёд настоящего
+            rewind = self.laser_manager.rewind_of(k)
+            past = self.history.at(self.tick - max(0, rewind)) if rewind else None
             # 1) Смотрим столкновение с кораблями
             for i, ship in enumerate(self.ships):
                 if ship.is_respawning:
                     continue
-                dist = math.hypot(lx - ship.rect.centerx, ly - ship.rect.centery)
+                if past is not None and i != owner_id:
+                    sx, sy, was_respawning = past[i]
+                    if was_respawning:
+                        continue
+                else:
+                    sx, sy = ship.rect.centerx, ship.rect.centery
+                dist = math.hypot(lx - sx, ly - sy)
                 if dist < ship.radius:
                     # Урон кораблю
                     ship.take_damage()
                     # Если лазер выпущен другим кораблем — добавим очки
-                    owner_id = laser['owner']
                     if owner_id != ship.number:
                         self.points[owner_id] += 1
 
-                    self.laser_manager.lasers.remove(laser)
+                    self.laser_manager.mark_hit(k)
                     break
 
             else:
-                # 2) Если не удалили лазер, проверяем на столкновение с астероидами
-                for ast in self.asteroid_manager.asteroids[:]:
-                    dist_ast = math.hypot(lx - ast['pos'][0], ly - ast['pos'][1])
-                    if dist_ast < ast['radius']:
-                        # Удаляем астероид
-                        self.asteroid_manager.asteroids.remove(ast)
-                        # Удаляем лазер
-                        if laser in self.laser_manager.lasers:
-                            self.laser_manager.lasers.remove(laser)
-                        break
+                # 2) Если лазер не попал в корабль, проверяем на столкновение с астероидами
+                for j in self.broadphase.query_circle(lx, ly, 0):
+                    if j in destroyed:
+                        continue
+                    # Удаляем астероид и лазер (в конце тика)
+                    destroyed.add(j)
+                    self.laser_manager.mark_hit(k)
+                    break
+
+        # Попавшие лазеры и уничтоженные астероиды удаляем пачкой:
+        # индексы внутри тика остаются валидными
+        self.laser_manager.flush()
+        self.asteroid_manager.remove_many(destroyed)
 
         # Проверяем, не истекло ли время игры
         elapsed = current_time - self.start_time
@@ -95,8 +123,9 @@ class GameLogic:
         """Сброс игрового состояния для новой игры."""
         self.start_time = time.time()
         self.points = [0] * len(self.ships)
-        self.asteroid_manager.asteroids.clear()
-        self.laser_manager.lasers.clear()
+        self.asteroid_manager.clear()
+        self.laser_manager.clear()
+        self.history.clear()
         print("[SERVER] GameLogic reset.")
 
     def get_time_left(self):
@@ -0,0 +1,195 @@
+# inputs.py
+# Команды управления кораблём (action 'input') вместо присылаемых клиентом координат.
+#
+# Клиент каждый кадр кодирует управление битами (IN_LEFT ... IN_SHOOT) и нумерует
+# кадры подряд (seq). Кадры копятся пачкой в виде серий [биты, сколько кадров] и
+# уходят, когда управление изменилось, либо раз в HEARTBEAT_FRAMES кадров:
+#   {"action": "input", "payload": {"seq": 120, "runs": [[4, 5], [5, 1]]}}
+# (seq — номер первого кадра пачки). Сервер сам двигает корабль по этим кадрам,
+# по одному на тик, и сообщает в снимке номер последнего учтённого кадра (ack_input).
+import threading
+from collections import deque
+
+IN_LEFT = 1
+IN_RIGHT = 2
+IN_UP = 4  # Тяга вперёд
+IN_DOWN = 8  # Тяга назад
+IN_SHOOT = 16
+
+HEARTBEAT_FRAMES = 6  # Пачка при неизменном управлении уходит не реже раза в 6 кадров
+MAX_INPUT_BUFFER = 30  # Кадров в очереди сервера; лишние (самые старые) отбрасываются
+MAX_INPUT_DEBT = 2 * HEARTBEAT_FRAMES  # Сколько тиков сервер может "взять в долг", повторяя последний ввод
+
+
+def input_bits(left=False, right=False, up=False, down=False, shoot=False):
+    """Флаги управления -> биты кадра."""
+    return ((IN_LEFT if left else 0) | (IN_RIGHT if right else 0) | (IN_UP if up else 0)
+            | (IN_DOWN if down else 0) | (IN_SHOOT if shoot else 0))
+
+
+def movement_flags(bits):
+    """Биты кадра -> (left, right, up, down) для ShipState.move."""
+    return bool(bits & IN_LEFT), bool(bits & IN_RIGHT), bool(bits & IN_UP), bool(bits & IN_DOWN)
+
+
+def parse_input(payload):
+    """payload сообщения input -> (seq, runs) или None, если пачка испорчена.
+
+    seq — целое, runs — список пар [биты, сколько кадров] из целых,
+    число кадров неотрицательно.
+    """
+    if not isinstance(payload, dict):
+        return None
+    seq = payload.get('seq')
+    runs = payload.get('runs')
+    if type(seq) is not int or not isinstance(runs, (list, tuple)):
+        return None
+    for run in runs:
+        if not isinstance(run, (list, tuple)) or len(run) != 2:
+            return None
+        bits, count = run
+        if type(bits) is not int or type(count) is not int or count < 0:
+            return None
+    return seq, runs
+
+
+class InputBatcher:
+    """Клиентская сторона: нумерует кадры ввода и собирает их в пачки."""
+
+    def __init__(self, heartbeat=HEARTBEAT_FRAMES):
+        self.heartbeat = heartbeat
+        self.seq = 0  # Номер последнего записанного кадра
+        self.first_seq = 1  # Номер первого кадра в неотправленной пачке
+        self.runs = []
+        self.pending = 0  # Кадров в неотправленной пачке
+        self.last_bits = None
+
+    def record(self, bits):
+        """Добавляет кадр. Возвращает payload для отправки или None."""
+        self.seq += 1
+        changed = bits != self.last_bits
+        self.last_bits = bits
+        if self.runs and self.runs[-1][0] == bits:
+            self.runs[-1][1] += 1
+        else:
+            self.runs.append([bits, 1])
+        self.pending += 1
+        if changed or self.pending >= self.heartbeat:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Забирает накопленную пачку (или None, если она пуста)."""
+        if not self.runs:
+            return None
+        payload = {'seq': self.first_seq, 'runs': self.runs}
+        self.first_seq = self.seq + 1
+        self.runs = []
+        self.pending = 0
+        return payload
+
+
+class InputQueue:
+    """Серверная сторона: очередь кадров ввода одного игрока.
+
+    Каждый тик next_bits() отдаёт один кадр. Если очередь пуста (пачка ещё в
+    пути), повторяется последний ввод без выстрела, а тик записывается в долг:
+    пришедшие потом кадры в пределах долга не применяются повторно, только
+    их выстрел переносится на следующий тик.
+
+    push() вызывают потоки соединений (TCP и UDP), next_bits() — поток тика:
+    долг, ack и последний ввод меняются обоими, поэтому под общим lock.
+
+    Счётчики в stats: packets, frames, applied, repeated, skipped, overflow, stale,
+    bad (пачки, отброшенные parse_input, см. reject()).
+    """
+
+    def __init__(self, max_buffer=MAX_INPUT_BUFFER, max_debt=MAX_INPUT_DEBT):
+        self.max_buffer = max_buffer
+        self.max_debt = max_debt
+        self.lock = threading.Lock()
+        self.frames = deque()  # (seq, bits) в порядке seq
+        self.last_received = 0  # seq последнего принятого кадра
+        self.ack_seq = 0  # seq последнего учтённого кадра (уходит клиенту как ack_input)
+        self.last_bits = 0
+        self.debt = 0
+        self.carry_shoot = False
+        self.stats = {
+            'packets': 0,
+            'frames': 0,
+            'applied': 0,
+            'repeated': 0,
+            'skipped': 0,
+            'overflow': 0,
+            'stale': 0,
+            'bad': 0,
+        }
+
+    def reject(self):
+        """Учитывает испорченную пачку, которую не стали принимать."""
+        with self.lock:
+            self.stats['bad'] += 1
+
+    def push(self, seq, runs):
+        """Принимает пачку кадров из сообщения input."""
+        with self.lock:
+            stats = self.stats
+            stats['packets'] += 1
+            cap = self.max_buffer + self.max_debt
+            for bits, count in runs:
+                if count > cap:
+                    # Длиннее буфера и долга серия всё равно не понадобится:
+                    # начало серии сразу уходит в переполнение, seq идёт дальше
+                    stats['overflow'] += count - cap
+                    seq += count - cap
+                    count = cap
+                for _ in range(count):
+                    if seq <= self.last_received:
+                        stats['stale'] += 1  # Повтор уже принятого кадра
+                    else:
+                        self.last_received = seq
+                        stats['frames'] += 1
+                        if self.debt:
+                            # Тик за этот кадр уже прошёл с повтором прошлого ввода
+                            self.debt -= 1
+                            self.ack_seq = seq
+                            self.last_bits = bits & ~IN_SHOOT
+                            self.carry_shoot = self.carry_shoot or bool(bits & IN_SHOOT)
+                            stats['skipped'] += 1
+                        else:
+                            self.frames.append((seq, bits))
+                    seq += 1
+            if len(self.frames) > self.max_buffer:
+                # Клиент убежал вперёд — не копим задержку, берём свежие кадры
+                while len(self.frames) > self.max_buffer:
+                    self.ack_seq = self.frames.popleft()[0]
+                    stats['overflow'] += 1
+
+    @property
+    def acked(self):
+        """Сколько кадров клиента уже отражено в состоянии корабля (ack_input).
+
+        Тики в долг сыграны повтором последнего ввода за ещё не пришедшие кадры —
+        клиенту их переигрывать не нужно.
+        """
+        with self.lock:
+            return self.ack_seq + self.debt
+
+    def next_bits(self):
+        """Биты управления на текущий тик."""
+        with self.lock:
+            if self.frames:
+                seq, bits = self.frames.popleft()
+                self.ack_seq = seq
+                self.last_bits = bits & ~IN_SHOOT
+                self.stats['applied'] += 1
+            else:
+                bits = self.last_bits
+                if self.last_received:
+                    # До первого кадра долга нет: клиенту ещё нечем за эти тики "платить"
+                    self.debt = min(self.debt + 1, self.max_debt)
+                    self.stats['repeated'] += 1
+            if self.carry_shoot:
+                bits |= IN_SHOOT
+                self.carry_shoot = False
+            return bits
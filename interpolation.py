@@ -0,0 +1,126 @@
+# interpolation.py
+import threading
+from collections import deque
+
+from settings import WIDTH, HEIGHT, FPS
+from spatialhash import torus_delta
+
+INTERP_DELAY = 0.1  # Секунд, на которые отрисовка отстаёт от сервера (2 снимка при 20 Гц)
+MAX_EXTRAPOLATION = 0.25  # Дольше этого снимки не "дотягиваем" по скорости, а замираем
+OFFSET_DRIFT = 0.02  # Как быстро оценка часов сервера следует за растущей задержкой
+INTERP_KINDS = ('ships', 'asteroids', 'lasers')
+
+
+def lerp_pos(a, b, t):
+    """Позиция между a и b с учётом переноса через края поля."""
+    x = a[0] + torus_delta(b[0] - a[0], WIDTH) * t
+    y = a[1] + torus_delta(b[1] - a[1], HEIGHT) * t
+    return [x % WIDTH, y % HEIGHT]
+
+
+def lerp_angle(a, b, t):
+    """Угол между a и b по кратчайшей дуге."""
+    return a + ((b - a + 180) % 360 - 180) * t
+
+
+def extrapolate(rec, ticks):
+    """Запись сущности, сдвинутая по скорости на ticks тиков."""
+    vel = rec.get('vel')
+    if not vel or not ticks:
+        return rec
+    moved = dict(rec)
+    pos = rec['pos']
+    moved['pos'] = [(pos[0] + vel[0] * ticks) % WIDTH, (pos[1] + vel[1] * ticks) % HEIGHT]
+    return moved
+
+
+class SnapshotBuffer:
+    """Клиентский буфер снимков для плавной отрисовки удалённых сущностей.
+
+    Снимки хранятся по seq (тик сервера). Часы сервера оцениваются по времени
+    прихода: смещение "локальное время - seq / tick_rate" берётся по самому
+    быстрому из недавних снимков. Отрисовка идёт в момент "сервер минус
+    delay": между двумя соседними снимками позиции и углы интерполируются,
+    а если новый снимок опаздывает — сущности недолго летят по скорости vel.
+
+    Счётчики в stats: samples, interpolated, extrapolated, stalled (снимков не
+    хватило и дальше MAX_EXTRAPOLATION картинка замерла).
+    """
+
+    def __init__(self, tick_rate=FPS, delay=INTERP_DELAY, size=32):
+        self.tick_rate = tick_rate
+        self.delay = delay
+        self.snapshots = deque(maxlen=size)
+        self.offset = None
+        self.lock = threading.Lock()  # push() — из потока приёма, sample() — из цикла отрисовки
+        self.stats = {'samples': 0, 'interpolated': 0, 'extrapolated': 0, 'stalled': 0}
+
+    def clear(self):
+        with self.lock:
+            self.snapshots.clear()
+            self.offset = None
+
+    def push(self, snapshot, now):
+        """Добавляет собранный снимок, пришедший в момент now (time.monotonic)."""
+        sample = now - snapshot['seq'] / self.tick_rate
+        with self.lock:
+            if self.snapshots and snapshot['seq'] <= self.snapshots[-1]['seq']:
+                return  # Устаревший или повторный снимок
+            self.snapshots.append(snapshot)
+            if self.offset is None or sample < self.offset:
+                self.offset = sample
+            else:
+                self.offset += (sample - self.offset) * OFFSET_DRIFT
+
+    def render_tick(self, now):
+        """Тик сервера (дробный), который показываем в момент now."""
+        return (now - self.offset - self.delay) * self.tick_rate
+
+    def sample(self, now):
+        """Состояние для отрисовки: {'ships': [...], 'asteroids': [...], 'lasers': [...]} или None."""
+        with self.lock:
+            if not self.snapshots:
+                return None
+            snapshots = list(self.snapshots)
+            tick = self.render_tick(now)
+        self.stats['samples'] += 1
+
+        newest = snapshots[-1]
+        if tick >= newest['seq']:
+            ahead = tick - newest['seq']
+            limit = MAX_EXTRAPOLATION * self.tick_rate
+            if ahead > limit:
+                self.stats['stalled'] += 1
+                ahead = limit
+            else:
+                self.stats['extrapolated'] += 1
+            return {kind: [extrapolate(rec, ahead) for rec in newest[kind].values()]
+                    for kind in INTERP_KINDS}
+
+        older = snapshots[0]
+        if tick <= older['seq']:
+            return {kind: list(older[kind].values()) for kind in INTERP_KINDS}
+
+        for newer in snapshots[1:]:
+            if newer['seq'] >= tick:
+                break
+            older = newer
+        t = (tick - older['seq']) / (newer['seq'] - older['seq'])
+        self.stats['interpolated'] += 1
+
+        state = {}
+        for kind in INTERP_KINDS:
+            before = older[kind]
+            records = []
+            # Только сущности из обоих снимков: новые появятся, когда до них дойдёт время
+            for eid, rec in newer[kind].items():
+                old = before.get(eid)
+                if old is None:
+                    continue
+                mixed = dict(rec)
+                mixed['pos'] = lerp_pos(old['pos'], rec['pos'], t)
+                if 'angle' in rec:
+                    mixed['angle'] = lerp_angle(old['angle'], rec['angle'], t)
+                records.append(mixed)
+            state[kind] = records
+        return state
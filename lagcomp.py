@@ -0,0 +1,115 @@
+# lagcomp.py
+# Компенсация задержки при попаданиях лазеров.
+#
+# Сервер раз в PING_INTERVAL шлёт каждому клиенту {"event": "ping", "payload": {"id": 7}},
+# клиент сразу отвечает {"action": "pong", "payload": {"id": 7}} — так у слота есть RTT.
+# Стрелок видит соперника с опозданием: снимок идёт к нему полпути RTT и ещё INTERP_DELAY
+# ждёт в буфере интерполяции, а его выстрел идёт к серверу вторые полпути. Поэтому лазер
+# проверяется не по текущим позициям чужих кораблей, а по позициям rtt + INTERP_DELAY
+# назад (не дальше MAX_REWIND) из кольцевого буфера ShipHistory. Откат запоминается
+# лазером при выстреле (rewind_of в laser.py) и не меняется весь полёт: на тике T лазер
+# сверяется с позициями тика T - откат, как их и видит стрелок, даже если его RTT потом
+# изменился.
+import math
+from collections import deque
+
+from interpolation import INTERP_DELAY
+
+PING_INTERVAL = 1.0  # Секунд между ping одному клиенту
+MAX_PENDING_PINGS = 8  # Столько неотвеченных ping помним; более старые считаем потерянными
+MAX_REWIND = 0.3  # Секунд: дальше в прошлое цели не откатываем, даже при большом пинге
+
+
+def rewind_ticks(rtt, tick_rate, max_rewind=MAX_REWIND, view_delay=INTERP_DELAY):
+    """На сколько тиков откатывать цели для стрелка с данным RTT (None — не откатывать)."""
+    if rtt is None:
+        return 0
+    return round(min(rtt + view_delay, max_rewind) * tick_rate)
+
+
+def history_size(tick_rate, max_rewind=MAX_REWIND):
+    """Сколько тиков истории нужно, чтобы откатиться на max_rewind секунд."""
+    return math.ceil(max_rewind * tick_rate) + 1
+
+
+class PingTracker:
+    """RTT одного соединения по ping/pong.
+
+    Время отправки хранится на сервере, клиент только возвращает id —
+    его часам доверять не нужно.
+
+    Счётчики в stats: pings, pongs, lost, rtt (сглаженный), min_rtt, max_rtt.
+    """
+
+    def __init__(self, interval=PING_INTERVAL):
+        self.interval = interval
+        self.next_ping = 0.0
+        self.next_id = 0
+        self.pending = {}  # id -> время отправки
+        self.rtt = None
+        self.stats = {
+            'pings': 0,
+            'pongs': 0,
+            'lost': 0,
+            'rtt': None,
+            'min_rtt': None,
+            'max_rtt': None,
+        }
+
+    def poll(self, now):
+        """payload очередного ping или None, если ещё рано."""
+        if now < self.next_ping:
+            return None
+        self.next_ping = now + self.interval
+        self.next_id += 1
+        self.pending[self.next_id] = now
+        if len(self.pending) > MAX_PENDING_PINGS:
+            del self.pending[min(self.pending)]
+            self.stats['lost'] += 1
+        self.stats['pings'] += 1
+        return {'id': self.next_id}
+
+    def on_pong(self, now, ping_id):
+        sent = self.pending.pop(ping_id, None)
+        if sent is None:
+            return  # Чужой, повторный или уже потерянный ответ
+        sample = now - sent
+        self.rtt = sample if self.rtt is None else self.rtt * 0.75 + sample * 0.25
+        stats = self.stats
+        stats['pongs'] += 1
+        stats['rtt'] = self.rtt
+        stats['min_rtt'] = sample if stats['min_rtt'] is None else min(stats['min_rtt'], sample)
+        stats['max_rtt'] = sample if stats['max_rtt'] is None else max(stats['max_rtt'], sample)
+
+
+class ShipHistory:
+    """Кольцевой буфер позиций кораблей по тикам.
+
+    Тики записываются подряд (раз в GameLogic.update), поэтому нужный кадр
+    находится по разнице номеров без поиска.
+
+    Счётчики в stats: lookups, clamped (запрошенный тик старше буфера).
+    """
+
+    def __init__(self, size):
+        self.frames = deque(maxlen=size)  # (tick, [(x, y, is_respawning), ...])
+        self.stats = {'lookups': 0, 'clamped': 0}
+
+    def record(self, tick, ships):
+        self.frames.append((tick, [(s.rect.centerx, s.rect.centery, s.is_respawning) for s in ships]))
+
+    def at(self, tick):
+        """Позиции кораблей на тике tick (или на самом старом из сохранённых); None, если пусто."""
+        if not self.frames:
+            return None
+        self.stats['lookups'] += 1
+        back = self.frames[-1][0] - tick
+        if back <= 0:
+            return self.frames[-1][1]
+        if back >= len(self.frames):
+            self.stats['clamped'] += 1
+            return self.frames[0][1]
+        return self.frames[-1 - back][1]
+
+    def clear(self):
+        self.frames.clear()
@@ -1,39 +1,235 @@
 # laser.py
 import math
-import pygame
-from utils import WIDTH, HEIGHT, YELLOW
+from settings import WIDTH, HEIGHT
+
+try:
+    import numpy as np
+except ImportError:  # numpy нужен только для ArrayLaserManager
+    np = None
+
+LASER_SPEED = 10
+
+
+def laser_velocity(angle, speed=LASER_SPEED):
+    """Скорость лазера, выпущенного под углом angle (в градусах)."""
+    return speed * math.cos(math.radians(angle)), -speed * math.sin(math.radians(angle))
 
 
 class LaserManager:
-    """Класс-менеджер для хранения и управления всеми лазерами."""
+    """Класс-менеджер для хранения и управления всеми лазерами.
+
+    Попадания в коде столкновений помечаются через mark_hit(index) и удаляются
+    пачкой в flush(), поэтому индексы лазеров валидны от update() до flush().
+    """
 
     def __init__(self):
         self.lasers = []
+        self._hits = set()
+        self.next_id = 0  # Стабильные id лазеров (для дельт снимков)
 
-    def shoot_laser(self, x, y, angle, owner_id):
-        """Добавляет лазер в список."""
-        speed = 10
-        dx = speed * math.cos(math.radians(angle))
-        dy = -speed * math.sin(math.radians(angle))
+    def __len__(self):
+        return len(self.lasers)
+
+    def shoot_laser(self, x, y, angle, owner_id, rewind=0):
+        """Добавляет лазер в список. rewind — откат целей стрелка в тиках (см. rewind_of)."""
+        dx, dy = laser_velocity(angle)
         laser = {
+            'id': self.next_id,
             'pos': [x, y],
             'vel': [dx, dy],
             'owner': owner_id,
+            'rewind': rewind,
         }
+        self.next_id += 1
         self.lasers.append(laser)
 
     def update(self):
         """Обновляет позиции лазеров и удаляет вышедшие за экран."""
-        for laser in self.lasers[:]:
+        alive = []
+        for laser in self.lasers:
             laser['pos'][0] += laser['vel'][0]
             laser['pos'][1] += laser['vel'][1]
 
-            # Удаляем лазеры, вышедшие за границы
-            if not (0 <= laser['pos'][0] <= WIDTH and 0 <= laser['pos'][1] <= HEIGHT):
-                self.lasers.remove(laser)
+            # Оставляем только лазеры в пределах экрана
+            if 0 <= laser['pos'][0] <= WIDTH and 0 <= laser['pos'][1] <= HEIGHT:
+                alive.append(laser)
+        self.lasers = alive
+        self._hits.clear()
+
+    def iter_lasers(self):
+        """Итерация по лазерам: (index, x, y, owner)."""
+        for i, laser in enumerate(self.lasers):
+            yield i, laser['pos'][0], laser['pos'][1], laser['owner']
+
+    def rewind_of(self, index):
+        """Откат целей (в тиках), записанный лазеру index при выстреле.
+
+        Весь полёт лазер проверяется по чужим кораблям на столько тиков назад:
+        проверяемый тик идёт вместе с настоящим и совпадает с тем, что видел стрелок.
+        """
+        return self.lasers[index]['rewind']
+
+    def mark_hit(self, index):
+        """Помечает лазер как попавший; удаление произойдёт в flush()."""
+        self._hits.add(index)
+
+    def is_hit(self, index):
+        return index in self._hits
+
+    def flush(self):
+        """Удаляет все помеченные лазеры за один проход."""
+        if self._hits:
+            self.lasers = [laser for i, laser in enumerate(self.lasers) if i not in self._hits]
+            self._hits.clear()
+
+    def clear(self):
+        self.lasers.clear()
+        self._hits.clear()
+
+    def positions(self):
+        """Позиции (x, y) лазеров — для отрисовки."""
+        return (laser['pos'] for laser in self.lasers)
 
     def draw(self, screen):
-        """Отрисовка лазеров."""
-        for laser in self.lasers:
-            x, y = laser['pos']
-            pygame.draw.circle(screen, YELLOW, (int(x), int(y)), 3)
+        """Отрисовка лазеров (только на клиенте)."""
+        from render import draw_lasers
+        draw_lasers(screen, self.positions())
+
+
+class ArrayLaserManager:
+    """Компактное хранилище лазеров на numpy (ёмкость растёт по мере надобности).
+
+    Позиции, скорости, владельцы и тик выстрела лежат в массивах, живые лазеры
+    занимают первые ``count`` строк. update() сдвигает все лазеры одной
+    векторной операцией и одной маской отбрасывает вылетевшие за экран,
+    отжившие (max_lifetime тиков) и помеченные через mark_hit().
+    """
+
+    def __init__(self, capacity=256, max_lifetime=None):
+        if np is None:
+            raise ImportError("ArrayLaserManager requires numpy")
+        self.capacity = capacity
+        self.max_lifetime = max_lifetime  # В тиках; None — живёт до выхода за экран
+        self.tick = 0
+        self.count = 0
+        self.pos = np.zeros((capacity, 2), dtype=np.float64)
+        self.vel = np.zeros((capacity, 2), dtype=np.float64)
+        self.owner = np.zeros(capacity, dtype=np.int32)
+        self.spawn_tick = np.zeros(capacity, dtype=np.int64)
+        self.lifetime = np.zeros(capacity, dtype=np.int64)  # 0 — без ограничения
+        self.rewind = np.zeros(capacity, dtype=np.int64)  # Откат целей стрелка в тиках на момент выстрела
+        self.hit = np.zeros(capacity, dtype=bool)
+        self.ids = np.zeros(capacity, dtype=np.int64)  # Стабильные id (для дельт снимков)
+        self.next_id = 0
+        self._bounds = np.array([WIDTH, HEIGHT], dtype=np.float64)
+
+    def __len__(self):
+        return self.count
+
+    def _grow(self):
+        """Удваивает ёмкость массивов — выстрелы не теряются, как и в LaserManager."""
+        new_capacity = self.capacity * 2
+        for name in ('pos', 'vel', 'owner', 'spawn_tick', 'lifetime', 'rewind', 'hit', 'ids'):
+            old = getattr(self, name)
+            new = np.zeros((new_capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.count] = old[:self.count]
+            setattr(self, name, new)
+        self.capacity = new_capacity
+
+    def shoot_laser(self, x, y, angle, owner_id, lifetime=None, rewind=0):
+        """Добавляет лазер (при заполненном хранилище ёмкость удваивается).
+
+        rewind — откат целей стрелка в тиках (см. rewind_of).
+        """
+        if self.count == self.capacity:
+            self._grow()
+        i = self.count
+        self.pos[i] = (x, y)
+        self.vel[i] = laser_velocity(angle)
+        self.owner[i] = owner_id
+        self.spawn_tick[i] = self.tick
+        if lifetime is None:
+            lifetime = self.max_lifetime
+        self.lifetime[i] = lifetime or 0
+        self.rewind[i] = rewind
+        self.hit[i] = False
+        self.ids[i] = self.next_id
+        self.next_id += 1
+        self.count += 1
+        return True
+
+    def update(self):
+        """Сдвигает лазеры и удаляет лишние одной маской."""
+        self.tick += 1
+        n = self.count
+        if n == 0:
+            return
+        pos = self.pos[:n]
+        pos += self.vel[:n]
+
+        lifetime = self.lifetime[:n]
+        keep = ((pos >= 0) & (pos <= self._bounds)).all(axis=1)
+        keep &= (lifetime == 0) | (self.tick - self.spawn_tick[:n] < lifetime)
+        keep &= ~self.hit[:n]
+        self._compact(keep)
+
+    def _compact(self, keep):
+        """Сдвигает оставшиеся лазеры в начало массивов (порядок сохраняется)."""
+        n = self.count
+        k = int(keep.sum())
+        if k == n:
+            return
+        for arr in (self.pos, self.vel, self.owner, self.spawn_tick, self.lifetime, self.rewind, self.ids):
+            arr[:k] = arr[:n][keep]
+        self.hit[:k] = False
+        self.count = k
+
+    def get_bulk(self):
+        """Представления (views) живых строк: (pos[n, 2], owner[n])."""
+        n = self.count
+        return self.pos[:n], self.owner[:n]
+
+    def iter_lasers(self):
+        """Итерация по лазерам: (index, x, y, owner)."""
+        n = self.count
+        for i, ((x, y), owner) in enumerate(zip(self.pos[:n].tolist(), self.owner[:n].tolist())):
+            yield i, x, y, owner
+
+    def rewind_of(self, index):
+        """Откат целей (в тиках), записанный лазеру index при выстреле (как в LaserManager)."""
+        return int(self.rewind[index])
+
+    def mark_hit(self, index):
+        """Помечает лазер как попавший; удаление произойдёт в flush()."""
+        self.hit[index] = True
+
+    def is_hit(self, index):
+        return bool(self.hit[index])
+
+    def flush(self):
+        """Удаляет все помеченные лазеры за один проход."""
+        n = self.count
+        if n and self.hit[:n].any():
+            self._compact(~self.hit[:n])
+
+    def clear(self):
+        self.count = 0
+
+    @property
+    def lasers(self):
+        """Совместимость со списочным API: список словарей (копия, только чтение)."""
+        n = self.count
+        return [
+            {'id': eid, 'pos': pos, 'vel': vel, 'owner': owner}
+            for eid, pos, vel, owner in zip(self.ids[:n].tolist(), self.pos[:n].tolist(),
+                                            self.vel[:n].tolist(), self.owner[:n].tolist())
+        ]
+
+    def positions(self):
+        """Позиции (x, y) лазеров — для отрисовки."""
+        return self.pos[:self.count].tolist()
+
+    def draw(self, screen):
+        """Отрисовка лазеров (только на клиенте)."""
+        from render import draw_lasers
+        draw_lasers(screen, self.positions())
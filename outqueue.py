@@ -0,0 +1,120 @@
+# outqueue.py
+import threading
+from collections import deque
+
+MAX_QUEUED_MESSAGES = 32
+
+
+class OutboundQueue:
+    """Ограниченная очередь исходящих сообщений одного клиента.
+
+    Политика при переполнении:
+      - управляющие события (game_over, hello_ack, ...) не выбрасываются никогда;
+      - снимки update_state (droppable=True) вытесняют друг друга: в очереди
+        остаётся только самый свежий, старые считаются в dropped_snapshots.
+
+    Счётчики в stats:
+      depth             — сообщений в очереди сейчас;
+      bytes_in_flight   — байт в очереди, ещё не записанных в сокет;
+      dropped_snapshots — выброшено устаревших снимков;
+      sent_messages / sent_bytes — отдано писателю.
+    """
+
+    def __init__(self, max_messages=MAX_QUEUED_MESSAGES):
+        self.max_messages = max_messages
+        self.items = deque()  # (data, droppable)
+        self.stats = {
+            'depth': 0,
+            'bytes_in_flight': 0,
+            'dropped_snapshots': 0,
+            'sent_messages': 0,
+            'sent_bytes': 0,
+        }
+
+    def __len__(self):
+        return len(self.items)
+
+    def put(self, data, droppable=False):
+        """Ставит сообщение в очередь, применяя политику вытеснения снимков."""
+        stats = self.stats
+        if droppable and len(self.items) >= self.max_messages:
+            kept = deque()
+            for item in self.items:
+                if item[1]:
+                    stats['dropped_snapshots'] += 1
+                    stats['bytes_in_flight'] -= len(item[0])
+                else:
+                    kept.append(item)
+            self.items = kept
+        self.items.append((data, droppable))
+        stats['bytes_in_flight'] += len(data)
+        stats['depth'] = len(self.items)
+
+    def pop_batch(self):
+        """Забирает всё содержимое очереди одним блоком байт (или None, если пусто)."""
+        if not self.items:
+            return None
+        batch = b''.join(data for data, _ in self.items)
+        self.stats['sent_messages'] += len(self.items)
+        self.items.clear()
+        self.stats['depth'] = 0
+        return batch
+
+    def written(self, nbytes):
+        """Отмечает, что nbytes действительно ушли в сокет."""
+        self.stats['bytes_in_flight'] -= nbytes
+        self.stats['sent_bytes'] += nbytes
+
+
+class QueuedConnection:
+    """Сокет с собственным потоком-писателем и очередью OutboundQueue.
+
+    Игровой цикл только кладёт данные в очередь (send) и никогда не ждёт
+    сеть; блокирующий sendall выполняется в потоке этого соединения.
+    """
+
+    def __init__(self, sock, max_messages=MAX_QUEUED_MESSAGES):
+        self.sock = sock
+        self.queue = OutboundQueue(max_messages)
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self.thread.start()
+
+    @property
+    def stats(self):
+        return self.queue.stats
+
+    def send(self, data, droppable=False):
+        with self.cond:
+            if self.closed:
+                raise ConnectionError("connection is closed")
+            self.queue.put(data, droppable)
+            self.cond.notify()
+
+    def writer_loop(self):
+        while True:
+            with self.cond:
+                while not self.queue and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    return
+                batch = self.queue.pop_batch()
+            try:
+                self.sock.sendall(batch)
+            except OSError as e:
+                print(f"[SERVER] Connection writer failed: {e}")
+                with self.cond:
+                    self.closed = True
+                return
+            with self.cond:
+                self.queue.written(len(batch))
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify()
+        try:
+            self.sock.close()
+        except OSError:
+            pass
@@ -0,0 +1,62 @@
+# prediction.py
+import math
+from collections import deque
+
+from inputs import movement_flags
+
+PREDICTION_BUFFER = 128  # Сколько неподтверждённых кадров ввода помним (~2 с при 60 FPS)
+
+
+class ShipPredictor:
+    """Предсказание своего корабля на клиенте со сверкой по серверу.
+
+    Клиент двигает корабль сразу по своему вводу и запоминает кадры в
+    кольцевом буфере. Когда приходит снимок, корабль ставится в присланное
+    сервером состояние, кадры с seq <= ack_input выбрасываются (сервер их уже
+    учёл), а оставшиеся проигрываются поверх — корабль не "отскакивает" назад
+    при задержке.
+
+    Счётчики в stats:
+      reconciles  — сверок со снимками;
+      replayed    — проиграно кадров поверх серверного состояния;
+      corrections — сверок, после которых позиция разошлась с предсказанной;
+      max_error   — наибольшее расхождение в пикселях.
+    """
+
+    def __init__(self, size=PREDICTION_BUFFER):
+        self.history = deque(maxlen=size)  # (seq, bits)
+        self.stats = {
+            'reconciles': 0,
+            'replayed': 0,
+            'corrections': 0,
+            'max_error': 0.0,
+        }
+
+    def record(self, seq, bits):
+        """Запоминает кадр ввода, уже применённый к кораблю локально."""
+        self.history.append((seq, bits))
+
+    def reconcile(self, ship, server_ship):
+        """Ставит ship в серверное состояние и проигрывает неподтверждённые кадры."""
+        ack = server_ship.get('ack_input', 0)
+        history = self.history
+        while history and history[0][0] <= ack:
+            history.popleft()
+
+        predicted = ship.rect.center
+        ship.rect.center = server_ship['pos']
+        ship.angle = round(server_ship['angle'])  # Сервер поворачивает на целые градусы
+        if not ship.is_respawning:
+            for _, bits in history:
+                ship.move(*movement_flags(bits))
+
+        stats = self.stats
+        stats['reconciles'] += 1
+        stats['replayed'] += len(history)
+        error = math.hypot(ship.rect.centerx - predicted[0], ship.rect.centery - predicted[1])
+        if error:
+            stats['corrections'] += 1
+            stats['max_error'] = max(stats['max_error'], error)
+
+    def clear(self):
+        self.history.clear()
@@ -0,0 +1,389 @@
+# protocol.py
+# Кодеки сообщений клиент <-> сервер.
+#
+# По умолчанию стороны обмениваются JSON-строками, разделёнными '\n' (JsonCodec).
+# Клиент может предложить в hello список кодеков ('codecs': ['bin1', 'json']);
+# сервер отвечает событием hello_ack с выбранным кодеком, и дальше обе стороны
+# пишут и читают в нём. Сам hello и hello_ack всегда идут в JSON.
+#
+# Формат bin1 (BinaryCodec): кадр = длина (uint32, big-endian) + тип (uint8) + тело.
+# Частые сообщения (update_position, shoot, input, ack, update_state) упакованы struct'ом
+# с квантованием координат (1/8 px) и углов (360° -> uint16); всё остальное
+# (и сообщения с неизвестными полями) идёт кадром T_JSON с JSON-телом.
+import json
+import struct
+
+from framing import LineReader, LengthPrefixedReader, MAX_FRAME_SIZE
+
+JSON_CODEC = 'json'
+BINARY_CODEC = 'bin1'
+
+POS_SCALE = 8  # Координаты передаются в 1/8 пикселя
+ANGLE_SCALE = 65536 / 360  # Угол 0..360 -> 0..65535
+
+T_JSON = 0
+T_UPDATE_POSITION = 1
+T_SHOOT = 2
+T_ACK = 3
+T_UPDATE_STATE = 4
+T_INPUT = 5
+
+_JSON_STATE_PREFIX = b'{"event": "update_state"'  # Начало снимка в JsonCodec (см. _json_is_state)
+_JSON_STATE_EVENT = b'"update_state"'
+NO_SEQ = 0xFFFFFFFF  # seq=None в T_ACK / base=None в T_UPDATE_STATE
+
+_FRAME_HEADER = struct.Struct('!IB')
+_POSITION = struct.Struct('!hhH')
+_SEQ = struct.Struct('!I')
+_STATE_HEADER = struct.Struct('!IIhhH')
+_COUNTS = struct.Struct('!HHH')
+_RECORD_HEADER = struct.Struct('!IB')
+_INPUT_HEADER = struct.Struct('!IB')  # seq первого кадра, число серий
+_INPUT_RUN = struct.Struct('!BH')  # биты, число кадров
+
+
+def _pack_pos(pos):
+    return int(round(pos[0] * POS_SCALE)), int(round(pos[1] * POS_SCALE))
+
+
+def _unpack_pos(x, y):
+    return [x / POS_SCALE, y / POS_SCALE]
+
+
+def _pack_angle(angle):
+    return int(round((angle % 360) * ANGLE_SCALE)) & 0xFFFF
+
+
+def _unpack_angle(value):
+    return value / ANGLE_SCALE
+
+
+# Поля сущностей в T_UPDATE_STATE: (имя, struct-формат, упаковка, распаковка).
+# Порядок полей задаёт биты маски в заголовке записи.
+_FIELD_CODECS = {
+    'pos': ('hh', _pack_pos, _unpack_pos),
+    'vel': ('ff', tuple, lambda x, y: [x, y]),
+    'angle': ('H', lambda a: (_pack_angle(a),), _unpack_angle),
+    'hp': ('h', lambda v: (v,), lambda v: v),
+    'shots': ('h', lambda v: (v,), lambda v: v),
+    'is_respawning': ('?', lambda v: (bool(v),), lambda v: v),
+    'is_reloading': ('?', lambda v: (bool(v),), lambda v: v),
+    'radius': ('H', lambda v: (int(v),), lambda v: v),
+    'color': ('BBB', tuple, lambda r, g, b: [r, g, b]),
+    'owner': ('B', lambda v: (v,), lambda v: v),
+    'ack_input': ('I', lambda v: (v,), lambda v: v),
+}
+ENTITY_FIELDS = {
+    'ships': ('pos', 'angle', 'hp', 'shots', 'is_respawning', 'is_reloading', 'ack_input', 'vel'),
+    'asteroids': ('pos', 'vel', 'radius', 'color'),
+    'lasers': ('pos', 'vel', 'owner'),
+}
+_FIELD_STRUCTS = {name: struct.Struct('!' + fmt) for name, (fmt, _, _) in _FIELD_CODECS.items()}
+
+# Записи spawn содержат все поля вида — их пакуем одним Struct без маски
+
+
+def _ship_args(rec):
+    x, y = _pack_pos(rec['pos'])
+    return (rec['id'], x, y, _pack_angle(rec['angle']), rec['hp'], rec['shots'],
+            bool(rec['is_respawning']), bool(rec['is_reloading']), rec['ack_input'],
+            rec['vel'][0], rec['vel'][1])
+
+
+def _ship_rec(t):
+    return {'id': t[0], 'pos': [t[1] / POS_SCALE, t[2] / POS_SCALE], 'angle': t[3] / ANGLE_SCALE,
+            'hp': t[4], 'shots': t[5], 'is_respawning': t[6], 'is_reloading': t[7], 'ack_input': t[8],
+            'vel': [t[9], t[10]]}
+
+
+def _asteroid_args(rec):
+    pos, vel, color = rec['pos'], rec['vel'], rec['color']
+    return (rec['id'], int(round(pos[0] * POS_SCALE)), int(round(pos[1] * POS_SCALE)),
+            vel[0], vel[1], int(rec['radius']), color[0], color[1], color[2])
+
+
+def _asteroid_rec(t):
+    return {'id': t[0], 'pos': [t[1] / POS_SCALE, t[2] / POS_SCALE], 'vel': [t[3], t[4]],
+            'radius': t[5], 'color': [t[6], t[7], t[8]]}
+
+
+def _laser_args(rec):
+    pos, vel = rec['pos'], rec['vel']
+    return (rec['id'], int(round(pos[0] * POS_SCALE)), int(round(pos[1] * POS_SCALE)),
+            vel[0], vel[1], rec['owner'])
+
+
+def _laser_rec(t):
+    return {'id': t[0], 'pos': [t[1] / POS_SCALE, t[2] / POS_SCALE], 'vel': [t[3], t[4]], 'owner': t[5]}
+
+
+_SPAWN_CODECS = {
+    'ships': (struct.Struct('!IhhHhh??Iff'), _ship_args, _ship_rec),
+    'asteroids': (struct.Struct('!IhhffHBBB'), _asteroid_args, _asteroid_rec),
+    'lasers': (struct.Struct('!IhhffB'), _laser_args, _laser_rec),
+}
+
+
+def _json_is_state(data):
+    """JSON-сообщение в data — update_state.
+
+    Быстрый путь — начало строки, как его пишет JsonCodec.encode. Если начало
+    другое (иной порядок ключей или пробелы), но "update_state" в строке есть,
+    сообщение разбирается: иначе смена кодировщика молча отключила бы
+    пропуск устаревших снимков на клиенте.
+    """
+    if data[:len(_JSON_STATE_PREFIX)] == _JSON_STATE_PREFIX:
+        return True
+    data = bytes(data)
+    if _JSON_STATE_EVENT not in data:
+        return False
+    try:
+        msg = json.loads(data)
+    except ValueError:
+        return False
+    return isinstance(msg, dict) and msg.get('event') == 'update_state'
+
+
+class JsonCodec:
+    """Исходный протокол: одна JSON-строка на сообщение."""
+
+    name = JSON_CODEC
+
+    def encode(self, message):
+        return (json.dumps(message) + '\n').encode('utf-8')
+
+    def decoder(self):
+        return JsonDecoder()
+
+
+class StreamDecoder:
+    """Общая часть декодеров: поток режется на кадры FrameReader'ом (см. framing.py).
+
+    feed(data) — для уже прочитанных байт; recv_into(sock) + messages() — чтение
+    из сокета прямо в буфер декодера. Кадр длиннее max_frame — FrameTooLarge.
+    Клиент может сам перебрать frames() и разбирать decode() только нужные кадры
+    (is_state() отличает update_state без разбора).
+    """
+
+    def __init__(self, reader):
+        self.reader = reader
+
+    def feed(self, data):
+        """Добавляет байты, возвращает список полностью принятых сообщений."""
+        self.reader.feed(data)
+        return self.messages()
+
+    def append(self, data):
+        """Добавляет байты без разбора (кадры — через frames())."""
+        self.reader.feed(data)
+
+    def frames(self):
+        return self.reader.frames()
+
+    def recv_into(self, sock):
+        """Читает из сокета в буфер. Возвращает число байт (0 — соединение закрыто)."""
+        return self.reader.recv_into(sock)
+
+    def messages(self):
+        """Список сообщений из полностью принятых кадров."""
+        return [msg for msg in map(self.decode, self.reader.frames()) if msg is not None]
+
+    def decode(self, frame):
+        raise NotImplementedError
+
+    def is_state(self, frame):
+        """Кадр — update_state (проверка без разбора сообщения)."""
+        raise NotImplementedError
+
+
+class JsonDecoder(StreamDecoder):
+    """Построчный разбор JSON из потока байт."""
+
+    def __init__(self, max_frame=MAX_FRAME_SIZE):
+        super().__init__(LineReader(max_frame))
+
+    def decode(self, frame):
+        line = bytes(frame).strip()
+        if not line:
+            return None
+        try:
+            return json.loads(line)
+        except json.JSONDecodeError as e:
+            print(f"[PROTOCOL] JSON decode error: {e}, line={line!r}")
+            return None
+
+    def is_state(self, frame):
+        return _json_is_state(frame)
+
+
+class _UnsupportedFields(Exception):
+    """В записи есть поле без бинарного кодека — сообщение уйдёт в JSON."""
+
+
+def _encode_record(rec, fields):
+    mask = 0
+    parts = []
+    for bit, name in enumerate(fields):
+        if name in rec:
+            mask |= 1 << bit
+            pack_args = _FIELD_CODECS[name][1](rec[name])
+            parts.append(_FIELD_STRUCTS[name].pack(*pack_args))
+    if len(rec) - 1 != bin(mask).count('1'):
+        raise _UnsupportedFields()
+    return _RECORD_HEADER.pack(rec['id'], mask) + b''.join(parts)
+
+
+def _decode_record(view, offset, fields):
+    eid, mask = _RECORD_HEADER.unpack_from(view, offset)
+    offset += _RECORD_HEADER.size
+    rec = {'id': eid}
+    for bit, name in enumerate(fields):
+        if mask & (1 << bit):
+            st = _FIELD_STRUCTS[name]
+            rec[name] = _FIELD_CODECS[name][2](*st.unpack_from(view, offset))
+            offset += st.size
+    return rec, offset
+
+
+def _encode_state(payload):
+    base = payload.get('base')
+    score = payload.get('score', [0, 0])
+    parts = [_STATE_HEADER.pack(payload['seq'], NO_SEQ if base is None else base,
+                                score[0], score[1], payload.get('time_left', 0))]
+    for kind, fields in ENTITY_FIELDS.items():
+        delta = payload.get(kind, {})
+        spawn = delta.get('spawn', ())
+        change = delta.get('change', ())
+        despawn = delta.get('despawn', ())
+        parts.append(_COUNTS.pack(len(spawn), len(change), len(despawn)))
+        if spawn:
+            spawn_struct, to_args, _ = _SPAWN_CODECS[kind]
+            n_fields = len(fields) + 1
+            if any(len(rec) != n_fields for rec in spawn):
+                raise _UnsupportedFields()
+            pack = spawn_struct.pack
+            parts.append(b''.join([pack(*to_args(rec)) for rec in spawn]))
+        for rec in change:
+            parts.append(_encode_record(rec, fields))
+        if despawn:
+            parts.append(struct.pack(f'!{len(despawn)}I', *despawn))
+    return b''.join(parts)
+
+
+def _decode_state(view):
+    seq, base, score0, score1, time_left = _STATE_HEADER.unpack_from(view, 0)
+    offset = _STATE_HEADER.size
+    payload = {
+        'seq': seq,
+        'base': None if base == NO_SEQ else base,
+        'score': [score0, score1],
+        'time_left': time_left,
+    }
+    for kind, fields in ENTITY_FIELDS.items():
+        n_spawn, n_change, n_despawn = _COUNTS.unpack_from(view, offset)
+        offset += _COUNTS.size
+        delta = {}
+        if n_spawn:
+            spawn_struct, _, from_tuple = _SPAWN_CODECS[kind]
+            end = offset + spawn_struct.size * n_spawn
+            delta['spawn'] = [from_tuple(t) for t in spawn_struct.iter_unpack(view[offset:end])]
+            offset = end
+        if n_change:
+            records = []
+            for _ in range(n_change):
+                rec, offset = _decode_record(view, offset, fields)
+                records.append(rec)
+            delta['change'] = records
+        if n_despawn:
+            delta['despawn'] = list(struct.unpack_from(f'!{n_despawn}I', view, offset))
+            offset += 4 * n_despawn
+        if delta:
+            payload[kind] = delta
+    return payload
+
+
+class BinaryCodec:
+    """Компактный бинарный протокол bin1 с префиксом длины."""
+
+    name = BINARY_CODEC
+
+    def _frame(self, msg_type, body):
+        return _FRAME_HEADER.pack(len(body) + 1, msg_type) + body
+
+    def encode(self, message):
+        action = message.get('action')
+        event = message.get('event')
+        payload = message.get('payload', {})
+        try:
+            if action == 'update_position':
+                x, y = _pack_pos(payload['pos'])
+                return self._frame(T_UPDATE_POSITION, _POSITION.pack(x, y, _pack_angle(payload['angle'])))
+            if action == 'shoot':
+                return self._frame(T_SHOOT, b'')
+            if action == 'input':
+                runs = payload['runs']
+                body = _INPUT_HEADER.pack(payload['seq'], len(runs))
+                return self._frame(T_INPUT, body + b''.join([_INPUT_RUN.pack(b, n) for b, n in runs]))
+            if action == 'ack':
+                seq = payload.get('seq')
+                return self._frame(T_ACK, _SEQ.pack(NO_SEQ if seq is None else seq))
+            if event == 'update_state':
+                return self._frame(T_UPDATE_STATE, _encode_state(payload))
+        except (_UnsupportedFields, struct.error, KeyError):
+            pass
+        return self._frame(T_JSON, json.dumps(message).encode('utf-8'))
+
+    def decoder(self):
+        return BinaryDecoder()
+
+
+class BinaryDecoder(StreamDecoder):
+    """Разбор кадров bin1 из потока байт."""
+
+    def __init__(self, max_frame=MAX_FRAME_SIZE):
+        super().__init__(LengthPrefixedReader(max_frame))
+
+    def decode(self, frame):
+        return decode_frame(frame[0], frame[1:])
+
+    def is_state(self, frame):
+        if not len(frame):
+            return False
+        # Снимок с полями, которых нет в struct-формате, идёт кадром T_JSON
+        return frame[0] == T_UPDATE_STATE or (frame[0] == T_JSON and _json_is_state(frame[1:]))
+
+
+def decode_frame(msg_type, body):
+    """Сообщение (dict) из тела кадра bin1."""
+    if msg_type == T_UPDATE_POSITION:
+        x, y, angle = _POSITION.unpack_from(body, 0)
+        return {'action': 'update_position',
+                'payload': {'pos': _unpack_pos(x, y), 'angle': _unpack_angle(angle)}}
+    if msg_type == T_SHOOT:
+        return {'action': 'shoot', 'payload': {}}
+    if msg_type == T_INPUT:
+        seq, n_runs = _INPUT_HEADER.unpack_from(body, 0)
+        end = _INPUT_HEADER.size + _INPUT_RUN.size * n_runs
+        runs = [list(run) for run in _INPUT_RUN.iter_unpack(body[_INPUT_HEADER.size:end])]
+        return {'action': 'input', 'payload': {'seq': seq, 'runs': runs}}
+    if msg_type == T_ACK:
+        seq, = _SEQ.unpack_from(body, 0)
+        return {'action': 'ack', 'payload': {'seq': None if seq == NO_SEQ else seq}}
+    if msg_type == T_UPDATE_STATE:
+        return {'event': 'update_state', 'payload': _decode_state(body)}
+    return json.loads(bytes(body))
+
+
+CODECS = {
+    JSON_CODEC: JsonCodec(),
+    BINARY_CODEC: BinaryCodec(),
+}
+SUPPORTED_CODECS = [BINARY_CODEC, JSON_CODEC]  # В порядке предпочтения
+
+
+def negotiate(offered):
+    """Выбирает кодек из предложенных клиентом (по умолчанию — JSON)."""
+    for name in offered or ():
+        if name in CODECS:
+            return CODECS[name]
+    return CODECS[JSON_CODEC]
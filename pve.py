@@ -7,7 +7,10 @@ import random  # Для генерации случайных чисел
 from asteroid import AsteroidManager  # Управление астероидами
 from laser import LaserManager  # Управление лазерами
 from ship import Ship  # Логика кораблей
-from utils import WIDTH, HEIGHT, FPS, BLACK, WHITE, MAX_ASTEROIDS, GAME_TIME  # Константы и настройки
+from spatialhash import SpatialHash  # Broadphase для столкновений
+from render import cache, draw_world, DirtyRenderer  # Кеш ресурсов, пакетная отрисовка, грязные прямоугольники
+from utils import WIDTH, HEIGHT, FPS, WHITE, MAX_ASTEROIDS, GAME_TIME  # Константы и настройки
+from settings import DIRTY_RECTS  # Отрисовка только изменившихся прямоугольников
 
 if WIDTH == 0 or HEIGHT == 0:  # Проверяем, не равны ли размеры экрана нулю
     screen_info = pygame.display.Info()  # Получаем информацию о текущем экране
@@ -113,45 +116,48 @@ class LocalPvELogic:  # Локальная логика PvE режима
         self.start_time = time.time()  # Время начала игры
         self.max_time = GAME_TIME  # Максимальное время игры
         self.game_over = False  # Флаг окончания игры
+        self.broadphase = SpatialHash()  # Сетка астероидов для поиска столкновений
 
     def update(self):  # Обновление логики игры
         self.asteroid_manager.update()  # Обновление астероидов
         self.laser_manager.update()  # Обновление лазеров
 
+        positions, radii, _ = self.asteroid_manager.get_bulk()
+        self.broadphase.rebuild(positions, radii)  # Перестраиваем сетку астероидов на этот тик
+
+        destroyed = set()  # Индексы уничтоженных за тик астероидов (удаляются в конце)
         for ship in [self.ship_player, self.ship_bot]:  # Проверяем столкновения кораблей с астероидами
             if ship.is_respawning:  # Пропускаем корабли в состоянии респауна
                 continue
-            for ast in self.asteroid_manager.asteroids[:]:
-                dist_ship_ast = math.hypot(ship.rect.centerx - ast['pos'][0], ship.rect.centery - ast['pos'][1])
-                if dist_ship_ast < (ship.radius + ast['radius']):  # Если столкновение
-                    ship.take_damage()  # Корабль получает урон
-                    ast['hp'] -= 1  # Астероид теряет здоровье
-                    if ast['hp'] <= 0:  # Если здоровье астероида на нуле
-                        self.asteroid_manager.asteroids.remove(ast)  # Удаляем астероид
+            for j in self.broadphase.query_circle(ship.rect.centerx, ship.rect.centery, ship.radius):
+                if j in destroyed:
+                    continue
+                ship.take_damage()  # Корабль получает урон
+                if self.asteroid_manager.damage(j):  # Астероид теряет здоровье; если оно на нуле
+                    destroyed.add(j)  # Помечаем астероид на удаление
 
-        for laser in self.laser_manager.lasers[:]:  # Проверяем столкновения лазеров с объектами
-            lx, ly = laser['pos']
+        for k, lx, ly, _owner in self.laser_manager.iter_lasers():  # Проверяем столкновения лазеров с объектами
             for ship in [self.ship_player, self.ship_bot]:  # Проверяем столкновения с кораблями
                 if ship.is_respawning:
                     continue
                 dist_laser_ship = math.hypot(lx - ship.rect.centerx, ly - ship.rect.centery)
                 if dist_laser_ship < ship.radius:  # Если столкновение
                     ship.take_damage()  # Корабль получает урон
-                    if laser in self.laser_manager.lasers:
-                        self.laser_manager.lasers.remove(laser)  # Удаляем лазер
+                    self.laser_manager.mark_hit(k)  # Помечаем лазер на удаление
                     break
 
-            for ast in self.asteroid_manager.asteroids[:]:  # Проверяем столкновения с астероидами
-                dist_laser_ast = math.hypot(lx - ast['pos'][0], ly - ast['pos'][1])
-                if dist_laser_ast < ast['radius']:
-                    ast['hp'] -= 1
-                    if ast['hp'] <= 0:
-                        self.asteroid_manager.asteroids.remove(ast)
-                    if laser in self.laser_manager.lasers:
-                        self.laser_manager.lasers.remove(laser)
-                    break
+            for j in self.broadphase.query_circle(lx, ly, 0):  # Проверяем столкновения с астероидами
+                if j in destroyed:
+                    continue
+                if self.asteroid_manager.damage(j):
+                    destroyed.add(j)
+                self.laser_manager.mark_hit(k)
+                break
+
+        self.laser_manager.flush()  # Удаляем попавшие лазеры пачкой
+        self.asteroid_manager.remove_many(destroyed)  # Удаляем уничтоженные астероиды пачкой
 
-        if len(self.asteroid_manager.asteroids) < MAX_ASTEROIDS:  # Добавляем новые астероиды, если их недостаточно
+        if len(self.asteroid_manager) < MAX_ASTEROIDS:  # Добавляем новые астероиды, если их недостаточно
             self.asteroid_manager.spawn_asteroid()
 
         if time.time() - self.start_time >= self.max_time:  # Проверяем, истекло ли время игры
@@ -160,12 +166,15 @@ class LocalPvELogic:  # Локальная логика PvE режима
     def is_game_over(self):  # Проверяем, завершена ли игра
         return self.game_over
 
-def run_pve():  # Функция запуска PvE режима
-    pygame.init()  # Инициализируем Pygame
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))  # Создаем окно игры
+def run_pve(dirty_rects=DIRTY_RECTS, screen=None):  # Функция запуска PvE режима (screen — уже открытое окно приложения)
+    owns_display = screen is None  # Окно открываем сами только при запуске без менеджера сцен
+    if owns_display:
+        pygame.init()  # Инициализируем Pygame
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))  # Создаем окно игры
     pygame.display.set_caption("PvE Mode")  # Устанавливаем заголовок окна
 
     clock = pygame.time.Clock()  # Создаем объект для управления временем
+    renderer = DirtyRenderer(screen, enabled=dirty_rects)  # Кадр целиком или только изменения
 
     player_ship = Ship(screen, 0)  # Создаем корабль игрока
     bot_ship = Ship(screen, 1)  # Создаем корабль бота
@@ -185,6 +194,10 @@ def run_pve():  # Функция запуска PvE режима
         for event in pygame.event.get():  # Обрабатываем события
             if event.type == pygame.QUIT:  # Выход из игры
                 running = False
+                if not owns_display:
+                    pygame.event.post(event)  # Окно закрыли — пусть это увидит и менеджер сцен
+            elif event.type in (pygame.VIDEOEXPOSE, pygame.WINDOWEXPOSED):  # Окно перекрывали
+                renderer.invalidate()  # Следующий кадр — целиком
             elif event.type == pygame.KEYDOWN:
                 if event.key == pygame.K_ESCAPE:  # Выход в меню
                     running = False
@@ -201,17 +214,15 @@ def run_pve():  # Функция запуска PvE режима
         if logic.is_game_over():  # Проверяем, завершилась ли игра
             running = False
 
-        screen.fill(BLACK)  # Очищаем экран
-        asteroid_manager.draw(screen)  # Отображаем астероиды
-        laser_manager.draw(screen)  # Отображаем лазеры
+        renderer.begin()  # Стираем прошлый кадр (весь экран или только его прямоугольники)
+        renderer.add_all(draw_world(screen, asteroid_manager.sprites(), laser_manager.positions()))  # Астероиды и лазеры одним blits
 
-        player_ship.draw()  # Отображаем корабль игрока
-        bot_ship.draw()  # Отображаем корабль бота
+        renderer.add_all(player_ship.draw())  # Отображаем корабль игрока
+        renderer.add_all(bot_ship.draw())  # Отображаем корабль бота
 
         time_left = logic.max_time - int(time.time() - logic.start_time)  # Вычисляем оставшееся время
-        font = pygame.font.Font(None, 36)  # Устанавливаем шрифт
-        text = font.render(f"Time left: {time_left}", True, WHITE)  # Рендерим текст времени
-        screen.blit(text, (WIDTH // 2 - 50, 10))  # Отображаем текст на экране
+        text = cache.text(f"Time left: {time_left}", 36, WHITE)  # Текст времени (из кеша)
+        renderer.add(screen.blit(text, (WIDTH // 2 - 50, 10)))  # Отображаем текст на экране
 
-        pygame.display.flip()  # Обновляем экран
+        renderer.present()  # Обновляем экран (flip или только изменившиеся прямоугольники)
     return  # Явное завершение функции
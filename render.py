@@ -0,0 +1,238 @@
+# render.py
+# Клиентский слой отрисовки: серверные модули (asteroid, laser, gamelogic) pygame не импортируют.
+from collections import OrderedDict
+
+import pygame
+from utils import WIDTH, HEIGHT, BLACK, YELLOW
+
+TEXT_CACHE_SIZE = 256  # Столько отрисованных строк держим; дольше всех не нужные вытесняются
+ANGLE_STEP = 3  # Градусов: повёрнутые спрайты кешируются с этим шагом (120 положений на круг)
+LASER_RADIUS = 3
+COLORKEY = (255, 0, 255)  # Прозрачный цвет спрайтов кругов (в игре такого цвета нет)
+
+
+class RenderCache:
+    """Ресурсы отрисовки, которые дорого создавать каждый кадр.
+
+    - шрифты по (имя, размер) — pygame.font.Font читает файл шрифта при каждом создании;
+    - отрисованный текст по (строка, размер, цвет) — LRU на TEXT_CACHE_SIZE строк:
+      HUD меняется раз в секунду или реже, а рисуется каждый кадр;
+    - повёрнутые спрайты: угол округляется до ANGLE_STEP, и на каждый шаг
+      transform.rotate делается один раз;
+    - круги (астероиды, лазеры) по (радиус, цвет) — заранее нарисованные поверхности для blit.
+
+    Поверхности общие — рисовать поверх них нельзя, только blit.
+    После pygame.quit() кеш нужно очистить (clear): шрифты и поверхности становятся недействительны.
+
+    Счётчики в stats: text_hits, text_misses, text_evictions, sprite_hits, sprite_misses,
+    circles (сколько кругов нарисовано в кеш), blits, culled (копии за пределами экрана).
+    """
+
+    def __init__(self, text_size=TEXT_CACHE_SIZE, angle_step=ANGLE_STEP):
+        self.text_size = text_size
+        self.angle_step = angle_step
+        self.buckets = round(360 / angle_step)
+        self.fonts = {}
+        self.texts = OrderedDict()  # (строка, размер, цвет, antialias) -> Surface
+        self.sprites = {}  # (ключ спрайта, номер шага угла) -> Surface
+        self.circles = {}  # (радиус, цвет) -> Surface
+        self.stats = {
+            'text_hits': 0,
+            'text_misses': 0,
+            'text_evictions': 0,
+            'sprite_hits': 0,
+            'sprite_misses': 0,
+            'circles': 0,
+            'blits': 0,
+            'culled': 0,
+        }
+
+    def font(self, size, name=None):
+        font = self.fonts.get((name, size))
+        if font is None:
+            font = self.fonts[(name, size)] = pygame.font.Font(name, size)
+        return font
+
+    def text(self, string, size, color, antialias=True):
+        """Surface со строкой string шрифтом по умолчанию размера size."""
+        key = (string, size, tuple(color), antialias)
+        surface = self.texts.get(key)
+        if surface is not None:
+            self.texts.move_to_end(key)
+            self.stats['text_hits'] += 1
+            return surface
+        self.stats['text_misses'] += 1
+        surface = self.texts[key] = self.font(size).render(string, antialias, color)
+        if len(self.texts) > self.text_size:
+            self.texts.popitem(last=False)
+            self.stats['text_evictions'] += 1
+        return surface
+
+    def rotated(self, key, image, angle):
+        """image, повёрнутый на angle градусов (с точностью ANGLE_STEP).
+
+        key отличает исходные изображения: у разных image должны быть разные key.
+        """
+        bucket = round(angle / self.angle_step) % self.buckets
+        surface = self.sprites.get((key, bucket))
+        if surface is not None:
+            self.stats['sprite_hits'] += 1
+            return surface
+        self.stats['sprite_misses'] += 1
+        surface = self.sprites[(key, bucket)] = pygame.transform.rotate(image, bucket * self.angle_step)
+        return surface
+
+    def circle(self, radius, color):
+        """Surface (2*radius+1)^2 с кругом радиуса radius в центре."""
+        key = (radius, color if type(color) is tuple else tuple(color))
+        surface = self.circles.get(key)
+        if surface is None:
+            surface = pygame.Surface((2 * radius + 1, 2 * radius + 1))
+            surface.fill(COLORKEY)
+            pygame.draw.circle(surface, color, (radius, radius), radius)
+            # Прозрачность по цветовому ключу с RLE: blit копирует только строки круга,
+            # это заметно быстрее попиксельной альфы
+            surface.set_colorkey(COLORKEY, pygame.RLEACCEL)
+            if pygame.display.get_surface() is not None:
+                surface = surface.convert()  # Формат экрана — blit без пересчёта пикселей
+            self.circles[key] = surface
+            self.stats['circles'] += 1
+        return surface
+
+    def clear(self):
+        self.fonts.clear()
+        self.texts.clear()
+        self.sprites.clear()
+        self.circles.clear()
+
+
+cache = RenderCache()  # Общий для клиента, PvE и кораблей
+
+
+def wrapped_offsets(c, radius, size):
+    """Координаты круга и его копии с другой стороны экрана по одной оси."""
+    if c < radius:
+        return (c, c + size)
+    if size - c < radius:
+        return (c, c - size)
+    return (c,)
+
+
+def circle_blits(asteroids=(), lasers=(), render_cache=None):
+    """Список (Surface, (x, y)) для Surface.blits: астероиды с копиями через край и лазеры.
+
+    Копии и объекты, не задевающие экран, отбрасываются.
+    """
+    render_cache = render_cache or cache
+    circle = render_cache.circle
+    batch = []
+    culled = 0
+    append = batch.append
+    for x, y, radius, color in asteroids:
+        x, y, radius = int(x), int(y), int(radius)
+        sprite = circle(radius, color)
+        if radius <= x <= WIDTH - radius and radius <= y <= HEIGHT - radius:
+            append((sprite, (x - radius, y - radius)))  # Целиком на экране — копии не нужны
+            continue
+        for cx in wrapped_offsets(x, radius, WIDTH):
+            if cx + radius < 0 or cx - radius > WIDTH:
+                culled += 1
+                continue
+            for cy in wrapped_offsets(y, radius, HEIGHT):
+                if cy + radius < 0 or cy - radius > HEIGHT:
+                    culled += 1
+                    continue
+                append((sprite, (cx - radius, cy - radius)))
+    sprite = circle(LASER_RADIUS, YELLOW)
+    for x, y in lasers:
+        x, y = int(x), int(y)
+        if not (-LASER_RADIUS <= x <= WIDTH + LASER_RADIUS and -LASER_RADIUS <= y <= HEIGHT + LASER_RADIUS):
+            culled += 1
+            continue
+        append((sprite, (x - LASER_RADIUS, y - LASER_RADIUS)))
+    render_cache.stats['culled'] += culled
+    return batch
+
+
+def draw_world(screen, asteroids=(), lasers=()):
+    """Рисует астероиды (x, y, radius, color) и лазеры (x, y) одним вызовом Surface.blits.
+
+    Возвращает прямоугольники нарисованного (для DirtyRenderer).
+    """
+    batch = circle_blits(asteroids, lasers)
+    if not batch:
+        return []
+    cache.stats['blits'] += len(batch)
+    return screen.blits(batch)
+
+
+def draw_asteroids(screen, asteroids):
+    """Рисует астероиды из итерируемого (x, y, radius, color)."""
+    draw_world(screen, asteroids=asteroids)
+
+
+def draw_lasers(screen, positions):
+    """Рисует лазеры по списку позиций (x, y)."""
+    draw_world(screen, lasers=positions)
+
+
+class DirtyRenderer:
+    """Кадр целиком или только изменившиеся прямоугольники.
+
+    Кадр: begin() — стирает прошлое, add()/add_all() — прямоугольники нарисованного
+    (их возвращают blit/blits, Ship.draw, draw_world), present() — показывает кадр.
+
+    В режиме enabled фон на экране не заливается целиком: begin() закрашивает только
+    прямоугольники прошлого кадра, а present() передаёт в pygame.display.update()
+    прошлые и новые прямоугольники — на экране обновляются лишь места, где что-то
+    двигалось. Фон однотонный (background), поэтому стирание — это fill прямоугольника.
+    Без enabled — прежнее поведение: fill всего экрана и display.flip().
+
+    invalidate() — следующий кадр рисуется целиком (первый кадр, другой экран вроде
+    GAME OVER рисовал поверх, окно перекрывали).
+
+    Счётчики в stats: frames, full_frames, rects, area (обновлённых пикселей в последнем кадре).
+    """
+
+    def __init__(self, screen, enabled=True, background=BLACK):
+        self.screen = screen
+        self.enabled = enabled
+        self.background = background
+        self.previous = []  # Прямоугольники, нарисованные в прошлом кадре
+        self.current = []
+        self.full = True
+        self.stats = {'frames': 0, 'full_frames': 0, 'rects': 0, 'area': 0}
+
+    def invalidate(self):
+        self.full = True
+
+    def begin(self):
+        self.current = []
+        if self.full or not self.enabled:
+            self.screen.fill(self.background)
+            return
+        for rect in self.previous:
+            self.screen.fill(self.background, rect)
+
+    def add(self, rect):
+        if rect is not None:
+            self.current.append(rect)
+
+    def add_all(self, rects):
+        self.current.extend(rects)
+
+    def present(self):
+        stats = self.stats
+        stats['frames'] += 1
+        if self.full or not self.enabled:
+            pygame.display.flip()
+            stats['full_frames'] += 1
+            stats['area'] = self.screen.get_width() * self.screen.get_height()
+        else:
+            rects = [rect for rect in self.previous + self.current if rect.width and rect.height]
+            pygame.display.update(rects)
+            stats['rects'] += len(rects)
+            stats['area'] = sum(rect.width * rect.height for rect in rects)
+        self.previous = self.current
+        self.current = []
+        self.full = False
@@ -0,0 +1,563 @@
+# rooms.py
+import threading
+import time
+from collections import deque
+
+from settings import FPS, MAX_ASTEROIDS, GAME_TIME
+from shipstate import ShipState
+from asteroid import AsteroidManager, ArrayAsteroidManager, np
+from laser import LaserManager, ArrayLaserManager
+from gamelogic import GameLogic
+from snapshot import DeltaEncoder, make_snapshot
+from protocol import CODECS, JSON_CODEC
+from inputs import InputQueue, IN_SHOOT, movement_flags, parse_input
+from sendrate import SendRateController, WAITING_RATE
+from lagcomp import PingTracker, MAX_REWIND, rewind_ticks, history_size
+
+MAX_ROOMS = 500  # Сколько матчей одновременно держит один процесс сервера
+ROOM_IDLE_TIMEOUT = 30  # Секунд ждём переподключения в начатый матч без игроков
+SLOTS_PER_ROOM = 2
+# Хранилище астероидов и лазеров комнат: массивы numpy, если numpy установлен, иначе списки
+MANAGER_BACKEND = 'numpy' if np is not None else 'list'
+
+
+def new_player_slot(slot_id):
+    """Пустой слот игрока комнаты."""
+    return {
+        'conn': None,
+        'addr': None,
+        'connected': False,
+        'codec': CODECS[JSON_CODEC],  # Формат сообщений, выбранный в hello
+        'ship_id': slot_id,
+        'acked_seq': None,  # Последний снимок, подтверждённый клиентом
+        'keyframe_seq': None,  # Последний отправленный клиенту ключевой кадр
+        'rate': None,  # SendRateController соединения
+        'ping': None,  # PingTracker соединения (RTT для компенсации задержки)
+        'udp': None,  # UdpChannel, если клиент договорился об UDP для снимков и ввода
+        'udp_active': False,  # Снимки уже идут по UDP
+    }
+
+
+class Room:
+    """
+    Один матч на 2 слота игроков.
+    Когда оба подключены, идет игра; если один отключился, комната ждет
+    его повторного подключения (с тем же room в hello).
+    Комната владеет своими кораблями (ShipState), менеджерами астероидов
+    и лазеров, GameLogic и историей снимков для дельт.
+    """
+
+    def __init__(self, room_id, tick_rate=FPS, send_rate=FPS, max_rewind=MAX_REWIND):
+        self.tick_rate = tick_rate  # Тиков в секунду: клиент переводит seq снимков во время
+        self.send_rate = send_rate  # Наибольшая частота снимков одному клиенту
+        self.max_rewind = max_rewind  # Секунд: предел отката целей для лазеров
+        # Инициализируем игровые объекты
+        # (На сервере только состояние кораблей — без pygame и отрисовки)
+        self.ships = [ShipState(i) for i in range(SLOTS_PER_ROOM)]
+
+        # При наличии numpy астероиды и лазеры хранятся в массивах (быстрее на сотнях объектов)
+        if MANAGER_BACKEND == 'numpy':
+            self.asteroid_manager = ArrayAsteroidManager(MAX_ASTEROIDS)
+            self.laser_manager = ArrayLaserManager()
+        else:
+            self.asteroid_manager = AsteroidManager(MAX_ASTEROIDS)
+            self.laser_manager = LaserManager()
+        self.logic = GameLogic(self.ships, self.asteroid_manager, self.laser_manager, max_time=GAME_TIME,
+                               history_ticks=history_size(tick_rate, max_rewind))
+        self.reset(room_id)
+
+    def reset(self, room_id):
+        """Готовит комнату к новому матчу (в том числе при повторном использовании)."""
+        self.room_id = room_id
+        self.players = [new_player_slot(i) for i in range(SLOTS_PER_ROOM)]
+        self.inputs = [InputQueue() for _ in range(SLOTS_PER_ROOM)]  # Кадры ввода по слотам
+        # restart/shoot от потоков соединений: менеджеры астероидов и лазеров трогает только тик
+        self.actions = deque()
+        self.game_started = False
+        self.game_ended = False  # Флаг, чтобы при завершении игры показать результат
+        self.empty_since = time.monotonic()  # Когда комната осталась без игроков
+        self.next_waiting = 0.0  # Когда слать очередное waiting_for_players
+        self.waiting_count = None  # Число игроков в последнем waiting_for_players
+        self.delta_encoder = DeltaEncoder()  # История снимков для дельт update_state
+        self.asteroid_manager.clear()
+        self.laser_manager.clear()
+        self.logic.points = [0] * len(self.ships)
+        self.logic.history.clear()
+        for ship in self.ships:
+            ship.reset()
+
+    def owns(self, slot_id, conn):
+        """Принадлежит ли слот всё ещё этому соединению."""
+        return self.players[slot_id]['conn'] is conn
+
+    def connected_count(self):
+        return sum(player['connected'] for player in self.players)
+
+    def is_open(self):
+        """Можно ли подбирать сюда новых игроков без явного room."""
+        return not self.game_started and not self.game_ended and self.connected_count() < SLOTS_PER_ROOM
+
+    def free_slot(self, wanted_id=None):
+        """Номер свободного слота (wanted_id, если он свободен) или None."""
+        if wanted_id is not None:
+            return None if self.players[wanted_id]['connected'] else wanted_id
+        for player in self.players:
+            if not player['connected']:
+                return player['ship_id']
+        return None
+
+    def is_recyclable(self, now):
+        """Комнату можно вернуть в пул: в ней никого нет и матч не ждёт переподключения."""
+        if self.connected_count():
+            return False
+        if not self.game_started or self.game_ended:
+            return True
+        return now - self.empty_since >= ROOM_IDLE_TIMEOUT
+
+    def claim_slot(self, slot_id, conn, addr, codec, ack=False, max_rate=None, udp=None):
+        """
+        Занимает слот. conn — соединение с очередью отправки: send(data, droppable)/close().
+        hello_ack (если клиент предлагал кодеки) ставится в очередь раньше,
+        чем слот увидит рассылка, — первым клиент получит именно его.
+        max_rate — желаемая клиентом частота снимков (не выше send_rate комнаты).
+        udp — UdpChannel слота (его порт и токен уходят в hello_ack) или None.
+        """
+        if ack:
+            # player_id — выданный слот: клиент, приславший player_id=None, узнаёт свой корабль
+            ack_payload = {'codec': codec.name, 'room': self.room_id, 'player_id': slot_id,
+                           'tick_rate': self.tick_rate}
+            if udp is not None:
+                ack_payload['udp'] = udp.offer
+            conn.send(CODECS[JSON_CODEC].encode({'event': 'hello_ack', 'payload': ack_payload}))
+
+        player_slot = self.players[slot_id]
+        if player_slot['udp'] is not None:
+            player_slot['udp'].close()
+        player_slot['udp'] = udp
+        player_slot['udp_active'] = False
+        player_slot['codec'] = codec
+        player_slot['conn'] = conn
+        player_slot['addr'] = addr
+        player_slot['connected'] = True
+        player_slot['acked_seq'] = None  # Новое соединение начинается с ключевого кадра
+        player_slot['keyframe_seq'] = None
+        player_slot['rate'] = SendRateController(min(max_rate or self.send_rate, self.send_rate))
+        player_slot['ping'] = PingTracker()
+        self.inputs[slot_id] = InputQueue()  # Новое соединение нумерует кадры ввода заново
+
+        print(f"[SERVER] Room {self.room_id}: slot {slot_id} connected from {addr} (codec={codec.name})")
+
+        # Проверяем, подключены ли оба игрока
+        if not self.game_started and self.connected_count() == SLOTS_PER_ROOM:
+            print(f"[SERVER] Room {self.room_id}: both players connected. Starting the game...")
+            self.logic.start_time = time.time()  # Устанавливаем стартовое время
+            self.game_started = True
+
+    def release_slot(self, slot_id, conn):
+        """Освобождает слот после отключения клиента."""
+        player_slot = self.players[slot_id]
+        if player_slot['conn'] is conn or player_slot['conn'] is None:
+            player_slot['connected'] = False
+            player_slot['conn'] = None
+            player_slot['addr'] = None
+            if player_slot['udp'] is not None:
+                player_slot['udp'].close()
+                player_slot['udp'] = None
+        if not self.connected_count():
+            self.empty_since = time.monotonic()
+        try:
+            conn.close()
+        except Exception:
+            pass
+        print(f"[SERVER] Room {self.room_id}: slot {slot_id} cleaned up.")
+
+    def save_winner_info(self, winner, p1_score, p2_score):
+        """
+        Сохраняем информацию о победителе в текстовый файл.
+        winner = 0 (ничья), 1 (player1), 2 (player2)
+        """
+        if winner == 1:
+            winner_name = "Player1"
+            winner_score = p1_score
+        elif winner == 2:
+            winner_name = "Player2"
+            winner_score = p2_score
+        else:
+            winner_name = "Draw"
+            winner_score = p1_score  # или p2_score, ведь они равны при ничьей
+
+        # Простой вариант — дописывать в текстовый файл.
+        # Можно заменить на SQLite/JSON и т.д.
+        with open("winners.txt", "a", encoding="utf-8") as f:
+            f.write(f"{winner_name} | Score: {winner_score} | (P1={p1_score}, P2={p2_score})\n")
+
+        print(f"[SERVER] Room {self.room_id}: winner saved: {winner_name}, score={winner_score}")
+
+    def process_message(self, msg, slot_id):
+        """Обработка действий от клиента (input, ack, shoot и т.д.)"""
+        action = msg.get('action')
+        payload = msg.get('payload', {})
+
+        if action == 'input':
+            # Кадры управления применяются по одному за тик в apply_inputs()
+            parsed = parse_input(payload)
+            if parsed is None:
+                # Пачка от клиента без проверки уронила бы поток приёма (UDP — общий для всех)
+                self.inputs[slot_id].reject()
+            else:
+                self.inputs[slot_id].push(*parsed)
+
+        elif action == 'update_position':
+            # Координаты считает сервер по кадрам input; присланная позиция игнорируется
+            pass
+
+        elif action == 'ack':
+            # Клиент подтвердил снимок — дальше шлём дельты относительно него
+            # (seq=None — у клиента нет базы, нужен ключевой кадр)
+            player_slot = self.players[slot_id]
+            player_slot['acked_seq'] = payload.get('seq')
+            if player_slot['rate'] is not None and player_slot['acked_seq'] is not None:
+                player_slot['rate'].on_ack(time.monotonic(), player_slot['acked_seq'])
+
+        elif action == 'pong':
+            # Ответ на ping из send_pings() — обновляем RTT слота
+            player_slot = self.players[slot_id]
+            if player_slot['ping'] is not None:
+                player_slot['ping'].on_pong(time.monotonic(), payload.get('id'))
+
+        elif action in ('restart', 'shoot'):
+            # Выполнится в начале следующего тика (apply_actions), в потоке симуляции
+            self.actions.append((action, slot_id))
+
+        else:
+            # Можно добавить ready, respawn, etc.
+            print(f"[SERVER] Unknown action: {action}")
+
+    def apply_actions(self):
+        """restart и shoot, пришедшие с прошлого тика.
+
+        Менеджеры на numpy (count и сжатие массивов) не потокобезопасны:
+        clear() или shoot_laser() из потока соединения посреди update() теряются
+        или откатываются, поэтому их вызывает только поток тика.
+        """
+        while self.actions:
+            action, slot_id = self.actions.popleft()
+            if action == 'restart':
+                print(f"[SERVER] Room {self.room_id}: player {slot_id} requested a restart.")
+                self.logic.reset_game()  # Сбрасываем состояние игры
+                for ship in self.ships:
+                    ship.reset()
+                self.game_ended = False
+            elif action == 'shoot' and 0 <= slot_id < len(self.ships):
+                can_shoot, (lx, ly) = self.ships[slot_id].try_shoot()
+                if can_shoot:
+                    self.laser_manager.shoot_laser(lx, ly, self.ships[slot_id].angle, slot_id,
+                                                   rewind=self.logic.rewind[slot_id])
+
+    def tick(self):
+        """Один шаг симуляции комнаты."""
+        self.apply_actions()
+
+        # Матч ещё не начался или уже закончен — симулировать нечего
+        if not self.game_started or self.game_ended:
+            return
+
+        # Иначе полноценная игровая логика
+        self.apply_inputs()
+        self.update_rewind()
+        if len(self.asteroid_manager) < MAX_ASTEROIDS:
+            self.asteroid_manager.spawn_asteroid()
+
+        game_over = self.logic.update()
+
+        if game_over:
+            # Игра закончена, сообщаем результат
+            self.game_ended = True
+            p1_score = self.logic.points[0]
+            p2_score = self.logic.points[1]
+            if p1_score > p2_score:
+                winner = 1  # Player 1 (slot 0, но человек видит +1)
+            elif p2_score > p1_score:
+                winner = 2
+            else:
+                winner = 0  # ничья
+
+            self.save_winner_info(winner, p1_score, p2_score)
+            print(f"[SERVER] Room {self.room_id}: client stats: {self.client_stats()}")
+            print(f"[SERVER] Room {self.room_id}: input stats: {[q.stats for q in self.inputs]}")
+            print(f"[SERVER] Room {self.room_id}: rewind stats: {self.logic.history.stats}")
+
+            end_msg = {
+                'event': 'game_over',
+                'payload': {
+                    'scores': [p1_score, p2_score],
+                    'winner': winner  # 0=draw, 1=first ship, 2=second ship
+                }
+            }
+            self.broadcast_message(end_msg)
+
+    def apply_inputs(self):
+        """Двигает корабли по очередному кадру ввода каждого подключённого игрока."""
+        for slot_id, ship in enumerate(self.ships):
+            if not self.players[slot_id]['connected']:
+                ship.vel = [0, 0]
+                continue
+            bits = self.inputs[slot_id].next_bits()
+            if ship.is_respawning:
+                ship.vel = [0, 0]
+                continue
+            ship.move(*movement_flags(bits))
+            if bits & IN_SHOOT:
+                can_shoot, (lx, ly) = ship.try_shoot()
+                if can_shoot:
+                    self.laser_manager.shoot_laser(lx, ly, ship.angle, slot_id, rewind=self.logic.rewind[slot_id])
+
+    def update_rewind(self):
+        """Откат целей (в тиках) для лазеров каждого игрока — по его текущему RTT."""
+        for slot_id, p in enumerate(self.players):
+            rtt = p['ping'].rtt if p['connected'] and p['ping'] is not None else None
+            self.logic.rewind[slot_id] = rewind_ticks(rtt, self.tick_rate, self.max_rewind)
+
+    def send_pings(self, now):
+        """Раз в PING_INTERVAL шлёт каждому клиенту ping для замера RTT."""
+        for p in self.players:
+            if p['connected'] and p['conn'] is not None:
+                payload = p['ping'].poll(now)
+                if payload is not None:
+                    self.send_to_player(p, {'event': 'ping', 'payload': payload})
+
+    def broadcast_state(self):
+        """
+        Отправка текущего состояния (корабли, астероиды, лазеры, время, очки).
+        Вызывается в игровом цикле с частотой broadcast_rate; каждому клиенту
+        снимок уходит с его собственной частотой (SendRateController).
+        После game_over итоговое состояние уходит с частотой WAITING_RATE.
+        """
+        now = time.monotonic()
+        self.send_pings(now)
+        if not self.game_started:
+            # Пока ждём игроков — редкий пульс и сразу при изменении числа подключённых
+            connected = self.connected_count()
+            if connected == self.waiting_count and now < self.next_waiting:
+                return
+            self.waiting_count = connected
+            self.next_waiting = now + 1.0 / WAITING_RATE
+            state = {
+                'event': 'waiting_for_players',
+                'payload': {
+                    'message': 'Waiting for both players to connect...',
+                    'connected': connected
+                }
+            }
+            self.broadcast_message(state)
+            return
+
+        if self.game_ended:
+            # Матч окончен, симуляция стоит — как и раньше, шлём итоговое состояние,
+            # но редким пульсом с частотой ожидания
+            if now < self.next_waiting:
+                return
+            self.next_waiting = now + 1.0 / WAITING_RATE
+            due = [p for p in self.players if p['connected'] and p['conn'] is not None]
+        else:
+            due = [p for p in self.players
+                   if p['connected'] and p['conn'] is not None and p['rate'].due(now, p['conn'].stats)]
+        if not due:
+            return
+
+        snapshot = make_snapshot(
+            self.logic.tick,
+            ships=[
+                {
+                    'id': i,
+                    'hp': s.hp,
+                    'pos': [s.rect.centerx, s.rect.centery],
+                    'vel': list(s.vel),
+                    'angle': s.angle,
+                    'shots': s.shots,
+                    'is_respawning': s.is_respawning,
+                    'is_reloading': s.is_reloading,
+                    'ack_input': self.inputs[i].acked,  # Последний учтённый кадр ввода
+                }
+                for i, s in enumerate(self.ships)
+            ],
+            asteroids=[
+                {
+                    'id': ast['id'],
+                    'pos': list(ast['pos']),
+                    'vel': list(ast['vel']),
+                    'radius': ast['radius'],
+                    'color': ast['color'],  # Дополнительно, если хотим
+                }
+                for ast in self.asteroid_manager.asteroids
+            ],
+            lasers=[
+                {
+                    'id': l['id'],
+                    'pos': list(l['pos']),
+                    'vel': list(l['vel']),
+                    'owner': l['owner']
+                }
+                for l in self.laser_manager.lasers
+            ],
+            score=self.logic.points,  # Текущие очки
+            time_left=self.logic.get_time_left(),
+        )
+        self.delta_encoder.record(snapshot)
+
+        # Каждому клиенту, которому пора, — дельта к последнему подтверждённому им снимку
+        for p in due:
+            payload, is_keyframe = self.delta_encoder.encode(snapshot, p['acked_seq'], p['keyframe_seq'])
+            if is_keyframe:
+                p['keyframe_seq'] = snapshot['seq']
+            data = p['codec'].encode({'event': 'update_state', 'payload': payload})
+            self.send_state(p, data)
+            if not self.game_ended:  # Пульс после game_over не учитываем в частоте снимков клиента
+                p['rate'].on_sent(now, snapshot['seq'], len(data))
+
+    def client_stats(self):
+        """Счётчики очередей отправки, частоты снимков и RTT подключённых клиентов: {slot: stats}."""
+        return {p['ship_id']: dict(p['conn'].stats, send_rate=dict(p['rate'].stats), ping=dict(p['ping'].stats),
+                                   udp=dict(p['udp'].stats) if p['udp'] is not None else None)
+                for p in self.players if p['connected'] and p['conn'] is not None}
+
+    def broadcast_message(self, message):
+        """Отправка одного сообщения всем подключённым слотам (кодируется раз на кодек)."""
+        encoded = {}
+        for p in self.players:
+            if not (p['connected'] and p['conn'] is not None):
+                continue
+            codec = p['codec']
+            if codec.name not in encoded:
+                encoded[codec.name] = codec.encode(message)
+            self.send_data(p, encoded[codec.name])
+
+    def send_state(self, p, data):
+        """Снимок — по UDP, если канал слота подтверждён, иначе в очередь TCP."""
+        udp = p['udp']
+        if udp is not None and udp.confirmed:
+            if not p['udp_active']:
+                p['udp_active'] = True
+                p['rate'].reset_rtt()  # У датаграмм свой RTT — меряем заново
+            if udp.send(data):
+                return
+        # Снимки можно выбрасывать: при переполнении очереди остаётся только свежий
+        self.send_data(p, data, droppable=True)
+
+    def send_to_player(self, p, message, droppable=False):
+        """Отправка одного сообщения одному слоту в его кодеке."""
+        self.send_data(p, p['codec'].encode(message), droppable)
+
+    def send_data(self, p, data, droppable=False):
+        """Постановка готовых байтов в очередь слота; при ошибке слот считается отключённым."""
+        if p['connected'] and p['conn'] is not None:
+            try:
+                p['conn'].send(data, droppable)
+            except Exception as e:
+                print(f"[SERVER] Room {self.room_id}: send to slot {p['ship_id']} failed: {e}")
+                p['connected'] = False
+                p['conn'] = None
+                p['addr'] = None
+                if not self.connected_count():
+                    self.empty_since = time.monotonic()
+
+
+class RoomManager:
+    """Набор комнат одного процесса сервера.
+
+    join() подбирает комнату по hello: с явным room — эту комнату (создавая
+    её при необходимости), без него — первую ожидающую игроков или новую.
+    Все комнаты тикают и рассылают состояние вместе, из одного планировщика;
+    закончившиеся и брошенные комнаты возвращаются в пул и переиспользуются
+    (массивы менеджеров не выделяются заново).
+
+    Счётчики в stats: rooms_created, rooms_recycled, rooms_reused, joins_rejected.
+    """
+
+    def __init__(self, max_rooms=MAX_ROOMS, prefix='', tick_rate=FPS, send_rate=FPS, max_rewind=MAX_REWIND):
+        self.max_rooms = max_rooms
+        self.tick_rate = tick_rate
+        self.send_rate = send_rate
+        self.max_rewind = max_rewind
+        self.prefix = prefix  # Префикс номеров комнат (номер шарда в shard.py)
+        self.rooms = {}  # room_id -> Room
+        self.pool = []  # Свободные комнаты для повторного использования
+        self.next_id = 1
+        self.lock = threading.Lock()  # join() вызывается из потоков соединений
+        self.stats = {
+            'rooms_created': 0,
+            'rooms_recycled': 0,
+            'rooms_reused': 0,
+            'joins_rejected': 0,
+        }
+        # Ёмкость и поведение при переполнении у бэкендов разные — пишем, какой выбран
+        print(f"[SERVER] Room managers backend: {MANAGER_BACKEND}"
+              + ("" if MANAGER_BACKEND == 'numpy' else " (numpy not installed)"))
+
+    def __len__(self):
+        return len(self.rooms)
+
+    def _new_room_id(self):
+        while f"{self.prefix}{self.next_id}" in self.rooms:
+            self.next_id += 1
+        room_id = f"{self.prefix}{self.next_id}"
+        self.next_id += 1
+        return room_id
+
+    def _create_room(self, room_id):
+        if len(self.rooms) >= self.max_rooms:
+            return None
+        if self.pool:
+            room = self.pool.pop()
+            room.reset(room_id)
+            self.stats['rooms_reused'] += 1
+        else:
+            room = Room(room_id, self.tick_rate, self.send_rate, self.max_rewind)
+            self.stats['rooms_created'] += 1
+        self.rooms[room_id] = room
+        print(f"[SERVER] Room {room_id} opened ({len(self.rooms)} active).")
+        return room
+
+    def _pick_room(self, room_id, wanted_id):
+        if room_id is not None:
+            room = self.rooms.get(room_id)
+            if room is None:
+                return self._create_room(room_id)
+            return room if room.free_slot(wanted_id) is not None else None
+        for room in self.rooms.values():
+            if room.is_open() and room.free_slot(wanted_id) is not None:
+                return room
+        return self._create_room(self._new_room_id())
+
+    def join(self, room_id, wanted_id, conn, addr, codec, ack=False, max_rate=None, udp=None):
+        """Сажает игрока в комнату. Возвращает (room, slot_id) или None."""
+        with self.lock:
+            room = self._pick_room(room_id, wanted_id)
+            if room is None:
+                self.stats['joins_rejected'] += 1
+                return None
+            slot_id = room.free_slot(wanted_id)
+            room.claim_slot(slot_id, conn, addr, codec, ack, max_rate, udp)
+            return room, slot_id
+
+    def recycle(self):
+        """Возвращает в пул комнаты без игроков, которые никто не ждёт."""
+        now = time.monotonic()
+        with self.lock:
+            for room_id, room in list(self.rooms.items()):
+                if room.is_recyclable(now):
+                    del self.rooms[room_id]
+                    self.pool.append(room)
+                    self.stats['rooms_recycled'] += 1
+                    print(f"[SERVER] Room {room_id} recycled ({len(self.rooms)} active).")
+
+    def tick(self):
+        """Один шаг симуляции всех комнат."""
+        for room in list(self.rooms.values()):
+            room.tick()
+        self.recycle()
+
+    def broadcast_state(self):
+        """Рассылка состояния всех комнат."""
+        for room in list(self.rooms.values()):
+            room.broadcast_state()
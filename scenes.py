@@ -0,0 +1,236 @@
+# scenes.py
+# Одно приложение вместо цепочки процессов: меню -> predgame -> матч / PvE / лидеры.
+#
+# Раньше каждый переход был новым процессом (subprocess.run("python predgame.py") и т.д.):
+# заново импортировался pygame, открывалось окно и декодировались все PNG — секунды на переход.
+# Теперь процесс один: SceneManager держит окно, кеши assets.py и render.py и стек сцен,
+# а переход — это push/pop/replace и, если сцене нужен другой размер окна, display.set_mode.
+#
+# Сцены меню рисуются в цикле менеджера (handle_event/update/draw). Матч (GameClient)
+# и PvE (run_pve) — со своими игровыми циклами: сцена запускает цикл в enter() на общем
+# окне и, когда он кончился, снимает себя со стека. Закрытие окна внутри такого цикла
+# возвращается в очередь событий (pygame.QUIT), и менеджер завершает приложение.
+import time
+
+import pygame
+
+from assets import assets
+from render import cache
+from settings import WIDTH, HEIGHT
+
+MENU_FPS = 60  # Частота кадров сцен меню
+WINNERS_FILE = "winners.txt"  # Результаты матчей (пишет сервер, см. rooms.py)
+LEADERBOARD_SIZE = 10  # Сколько последних результатов показывает LeaderboardScene
+DEFAULT_PORT = 12355
+
+
+class Scene:
+    """Экран приложения.
+
+    size — размер окна (None — весь экран), fullscreen — полноэкранный режим.
+    enter() вызывается, когда сцена становится верхней (и после возврата к ней).
+    """
+
+    size = None
+    fullscreen = True
+    caption = "Asteroids"
+
+    def __init__(self, manager):
+        self.manager = manager
+
+    def enter(self):
+        pass
+
+    def handle_event(self, event):
+        pass
+
+    def update(self):
+        pass
+
+    def draw(self, screen):
+        pass
+
+
+class SceneManager:
+    """Стек сцен на одном окне.
+
+    push/pop/replace только запоминают переход; выполняется он в начале следующего
+    кадра — так сцена может менять стек из своего handle_event или enter().
+    Стек опустел или quit() — приложение завершается.
+
+    Счётчики в stats: transitions, mode_changes, last_transition_ms.
+    """
+
+    def __init__(self, fps=MENU_FPS):
+        pygame.init()
+        self.fps = fps
+        self.screen = None
+        self.mode = None  # (size, flags) текущего окна
+        self.stack = []
+        self.pending = []
+        self.running = True
+        self.clock = pygame.time.Clock()
+        self.stats = {'transitions': 0, 'mode_changes': 0, 'last_transition_ms': 0.0}
+
+    @property
+    def top(self):
+        return self.stack[-1] if self.stack else None
+
+    def push(self, scene):
+        self.pending.append(('push', scene))
+
+    def pop(self):
+        self.pending.append(('pop', None))
+
+    def replace(self, scene):
+        self.pending.append(('replace', scene))
+
+    def quit(self):
+        self.running = False
+
+    def set_mode(self, scene):
+        """Открывает окно под сцену, если нынешнее не подходит."""
+        flags = pygame.FULLSCREEN if scene.fullscreen else 0
+        mode = (scene.size or (0, 0), flags)
+        if mode != self.mode:
+            self.screen = pygame.display.set_mode(*mode)
+            if scene.size and self.screen.get_size() != tuple(scene.size):
+                # Выход из полноэкранного режима: SDL отдаёт окно прежнего размера,
+                # нужный размер получается со второго вызова
+                self.screen = pygame.display.set_mode(*mode)
+            self.mode = mode
+            self.stats['mode_changes'] += 1
+        pygame.display.set_caption(scene.caption)
+
+    def apply_pending(self):
+        while self.pending and self.running:
+            if pygame.event.peek(pygame.QUIT):
+                self.running = False  # Окно закрыли внутри матча — сцены под ним уже не нужны
+                return
+            start = time.perf_counter()
+            op, scene = self.pending.pop(0)
+            if op != 'push' and self.stack:
+                self.stack.pop()
+            if op != 'pop':
+                self.stack.append(scene)
+            top = self.top
+            if top is None:
+                self.running = False
+                return
+            self.set_mode(top)
+            self.stats['transitions'] += 1
+            self.stats['last_transition_ms'] = (time.perf_counter() - start) * 1000
+            print(f"[MENU] {op} -> {type(top).__name__} "
+                  f"({self.stats['last_transition_ms']:.1f} ms, window {self.screen.get_size()})")
+            top.enter()  # Может сразу запросить следующий переход (или отыграть целый матч)
+
+    def run(self, scene):
+        """Главный цикл приложения, начиная со сцены scene."""
+        self.push(scene)
+        while True:
+            self.apply_pending()
+            if not self.running:
+                break
+            self.clock.tick(self.fps)
+            top = self.top
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    self.quit()
+                    break
+                top.handle_event(event)
+            if not self.running:
+                break
+            top.update()
+            top.draw(self.screen)
+            pygame.display.flip()
+        print(f"[MENU] Scene stats: {self.stats}, assets: {assets.stats}")
+        assets.clear()
+        cache.clear()
+        pygame.quit()
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """'host' или 'host:port' из поля ввода -> (host, port)."""
+    host, _, port = text.strip().partition(':')
+    return host, int(port) if port.isdigit() else default_port
+
+
+class MatchScene(Scene):
+    """Сетевой матч: GameClient на окне приложения. После матча — назад по стеку.
+
+    error — почему не удалось подключиться (None — матч состоялся).
+    player_id=None — сервер сам выдаст свободный слот (номер корабля придёт в hello_ack),
+    так два игрока из меню попадают в одну комнату.
+    """
+
+    size = (WIDTH, HEIGHT)
+    fullscreen = False
+
+    def __init__(self, manager, host, port=DEFAULT_PORT, nickname=None, player_id=None):
+        super().__init__(manager)
+        self.host = host
+        self.port = port
+        self.nickname = nickname
+        self.player_id = player_id
+        self.error = None
+
+    def enter(self):
+        from clientTCP import GameClient  # Сетевой клиент нужен только тем, кто играет по сети
+        client = GameClient(server_host=self.host, server_port=self.port, player_id=self.player_id,
+                            nickname=self.nickname, screen=self.manager.screen)
+        try:
+            client.connect()
+        except (OSError, ValueError) as e:  # Нет сервера, таймаут или испорченный hello_ack
+            print(f"[CLIENT] Cannot connect to {self.host}:{self.port}: {e}")
+            self.error = str(e)
+            client.client_socket.close()
+        self.manager.pop()
+
+
+class PveScene(Scene):
+    """Игрок против бота (pve.run_pve) на окне приложения."""
+
+    size = (WIDTH, HEIGHT)
+    fullscreen = False
+
+    def enter(self):
+        import pve
+        pve.run_pve(screen=self.manager.screen)
+        self.manager.pop()
+
+
+def load_winners():
+    """Последние LEADERBOARD_SIZE результатов из winners.txt, новые сверху."""
+    try:
+        with open(WINNERS_FILE, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()][-LEADERBOARD_SIZE:][::-1]
+    except FileNotFoundError:
+        return []  # Ещё не было ни одной игры
+
+
+def draw_leaderboard(screen, lines, prompt):
+    """Таблица лидеров на весь screen (общая для LeaderboardScene и экрана после матча)."""
+    width, height = screen.get_size()
+    size = max(24, height // 20)
+    screen.fill((0, 0, 0))
+    title = cache.text("LEADERBOARD", size * 2, (255, 255, 255))
+    screen.blit(title, (width // 2 - title.get_width() // 2, height // 10))
+    for idx, line in enumerate(lines or ["No games yet"]):
+        entry = cache.text(line, size, (255, 255, 255))
+        screen.blit(entry, (width // 2 - entry.get_width() // 2, height // 10 + size * 3 + idx * size * 3 // 2))
+    prompt_surface = cache.text(prompt, size, (255, 255, 255))
+    screen.blit(prompt_surface, (width // 2 - prompt_surface.get_width() // 2, height - size * 3))
+
+
+class LeaderboardScene(Scene):
+    """Последние результаты из winners.txt. Любая клавиша или щелчок — назад."""
+
+    def enter(self):
+        self.lines = load_winners()
+
+    def handle_event(self, event):
+        if event.type in (pygame.KEYDOWN, pygame.MOUSEBUTTONDOWN):
+            self.manager.pop()
+
+    def draw(self, screen):
+        draw_leaderboard(screen, self.lines, "Press any key to return")
@@ -0,0 +1,106 @@
+# scheduler.py
+import time
+from settings import FPS
+
+# Допуск на погрешность float при сравнении аккумулятора с шагом
+EPSILON = 1e-9
+
+
+class FixedStepScheduler:
+    """Планировщик игрового цикла с фиксированным шагом симуляции.
+
+    Время берётся из монотонных часов (time.monotonic), поэтому перевод
+    системных часов не ускоряет и не замедляет игру. Прошедшее время копится
+    в аккумуляторе и расходуется шагами по 1/sim_rate; если сервер отстал,
+    за один кадр выполняется до max_steps шагов подряд, а остаток отставания
+    отбрасывается (чтобы не уйти в "спираль смерти").
+    Рассылка состояния идёт со своей частотой broadcast_rate.
+
+    Счётчики в stats:
+      ticks         — выполнено шагов симуляции;
+      late_ticks    — шаги, выполненные в режиме догонялки (цикл проснулся с опозданием);
+      overruns      — шаги, длившиеся дольше своего бюджета 1/sim_rate;
+      dropped_ticks — шаги, отброшенные из-за ограничения max_steps;
+      broadcasts    — выполнено рассылок;
+      worst_tick    — самая долгая длительность шага в секундах.
+    """
+
+    def __init__(self, sim_rate=FPS, broadcast_rate=FPS, max_steps=5, clock=time.monotonic, sleep=time.sleep):
+        self.step_dt = 1.0 / sim_rate
+        self.broadcast_interval = 1.0 / broadcast_rate
+        self.max_steps = max_steps
+        self.clock = clock
+        self.sleep = sleep
+        self.running = False
+        self.stats = {
+            'ticks': 0,
+            'late_ticks': 0,
+            'overruns': 0,
+            'dropped_ticks': 0,
+            'broadcasts': 0,
+            'worst_tick': 0.0,
+        }
+        self._accumulator = 0.0
+        self._last = None
+        self._next_broadcast = None
+
+    def run_frame(self, step, broadcast=None):
+        """Выполняет накопившиеся шаги и, если пора, рассылку.
+
+        Возвращает, сколько секунд можно спать до следующего события.
+        """
+        now = self.clock()
+        if self._last is None:
+            self._last = now
+            self._next_broadcast = now
+        self._accumulator += now - self._last
+        self._last = now
+
+        stats = self.stats
+        steps = 0
+        while self._accumulator + EPSILON >= self.step_dt and steps < self.max_steps:
+            started = self.clock()
+            step()
+            duration = self.clock() - started
+
+            stats['ticks'] += 1
+            if steps > 0:
+                stats['late_ticks'] += 1
+            if duration > self.step_dt:
+                stats['overruns'] += 1
+            if duration > stats['worst_tick']:
+                stats['worst_tick'] = duration
+            self._accumulator -= self.step_dt
+            steps += 1
+
+        if self._accumulator + EPSILON >= self.step_dt:
+            # Догнать не успеваем — отбрасываем хвост, оставляя дробную часть шага
+            dropped = int((self._accumulator + EPSILON) // self.step_dt)
+            stats['dropped_ticks'] += dropped
+            self._accumulator -= dropped * self.step_dt
+
+        now = self.clock()
+        if broadcast is not None and now >= self._next_broadcast:
+            broadcast()
+            stats['broadcasts'] += 1
+            self._next_broadcast += self.broadcast_interval
+            if self._next_broadcast < now:
+                # Сильно отстали — не пытаемся разослать пропущенные кадры
+                self._next_broadcast = now + self.broadcast_interval
+
+        until_step = self.step_dt - self._accumulator - (now - self._last)
+        wait = until_step
+        if broadcast is not None:
+            wait = min(wait, self._next_broadcast - now)
+        return max(0.0, wait)
+
+    def run(self, step, broadcast=None, is_running=None):
+        """Крутит цикл, пока is_running() (или пока не вызван stop())."""
+        self.running = True
+        while self.running and (is_running is None or is_running()):
+            wait = self.run_frame(step, broadcast)
+            if wait > 0:
+                self.sleep(wait)
+
+    def stop(self):
+        self.running = False
@@ -0,0 +1,113 @@
+# sendrate.py
+from settings import FPS
+
+MIN_SEND_RATE = 10  # Гц: реже снимки не шлём даже перегруженному клиенту
+START_SEND_RATE = 30  # Гц: с этой частоты начинает новое соединение
+INCREASE_STEP = 2  # Гц за шаг роста
+INCREASE_INTERVAL = 0.5  # Секунд между шагами роста
+DECREASE_FACTOR = 0.7  # Во сколько раз снижаем частоту при перегрузке
+RTT_INFLATION = 2.0  # srtt больше min_rtt во столько раз (плюс RTT_SLACK) — очередь в сети
+RTT_SLACK = 0.03  # Секунд: допуск на джиттер, чтобы не реагировать на шум
+WAITING_RATE = 1  # Гц: waiting_for_players при неизменном числе игроков
+
+
+class SendRateController:
+    """Частота отправки снимков одному клиенту (AIMD, как у TCP).
+
+    Частота растёт на INCREASE_STEP каждые INCREASE_INTERVAL секунд, пока
+    клиент успевает, и умножается на DECREASE_FACTOR (не чаще раза за srtt),
+    если видна перегрузка:
+      - в очереди отправки больше одного сообщения или снимки выбрасывались;
+      - сглаженный RTT (по ack снимков) сильно вырос относительно минимального.
+    Если задан max_bandwidth (байт/с), частота не превышает
+    max_bandwidth / средний размер снимка.
+
+    Счётчики в stats: rate, srtt, min_rtt, sent, increases, decreases.
+    """
+
+    def __init__(self, max_rate=FPS, min_rate=MIN_SEND_RATE, start_rate=START_SEND_RATE, max_bandwidth=None):
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.rate = max(self.min_rate, min(start_rate, max_rate))
+        self.max_bandwidth = max_bandwidth
+        self.next_send = None
+        self.sent_at = {}  # seq -> время отправки, для RTT по ack
+        self.srtt = None
+        self.min_rtt = None
+        self.avg_size = None
+        self.last_change = 0.0
+        self.last_dropped = 0
+        self.stats = {
+            'rate': self.rate,
+            'srtt': None,
+            'min_rtt': None,
+            'sent': 0,
+            'increases': 0,
+            'decreases': 0,
+        }
+
+    def congested(self, conn_stats):
+        dropped = conn_stats.get('dropped_snapshots', 0)
+        new_drops = dropped > self.last_dropped
+        self.last_dropped = dropped
+        if new_drops or conn_stats.get('depth', 0) > 1:
+            return True
+        return (self.srtt is not None and
+                self.srtt > self.min_rtt * RTT_INFLATION + RTT_SLACK)
+
+    def adapt(self, now, conn_stats):
+        """Пересчитывает частоту по состоянию соединения."""
+        stats = self.stats
+        if self.congested(conn_stats):
+            if now - self.last_change >= (self.srtt or INCREASE_INTERVAL):
+                self.rate = max(self.min_rate, self.rate * DECREASE_FACTOR)
+                self.last_change = now
+                stats['decreases'] += 1
+        elif self.rate < self.max_rate and now - self.last_change >= INCREASE_INTERVAL:
+            self.rate = min(self.max_rate, self.rate + INCREASE_STEP)
+            self.last_change = now
+            stats['increases'] += 1
+        if self.max_bandwidth and self.avg_size:
+            self.rate = max(self.min_rate, min(self.rate, self.max_bandwidth / self.avg_size))
+        stats['rate'] = self.rate
+
+    def due(self, now, conn_stats):
+        """Пора ли отправлять клиенту очередной снимок."""
+        if self.next_send is None:
+            self.next_send = now
+            self.last_change = now
+        if now < self.next_send:
+            return False
+        self.adapt(now, conn_stats)
+        return True
+
+    def on_sent(self, now, seq, nbytes):
+        interval = 1.0 / self.rate
+        self.next_send += interval
+        if self.next_send < now:
+            self.next_send = now + interval
+        self.sent_at[seq] = now
+        if len(self.sent_at) > 2 * FPS:
+            # ack приходят не на каждый снимок — старые записи не копим
+            for old in sorted(self.sent_at)[:len(self.sent_at) - FPS]:
+                del self.sent_at[old]
+        self.avg_size = nbytes if self.avg_size is None else self.avg_size * 0.9 + nbytes * 0.1
+        self.stats['sent'] += 1
+
+    def reset_rtt(self):
+        """Снимки пошли другим путём (TCP -> UDP): прежние замеры RTT к нему не относятся."""
+        self.sent_at.clear()
+        self.srtt = None
+        self.min_rtt = None
+        self.stats['srtt'] = None
+        self.stats['min_rtt'] = None
+
+    def on_ack(self, now, seq):
+        sent = self.sent_at.pop(seq, None)
+        if sent is None:
+            return
+        sample = now - sent
+        self.min_rtt = sample if self.min_rtt is None else min(self.min_rtt, sample)
+        self.srtt = sample if self.srtt is None else self.srtt * 0.875 + sample * 0.125
+        self.stats['srtt'] = self.srtt
+        self.stats['min_rtt'] = self.min_rtt
@@ -1,15 +1,16 @@
 import socket
 import threading
 import json
-import time
-import random
 
 # Импорт необходимых классов из ваших файлов
-from utils import WIDTH, HEIGHT, FPS, MAX_ASTEROIDS, GAME_TIME
-from ship import Ship
-from asteroid import AsteroidManager
-from laser import LaserManager
-from gamelogic import GameLogic
+from settings import FPS
+from scheduler import FixedStepScheduler
+from protocol import negotiate
+from framing import LineReader, FrameTooLarge, MAX_HELLO_SIZE
+from rooms import RoomManager, MAX_ROOMS
+from lagcomp import MAX_REWIND
+from udptransport import UdpEndpoint
+from outqueue import QueuedConnection
 
 HOST = "192.168.22.175"  # IP-адрес сервера (пропишите нужный)
 PORT = 12355  # Порт сервера
@@ -17,58 +18,41 @@ PORT = 12355  # Порт сервера
 
 class GameServer:
     """
-    Сервер, хранящий ровно 2 слота игроков (единственная сессия).
-    Когда оба подключены, идет игра.
-    Если один отключился, сервер ждет его повторного подключения.
-    Логика столкновений, стрельбы и т.д. осуществляется через классы:
-      - GameLogic
-      - AsteroidManager
-      - LaserManager
-      - Ship
+    Сервер многих матчей: каждый матч — комната (Room) на 2 слота игроков
+    со своими кораблями, AsteroidManager, LaserManager и GameLogic.
+    hello выбирает комнату (payload.room) или подбирает ожидающую/новую,
+    см. RoomManager. Все комнаты крутятся на одном FixedStepScheduler.
     """
 
-    def __init__(self, host=HOST, port=PORT):
+    def __init__(self, host=HOST, port=PORT, sim_rate=FPS, broadcast_rate=FPS, max_rooms=MAX_ROOMS,
+                 max_rewind=MAX_REWIND, udp=True, netsim=None, prefix=''):
         self.host = host
         self.port = port
 
+        self.server_socket = None  # Создаётся в start()
+        # UDP-канал для снимков и ввода (см. udptransport.py); netsim — имитатор потерь и задержки
+        self.udp = UdpEndpoint(self.handle_udp_message, port, netsim) if udp else None
+        self.udp_socket = None
+        # max_rewind — предел отката целей (сек) при проверке попаданий лазеров, см. lagcomp.py
+        # prefix — префикс номеров комнат (номер шарда в shard.py)
+        self.rooms = RoomManager(max_rooms, prefix=prefix, tick_rate=sim_rate, send_rate=broadcast_rate,
+                                 max_rewind=max_rewind)
+        self.running = True
+
+        # Частоты симуляции и рассылки задаются отдельно
+        self.scheduler = FixedStepScheduler(sim_rate=sim_rate, broadcast_rate=broadcast_rate)
+
+    def start(self):
         self.server_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         self.server_socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
         self.server_socket.bind((self.host, self.port))
         self.server_socket.listen()
-
-        # Сессия из 2 слотов (player_id = 0 или 1)
-        self.players = [
-            {
-                'conn': None,
-                'addr': None,
-                'connected': False,
-                'ship_id': 0,
-            },
-            {
-                'conn': None,
-                'addr': None,
-                'connected': False,
-                'ship_id': 1,
-            }
-        ]
-
-        self.game_started = False
-
-        # Инициализируем игровые объекты
-        # (На сервере screen = None, чтобы не рисовать, но логика Ship все равно работает)
-        self.ship1 = Ship(None, 0)
-        self.ship2 = Ship(None, 1)
-        self.ships = [self.ship1, self.ship2]
-
-        self.asteroid_manager = AsteroidManager(MAX_ASTEROIDS)
-        self.laser_manager = LaserManager()
-        self.logic = GameLogic(self.ships, self.asteroid_manager, self.laser_manager, max_time=GAME_TIME)
-
-        self.running = True
-        self.game_ended = False  # Флаг, чтобы при завершении игры показать результат
-
-    def start(self):
         print(f"[SERVER] Started on {self.host}:{self.port}")
+        if self.udp is not None:
+            self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self.udp_socket.bind((self.host, self.port))
+            self.udp.attach(self.udp_socket.sendto)
+            threading.Thread(target=self.udp_loop, daemon=True).start()
         # Поток игрового цикла
         threading.Thread(target=self.game_loop, daemon=True).start()
 
@@ -79,31 +63,49 @@ class GameServer:
             t = threading.Thread(target=self.handle_raw_connection, args=(conn, addr), daemon=True)
             t.start()
 
-    def reset_game(self):
-        """Сброс игрового состояния."""
-        self.start_time = time.time()
-        self.points = [0] * len(self.ships)
-        self.asteroid_manager.asteroids.clear()
-        self.laser_manager.lasers.clear()
-        print("[SERVER] Game reset.")
+    def udp_loop(self):
+        """Приём датаграмм UDP-канала."""
+        while self.running:
+            try:
+                data, addr = self.udp_socket.recvfrom(65535)
+            except OSError as e:
+                print(f"[SERVER] UDP socket closed: {e}")
+                break
+            try:
+                self.udp.handle_datagram(data, addr)
+            except Exception as e:
+                # Без этого потока все клиенты всех комнат теряют UDP-ввод и ack
+                print(f"[SERVER] UDP datagram from {addr} failed: {e}")
+                self.udp.stats['bad'] += 1
+
+    def handle_udp_message(self, channel, msg):
+        """Сообщение (input/ack), пришедшее по UDP-каналу слота."""
+        room, slot_id = channel.owner
+        if room.owns(slot_id, channel.conn):
+            room.process_message(msg, slot_id)
 
     def handle_raw_connection(self, conn, addr):
         """
-        1) Получаем первое сообщение: {action:'hello', payload:{player_id:0/1}}
-        2) Если слот свободен, назначаем его и переходим к чтению сообщений.
+        1) Получаем первое сообщение: {action:'hello', payload:{player_id:0/1, room:...}}
+        2) Если нашлась комната со свободным слотом, садим игрока и переходим к чтению сообщений.
         """
-        buffer_str = ""
         try:
-            # Ждём первое сообщение
-            data = conn.recv(4096)
-            if not data:
+            # Ждём первое сообщение (hello всегда приходит JSON-строкой)
+            hello = LineReader(MAX_HELLO_SIZE, recv_size=MAX_HELLO_SIZE)
+            line = None
+            try:
+                while line is None:
+                    if not hello.recv_into(conn):
+                        conn.close()
+                        return
+                    line = hello.next_frame()
+            except FrameTooLarge as e:
+                print(f"[SERVER] Bad hello from {addr}: {e}")
                 conn.close()
                 return
-            buffer_str += data.decode('utf-8')
-            # Берём первую строку
-            line, _, remainder = buffer_str.partition('\n')
-            buffer_str = remainder
-            line = line.strip()
+            # Первая строка — hello; остаток — уже сообщения в выбранном кодеке
+            line = bytes(line).strip()
+            remainder = hello.take()
             if not line:
                 print("[SERVER] No JSON on first line, closing.")
                 conn.close()
@@ -116,266 +118,129 @@ class GameServer:
                 conn.close()
                 return
 
-            if msg.get('action') != 'hello':
-                print("[SERVER] First message not 'hello', closing connection.")
-                conn.close()
-                return
-
-            wanted_id = msg.get('payload', {}).get('player_id')
-            if wanted_id not in (0, 1):
-                print("[SERVER] Invalid player_id in hello.")
-                conn.close()
-                return
-
-            # Пытаемся занять слот
-            player_slot = self.players[wanted_id]
-            if player_slot['connected']:
-                print(f"[SERVER] Slot {wanted_id} is already connected.")
-                conn.close()
+            # Запись идёт через очередь и отдельный поток — тик никогда не ждёт sendall
+            queued = QueuedConnection(conn)
+            claimed = self.claim_slot(msg, queued, addr)
+            if claimed is None:
+                queued.close()
                 return
-            # Иначе занимаем
-            player_slot['conn'] = conn
-            player_slot['addr'] = addr
-            player_slot['connected'] = True
-
-            print(f"[SERVER] Player slot {wanted_id} connected from {addr}")
-
-            # Проверяем, подключены ли оба игрока
-            if all(player['connected'] for player in self.players):
-                print("[SERVER] Both players connected. Starting the game...")
-                self.logic.start_time = time.time()  # Устанавливаем стартовое время
-                self.game_started = True
+            room, slot_id, codec = claimed
 
             # Переходим к циклу чтения остальных сообщений
-            self.handle_client_loop(conn, wanted_id, buffer_str)
+            self.handle_client_loop(conn, queued, room, slot_id, codec.decoder(), remainder)
 
         except Exception as e:
             print(f"[SERVER] Exception in handle_raw_connection: {e}")
         finally:
             pass
 
-    def handle_client_loop(self, conn, slot_id, buffer_str):
-        """Построчный прием команд (update_position, shoot, и т.д.)"""
+    def claim_slot(self, msg, conn, addr):
+        """
+        Проверяет hello и сажает игрока в комнату.
+        Возвращает (room, slot_id, codec) или None, если соединение нужно закрыть.
+        conn — соединение с очередью отправки: send(data, droppable)/close()
+        (QueuedConnection или AsyncConnection).
+        """
+        if msg.get('action') != 'hello':
+            print("[SERVER] First message not 'hello', closing connection.")
+            return None
+
+        payload = msg.get('payload', {})
+        wanted_id = payload.get('player_id')
+        if wanted_id not in (0, 1, None):
+            print("[SERVER] Invalid player_id in hello.")
+            return None
+        room_id = payload.get('room')
+        if room_id is not None:
+            room_id = str(room_id)
+
+        # Договариваемся о кодеке: клиент, предложивший список codecs,
+        # получает hello_ack (с номером комнаты) и дальше общается в выбранном формате
+        offered = payload.get('codecs')
+        codec = negotiate(offered)
+
+        # Клиент может ограничить частоту снимков ("send_rate", Гц), но не поднять выше серверной
+        max_rate = payload.get('send_rate')
+        if not isinstance(max_rate, (int, float)) or max_rate <= 0:
+            max_rate = None
+
+        # UDP предлагаем только в hello_ack, то есть клиентам, договорившимся о кодеке
+        udp = None
+        if payload.get('udp') and offered is not None and self.udp is not None and self.udp.ready:
+            udp = self.udp.open(conn, codec)
+
+        joined = self.rooms.join(room_id, wanted_id, conn, addr, codec, ack=offered is not None,
+                                 max_rate=max_rate, udp=udp)
+        if joined is None:
+            print(f"[SERVER] No free slot for player_id={wanted_id} room={room_id}.")
+            if udp is not None:
+                udp.close()
+            return None
+        room, slot_id = joined
+        if udp is not None:
+            udp.owner = (room, slot_id)
+        return room, slot_id, codec
+
+    def release_slot(self, room, slot_id, conn):
+        """Освобождает слот комнаты после отключения клиента."""
+        room.release_slot(slot_id, conn)
+
+    def handle_client_loop(self, sock, conn, room, slot_id, decoder, pending=b''):
+        """Прием команд (update_position, shoot, и т.д.) в кодеке соединения.
+
+        sock — сокет для чтения, conn — его очередь отправки.
+        """
+        try:
+            for msg in decoder.feed(pending):
+                room.process_message(msg, slot_id)
+        except FrameTooLarge as e:
+            print(f"[SERVER] Room {room.room_id}: slot {slot_id} sent a bad frame: {e}")
+            self.release_slot(room, slot_id, conn)
+            return
         while self.running:
             try:
-                data = conn.recv(4096)
-                if not data:
-                    print(f"[SERVER] Slot {slot_id} disconnected (no data).")
+                # Читаем прямо в буфер декодера — без промежуточных bytes
+                if not decoder.recv_into(sock):
+                    print(f"[SERVER] Room {room.room_id}: slot {slot_id} disconnected (no data).")
+                    break
+                if not room.owns(slot_id, conn):
+                    # Слот уже отдан (ошибка записи), комната могла уйти в пул
                     break
-                buffer_str += data.decode('utf-8')
-
-                # Построчный парсинг
-                while '\n' in buffer_str:
-                    line, buffer_str = buffer_str.split('\n', 1)
-                    line = line.strip()
-                    if not line:
-                        continue
-                    try:
-                        msg = json.loads(line)
-                        self.process_message(msg, slot_id)
-                    except json.JSONDecodeError as e:
-                        print(f"[SERVER] JSON decode error: {e}, line={repr(line)}")
-                        continue
+                for msg in decoder.messages():
+                    room.process_message(msg, slot_id)
+            except FrameTooLarge as e:
+                print(f"[SERVER] Room {room.room_id}: slot {slot_id} sent a bad frame: {e}")
+                break
             except ConnectionResetError:
-                print(f"[SERVER] Slot {slot_id} - ConnectionResetError")
+                print(f"[SERVER] Room {room.room_id}: slot {slot_id} - ConnectionResetError")
                 break
             except Exception as e:
-                print(f"[SERVER] Slot {slot_id} exception: {e}")
+                print(f"[SERVER] Room {room.room_id}: slot {slot_id} exception: {e}")
                 break
 
         # Если дошли сюда — клиент отключился
-        self.players[slot_id]['connected'] = False
-        self.players[slot_id]['conn'] = None
-        self.players[slot_id]['addr'] = None
-        try:
-            conn.close()
-        except:
-            pass
-        print(f"[SERVER] Slot {slot_id} cleaned up.")
-
-    def save_winner_info(self, winner, p1_score, p2_score):
-        """
-        Сохраняем информацию о победителе в текстовый файл.
-        winner = 0 (ничья), 1 (player1), 2 (player2)
-        """
-        if winner == 1:
-            winner_name = "Player1"
-            winner_score = p1_score
-        elif winner == 2:
-            winner_name = "Player2"
-            winner_score = p2_score
-        else:
-            winner_name = "Draw"
-            winner_score = p1_score  # или p2_score, ведь они равны при ничьей
-
-        # Простой вариант — дописывать в текстовый файл.
-        # Можно заменить на SQLite/JSON и т.д.
-        with open("winners.txt", "a", encoding="utf-8") as f:
-            f.write(f"{winner_name} | Score: {winner_score} | (P1={p1_score}, P2={p2_score})\n")
-
-        print(f"[SERVER] Winner saved: {winner_name}, score={winner_score}")
-
-    def load_leaderboard():
-        """
-        Читает файл winners.txt и возвращает список строк (результаты игр).
-        """
-        leaderboard = []
-        try:
-            with open("winners.txt", "r", encoding="utf-8") as f:
-                # Читаем все строки
-                lines = f.readlines()
-                # Можно просто сохранить строки как есть
-                leaderboard = [line.strip() for line in lines]
-        except FileNotFoundError:
-            # Если файл не найден, значит, ещё не было ни одной игры
-            leaderboard = []
-        return leaderboard
-
-    def process_message(self, msg, slot_id):
-        """Обработка действий от клиента (update_position, shoot и т.д.)"""
-        action = msg.get('action')
-        payload = msg.get('payload', {})
-
-        if action == 'update_position':
-            pos = payload.get('pos', [0, 0])
-            angle = payload.get('angle', 0)
-            if 0 <= slot_id < len(self.ships):
-                # Обновляем координаты конкретного корабля
-                self.ships[slot_id].rect.center = pos
-                self.ships[slot_id].angle = angle
-
-        elif action == 'restart':
-            print(f"[SERVER] Player {slot_id} requested a restart.")
-            self.logic.reset_game()  # Сбрасываем состояние игры
-            for ship in self.ships:
-                ship.reset()
-
-        elif action == 'shoot':
-            if 0 <= slot_id < len(self.ships):
-                can_shoot, (lx, ly) = self.ships[slot_id].try_shoot()
-                if can_shoot:
-                    self.laser_manager.shoot_laser(lx, ly, self.ships[slot_id].angle, slot_id)
-
-        else:
-            # Можно добавить ready, respawn, etc.
-            print(f"[SERVER] Unknown action: {action}")
+        self.release_slot(room, slot_id, conn)
 
     def game_loop(self):
-        """Основной игровой цикл на сервере."""
-        last_time = time.time()
-        while self.running:
-            now = time.time()
-            dt = now - last_time
-            if dt < 1.0 / FPS:
-                time.sleep(1.0 / FPS - dt)
-            last_time = now
-
-            # Если игра не началась, ждем подключения обоих игроков
-            if not self.game_started:
-                self.broadcast_state()  # Отправляем текущее состояние (например, "ждем второго игрока")
-                continue
-
-            # Иначе полноценная игровая логика
-            if len(self.asteroid_manager.asteroids) < MAX_ASTEROIDS:
-                self.asteroid_manager.spawn_asteroid()
-
-            game_over = self.logic.update()
-
-            if game_over and not self.game_ended:
-                # Игра закончена, сообщаем результат
-                self.game_ended = True
-                p1_score = self.logic.points[0]
-                p2_score = self.logic.points[1]
-                if p1_score > p2_score:
-                    winner = 1  # Player 1 (slot 0, но человек видит +1)
-                elif p2_score > p1_score:
-                    winner = 2
-                else:
-                    winner = 0  # ничья
-
-                self.save_winner_info(winner, p1_score, p2_score)
-
-                end_msg = {
-                    'event': 'game_over',
-                    'payload': {
-                        'scores': [p1_score, p2_score],
-                        'winner': winner  # 0=draw, 1=first ship, 2=second ship
-                    }
-                }
-                self.broadcast_message(end_msg)
-
-            self.broadcast_state()
-
-        print("[SERVER] game_loop finished.")
-        self.server_socket.close()
+        """Основной игровой цикл на сервере (фиксированный шаг, см. FixedStepScheduler)."""
+        self.scheduler.run(self.tick, self.broadcast_state, lambda: self.running)
 
+        print(f"[SERVER] game_loop finished. Tick stats: {self.scheduler.stats}, rooms: {self.rooms.stats}")
+        if self.server_socket is not None:
+            self.server_socket.close()
+        if self.udp_socket is not None:
+            self.udp_socket.close()
+
+    def tick(self):
+        """Один шаг симуляции всех комнат."""
+        self.rooms.tick()
 
     def broadcast_state(self):
         """
-        Отправка текущего состояния (корабли, астероиды, лазеры, время, очки).
-        Вызывается каждый тик в game_loop.
+        Отправка текущего состояния всех комнат (корабли, астероиды, лазеры, время, очки).
+        Вызывается в game_loop с частотой broadcast_rate.
         """
-        # if (self.ship1.is_reloading or self.ship2.is_reloading): print(f"[SERVER] Broadcasting state. Ships: {len(self.ships)}, RELOADING: {self.ship1.is_reloading}, RELOAD_START_TIME: {self.ship1.reload_start_time}, RELOADING2: {self.ship2.is_reloading}, RELOAD_START_TIME2: {self.ship2.reload_start_time}")
-        # if (self.ship1.is_respawning or self.ship2.is_respawning): print(f"[SERVER] Broadcasting state. Ships: {len(self.ships)}, RESSPAWNING: {self.ship1.is_respawning}, RESSPAWNING2: {self.ship2.is_respawning}")
-        if not self.game_started:
-            state = {
-                'event': 'waiting_for_players',
-                'payload': {
-                    'message': 'Waiting for both players to connect...',
-                    'connected': sum(player['connected'] for player in self.players)
-                }
-            }
-            self.broadcast_message(state)
-            return
-
-        state = {
-            'event': 'update_state',
-            'payload': {
-                'ships': [
-                    {
-                        'id': i,
-                        'hp': s.hp,
-                        'pos': [s.rect.centerx, s.rect.centery],
-                        'angle': s.angle,
-                        'shots': s.shots,
-                        'is_respawning': s.is_respawning,
-                        'is_reloading': s.is_reloading,
-                    }
-                    for i, s in enumerate(self.ships)
-                ],
-                'asteroids': [
-                    {
-                        'pos': ast['pos'],
-                        'radius': ast['radius'],
-                        'color': ast['color'],  # Дополнительно, если хотим
-                    }
-                    for ast in self.asteroid_manager.asteroids
-                ],
-                'lasers': [
-                    {
-                        'pos': l['pos'],
-                        'owner': l['owner']
-                    }
-                    for l in self.laser_manager.lasers
-                ],
-                'score': self.logic.points,  # Текущие очки
-                'time_left': self.logic.get_time_left(),
-            }
-        }
-        self.broadcast_message(state)
-
-    def broadcast_message(self, message):
-        """Отправка одного JSON-сообщения всем подключённым слотам."""
-        data = (json.dumps(message) + '\n').encode('utf-8')
-        for p in self.players:
-            if p['connected'] and p['conn'] is not None:
-                try:
-                    p['conn'].sendall(data)
-                except Exception as e:
-                    print(f"[SERVER] sendall to slot {p['ship_id']} failed: {e}")
-                    p['connected'] = False
-                    p['conn'] = None
-                    p['addr'] = None
+        self.rooms.broadcast_state()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,22 @@
+# settings.py
+# Константы игры без зависимостей от pygame — их импортирует и сервер, и клиент.
+
+WIDTH = 800
+HEIGHT = 600
+
+BLACK = (0, 0, 0)
+WHITE = (255, 255, 255)
+GREY = (101, 101, 101)
+RED = (235, 15, 15)
+ORANGE = (237, 118, 14)
+BLUE = (15, 15, 235)
+YELLOW = (255, 255, 0)
+
+FPS = 60
+
+# Отрисовка только изменившихся прямоугольников (render.DirtyRenderer) вместо flip всего окна
+DIRTY_RECTS = False
+
+# Параметры астероидов и игры
+MAX_ASTEROIDS = 10
+GAME_TIME = 10
@@ -0,0 +1,477 @@
+# shard.py
+# Шардированный режим сервера: комнаты распределены по нескольким процессам.
+#
+# Фронт-процесс (ShardFront, asyncio) принимает TCP-соединения, читает hello
+# и направляет соединение в один из N процессов-воркеров (ShardWorker). Дальше
+# фронт только пересылает сырые байты в обе стороны — ни JSON, ни bin1 он не
+# разбирает и не перекодирует. Каждый воркер — обычный GameServer со своим
+# RoomManager и планировщиком, так что матчи крутятся на разных ядрах.
+#
+# Фронт и воркер связаны multiprocessing.Pipe. Одно сообщение в канале — пачка
+# записей: заголовок (вид, conn_id, длина) + байты. Виды записей:
+#   фронт -> воркер: K_OPEN (адрес + строка hello), K_DATA, K_CLOSE, K_CONN_STATS
+#   (счётчики очереди отправки клиента на фронте — для SendRateController воркера);
+#   воркер -> фронт: K_SEND, K_SEND_DROPPABLE (снимок, который можно выбросить
+#   при переполнении очереди клиента), K_DROP (закрыть соединение), K_STATS.
+#
+# Падение воркера затрагивает только его матчи: фронт закрывает его соединения
+# и запускает новый процесс на том же месте.
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+
+from serverTCP import GameServer, HOST, PORT
+from settings import FPS
+from aioserver import AsyncConnection, MAX_HELLO_SIZE
+from rooms import MAX_ROOMS
+from lagcomp import MAX_REWIND
+
+K_OPEN = 1
+K_DATA = 2
+K_CLOSE = 3
+K_SEND = 4
+K_SEND_DROPPABLE = 5
+K_DROP = 6
+K_STATS = 7
+K_CONN_STATS = 8
+
+_RECORD = struct.Struct('!BII')  # вид, conn_id, длина
+_CONN_STATS = struct.Struct('!III')  # depth, bytes_in_flight, dropped_snapshots
+
+STATS_INTERVAL = 1.0  # Как часто воркер сообщает фронту свою нагрузку (секунды)
+LOAD_HIGH_WATER = 0.8  # Доля бюджета тика, выше которой воркер не получает новых матчей
+STATS_LOG_INTERVAL = 30  # Как часто фронт печатает счётчики (секунды)
+
+
+def pack_records(records):
+    """Пачка записей (kind, conn_id, data) -> одно сообщение канала."""
+    parts = []
+    for kind, conn_id, data in records:
+        parts.append(_RECORD.pack(kind, conn_id, len(data)))
+        parts.append(data)
+    return b''.join(parts)
+
+
+def unpack_records(message):
+    """Сообщение канала -> записи (kind, conn_id, memoryview)."""
+    view = memoryview(message)
+    offset = 0
+    while offset < len(view):
+        kind, conn_id, size = _RECORD.unpack_from(view, offset)
+        offset += _RECORD.size
+        yield kind, conn_id, view[offset:offset + size]
+        offset += size
+
+
+class PipeWriter:
+    """Поток, отправляющий записи в канал пачками: отправитель никогда не ждёт канал."""
+
+    def __init__(self, pipe):
+        self.pipe = pipe
+        self.outbox = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self.writer_loop, daemon=True)
+        self.thread.start()
+
+    def put(self, kind, conn_id, data):
+        self.outbox.put((kind, conn_id, bytes(data)))
+
+    def stop(self):
+        self.outbox.put(None)
+
+    def writer_loop(self):
+        while True:
+            records = [self.outbox.get()]
+            while True:
+                try:
+                    records.append(self.outbox.get_nowait())
+                except queue.Empty:
+                    break
+            stop = records[-1] is None
+            records = [r for r in records if r is not None]
+            try:
+                if records:
+                    self.pipe.send_bytes(pack_records(records))
+            except (OSError, ValueError):
+                return
+            if stop:
+                return
+
+
+class PipeConnection:
+    """Соединение клиента внутри воркера: send()/close() превращаются в записи канала.
+
+    Очередь отправки клиента живёт на фронте; её depth, bytes_in_flight и
+    dropped_snapshots фронт присылает записями K_CONN_STATS, так что stats
+    содержит те же счётчики, что у QueuedConnection.
+    """
+
+    def __init__(self, conn_id, writer):
+        self.conn_id = conn_id
+        self.writer = writer
+        self.closed = False
+        self.stats = {
+            'depth': 0,
+            'bytes_in_flight': 0,
+            'dropped_snapshots': 0,
+            'sent_messages': 0,
+            'sent_bytes': 0,
+        }
+
+    def update_queue_stats(self, data):
+        """Счётчики очереди клиента из записи K_CONN_STATS."""
+        stats = self.stats
+        stats['depth'], stats['bytes_in_flight'], stats['dropped_snapshots'] = _CONN_STATS.unpack(data)
+
+    def send(self, data, droppable=False):
+        if self.closed:
+            raise ConnectionError("connection is closed")
+        self.writer.put(K_SEND_DROPPABLE if droppable else K_SEND, self.conn_id, data)
+        self.stats['sent_messages'] += 1
+        self.stats['sent_bytes'] += len(data)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.writer.put(K_DROP, self.conn_id, b'')
+
+
+class ShardWorker(GameServer):
+    """GameServer внутри процесса-воркера: клиенты приходят через канал от фронта."""
+
+    def __init__(self, index, pipe, sim_rate=FPS, broadcast_rate=FPS, max_rooms=MAX_ROOMS, max_rewind=MAX_REWIND):
+        # Датаграммы фронт не маршрутизирует — воркер работает только по TCP
+        # Номер комнаты начинается с номера шарда — по нему фронт находит воркер
+        super().__init__(host=None, port=None, sim_rate=sim_rate, broadcast_rate=broadcast_rate, max_rooms=max_rooms,
+                         max_rewind=max_rewind, udp=False, prefix=f"{index}-")
+        self.index = index
+        self.pipe = pipe
+        self.writer = PipeWriter(pipe)
+        self.sessions = {}  # conn_id -> (room, slot_id, decoder, PipeConnection)
+        self.tick_time = 0.0
+        self.tick_count = 0
+        self.next_stats = time.monotonic() + STATS_INTERVAL
+
+    def start(self):
+        threading.Thread(target=self.pipe_loop, daemon=True).start()
+        self.scheduler.run(self.tick, self.broadcast_state, lambda: self.running)
+        self.writer.stop()
+
+    def pipe_loop(self):
+        """Приём записей от фронта (отдельный поток, как поток соединения в GameServer)."""
+        try:
+            while self.running:
+                message = self.pipe.recv_bytes()
+                for kind, conn_id, data in unpack_records(message):
+                    if kind == K_OPEN:
+                        self.open_session(conn_id, data)
+                    elif kind == K_DATA:
+                        self.feed_session(conn_id, data)
+                    elif kind == K_CLOSE:
+                        self.close_session(conn_id)
+                    elif kind == K_CONN_STATS:
+                        session = self.sessions.get(conn_id)
+                        if session is not None:
+                            session[3].update_queue_stats(data)
+        except (EOFError, OSError):
+            # Фронт закрыл канал — воркеру больше некого обслуживать
+            self.running = False
+
+    def open_session(self, conn_id, data):
+        addr_line, _, hello_line = bytes(data).partition(b'\n')
+        conn = PipeConnection(conn_id, self.writer)
+        try:
+            msg = json.loads(hello_line)
+        except json.JSONDecodeError as e:
+            print(f"[SHARD {self.index}] Invalid JSON on hello: {e}")
+            conn.close()
+            return
+        claimed = self.claim_slot(msg, conn, tuple(json.loads(addr_line)))
+        if claimed is None:
+            conn.close()
+            return
+        room, slot_id, codec = claimed
+        self.sessions[conn_id] = (room, slot_id, codec.decoder(), conn)
+
+    def feed_session(self, conn_id, data):
+        session = self.sessions.get(conn_id)
+        if session is None:
+            return
+        room, slot_id, decoder, conn = session
+        if not room.owns(slot_id, conn):
+            self.close_session(conn_id)
+            return
+        try:
+            for msg in decoder.feed(bytes(data)):
+                room.process_message(msg, slot_id)
+        except Exception as e:
+            print(f"[SHARD {self.index}] Room {room.room_id}: slot {slot_id} exception: {e}")
+            self.close_session(conn_id)
+
+    def close_session(self, conn_id):
+        session = self.sessions.pop(conn_id, None)
+        if session is not None:
+            room, slot_id, _, conn = session
+            self.release_slot(room, slot_id, conn)
+
+    def tick(self):
+        started = time.perf_counter()
+        super().tick()
+        self.tick_time += time.perf_counter() - started
+        self.tick_count += 1
+
+        now = time.monotonic()
+        if now >= self.next_stats:
+            self.next_stats = now + STATS_INTERVAL
+            self.writer.put(K_STATS, 0, json.dumps(self.load_stats()).encode())
+
+    def load_stats(self):
+        """Нагрузка воркера за последний интервал (для балансировки на фронте)."""
+        avg = self.tick_time / self.tick_count if self.tick_count else 0.0
+        stats = {
+            'rooms': len(self.rooms),
+            'sessions': len(self.sessions),
+            'utilization': avg / self.scheduler.step_dt,  # Доля бюджета тика
+            'overruns': self.scheduler.stats['overruns'],
+            'dropped_ticks': self.scheduler.stats['dropped_ticks'],
+            'worst_tick': self.scheduler.stats['worst_tick'],
+        }
+        self.tick_time = 0.0
+        self.tick_count = 0
+        return stats
+
+
+def worker_main(index, pipe, sim_rate, broadcast_rate, max_rooms, max_rewind):
+    """Точка входа процесса-воркера."""
+    print(f"[SHARD {index}] Worker started (pid {os.getpid()})")
+    ShardWorker(index, pipe, sim_rate, broadcast_rate, max_rooms, max_rewind).start()
+
+
+class ShardFront:
+    """Фронт-процесс: принимает соединения и раздаёт их воркерам.
+
+    Выбор воркера для hello:
+      - с room — воркер, чей номер стоит в префиксе комнаты ("2-15" -> 2),
+        для чужих имён — по хешу имени;
+      - без room — воркер, где уже ждёт игрок с другим player_id (чтобы пара
+        попала в одну комнату), иначе наименее загруженный по числу соединений
+        среди воркеров с загрузкой тика ниже LOAD_HIGH_WATER.
+
+    Счётчики на воркер (workers[i]['stats']): connections, routed, bytes_in,
+    bytes_out, restarts, rebalanced (новый матч ушёл мимо перегруженного
+    воркера) и последняя присланная воркером нагрузка load.
+    """
+
+    def __init__(self, host=HOST, port=PORT, num_workers=None, sim_rate=FPS, broadcast_rate=FPS,
+                 max_rooms=MAX_ROOMS, max_rewind=MAX_REWIND):
+        self.host = host
+        self.port = port
+        self.num_workers = num_workers or max(1, (os.cpu_count() or 2) - 1)
+        self.sim_rate = sim_rate
+        self.broadcast_rate = broadcast_rate
+        self.max_rooms = max_rooms
+        self.max_rewind = max_rewind
+        self.mp = multiprocessing.get_context('spawn')  # fork небезопасен при работающих потоках
+        self.workers = []
+        self.conns = {}  # conn_id -> (AsyncConnection, worker index)
+        self.next_conn_id = 1
+        self.waiting = {0: [], 1: [], None: []}  # player_id -> conn_id игроков, ждущих пару
+        self.running = True
+        self.loop = None
+
+    def new_worker_stats(self):
+        return {'connections': 0, 'routed': 0, 'bytes_in': 0, 'bytes_out': 0,
+                'restarts': 0, 'rebalanced': 0, 'load': {}}
+
+    def spawn_worker(self, index):
+        parent, child = self.mp.Pipe()
+        process = self.mp.Process(target=worker_main, daemon=True,
+                                  args=(index, child, self.sim_rate, self.broadcast_rate, self.max_rooms,
+                                        self.max_rewind))
+        process.start()
+        child.close()
+        worker = {
+            'index': index,
+            'process': process,
+            'pipe': parent,
+            'writer': PipeWriter(parent),
+            'stats': self.workers[index]['stats'] if index < len(self.workers) else self.new_worker_stats(),
+        }
+        worker['stats']['load'] = {}
+        if index < len(self.workers):
+            self.workers[index] = worker
+        else:
+            self.workers.append(worker)
+        threading.Thread(target=self.pipe_loop, args=(worker,), daemon=True).start()
+
+    def pipe_loop(self, worker):
+        """Приём записей от воркера; выполнение — в цикле событий фронта."""
+        try:
+            while True:
+                message = worker['pipe'].recv_bytes()
+                self.loop.call_soon_threadsafe(self.dispatch, worker, message)
+        except (EOFError, OSError):
+            if self.running:
+                self.loop.call_soon_threadsafe(self.worker_died, worker)
+
+    def dispatch(self, worker, message):
+        stats = worker['stats']
+        feedback = {}  # conn_id -> счётчики очереди до этой пачки (как их видит тик без фронта)
+        for kind, conn_id, data in unpack_records(message):
+            if kind == K_STATS:
+                stats['load'] = json.loads(bytes(data))
+                continue
+            entry = self.conns.get(conn_id)
+            if entry is None:
+                continue
+            conn = entry[0]
+            if kind == K_DROP:
+                self.forget(conn_id)
+                conn.close()
+                continue
+            if conn_id not in feedback:
+                q = conn.stats
+                feedback[conn_id] = _CONN_STATS.pack(q['depth'], max(0, q['bytes_in_flight']),
+                                                     q['dropped_snapshots'])
+            try:
+                conn.send(bytes(data), droppable=kind == K_SEND_DROPPABLE)
+                stats['bytes_out'] += len(data)
+            except ConnectionError:
+                pass
+        # Воркеру — заполненность очередей его клиентов: без неё частота снимков не снижается
+        for conn_id, data in feedback.items():
+            worker['writer'].put(K_CONN_STATS, conn_id, data)
+
+    def worker_died(self, worker):
+        """Воркер упал: его клиенты отключаются, на его место встаёт новый процесс."""
+        if self.workers[worker['index']] is not worker:
+            return
+        index = worker['index']
+        worker['process'].join(timeout=1)  # Забираем код выхода упавшего процесса
+        lost = [cid for cid, (_, w) in self.conns.items() if w == index]
+        print(f"[SHARD] Worker {index} died (exit code {worker['process'].exitcode}), "
+              f"dropping {len(lost)} connections and restarting.")
+        for conn_id in lost:
+            conn = self.conns[conn_id][0]
+            self.forget(conn_id)
+            conn.close()
+        worker['writer'].stop()
+        worker['stats']['restarts'] += 1
+        self.spawn_worker(index)
+
+    def forget(self, conn_id):
+        entry = self.conns.pop(conn_id, None)
+        if entry is not None:
+            self.workers[entry[1]]['stats']['connections'] -= 1
+        # Отключившийся игрок больше не ждёт пару — иначе списки растут при переподключениях
+        for waiting in self.waiting.values():
+            if conn_id in waiting:
+                waiting.remove(conn_id)
+
+    def pick_worker(self, payload, conn_id):
+        """Номер воркера для hello (см. docstring класса)."""
+        room = payload.get('room')
+        if room is not None:
+            room = str(room)
+            prefix, sep, _ = room.partition('-')
+            if sep and prefix.isdigit() and int(prefix) < self.num_workers:
+                return int(prefix)
+            return zlib.crc32(room.encode()) % self.num_workers
+
+        wanted_id = payload.get('player_id')
+        partners = [self.waiting[1 - wanted_id]] if wanted_id in (0, 1) else []
+        partners.append(self.waiting[None])
+        if wanted_id is None:
+            partners += [self.waiting[0], self.waiting[1]]
+        for waiting in partners:
+            while waiting:
+                entry = self.conns.get(waiting.pop(0))
+                if entry is not None:  # Ждущий игрок мог уже отключиться
+                    return entry[1]
+
+        by_load = sorted(self.workers, key=lambda w: w['stats']['connections'])
+        index = by_load[0]['index']
+        for worker in by_load:
+            if worker['stats']['load'].get('utilization', 0.0) < LOAD_HIGH_WATER:
+                if worker['index'] != index:
+                    self.workers[index]['stats']['rebalanced'] += 1
+                index = worker['index']
+                break
+        self.waiting[wanted_id if wanted_id in (0, 1) else None].append(conn_id)
+        return index
+
+    async def handle_connection(self, reader, writer):
+        addr = writer.get_extra_info('peername')
+        conn = AsyncConnection(writer)
+        try:
+            # hello всегда приходит JSON-строкой; фронт смотрит в него только для выбора воркера
+            line = await reader.readline()
+            payload = json.loads(line).get('payload', {})
+            conn_id = self.next_conn_id
+            self.next_conn_id += 1
+            index = self.pick_worker(payload, conn_id)
+        except (asyncio.LimitOverrunError, ValueError, ConnectionError, TypeError, AttributeError) as e:
+            print(f"[SHARD] Bad hello from {addr}: {e}")
+            conn.close()
+            return
+
+        self.conns[conn_id] = (conn, index)
+        worker = self.workers[index]
+        worker['stats']['connections'] += 1
+        worker['stats']['routed'] += 1
+        worker['writer'].put(K_OPEN, conn_id, json.dumps(list(addr or ())).encode() + b'\n' + line.strip())
+
+        try:
+            while self.running and conn_id in self.conns:
+                data = await reader.read(4096)
+                if not data:
+                    break
+                worker = self.workers[index]  # Воркер мог быть перезапущен
+                worker['stats']['bytes_in'] += len(data)
+                worker['writer'].put(K_DATA, conn_id, data)
+        except ConnectionError as e:
+            print(f"[SHARD] Connection {conn_id} - {e!r}")
+        finally:
+            if conn_id in self.conns:
+                self.forget(conn_id)
+                self.workers[index]['writer'].put(K_CLOSE, conn_id, b'')
+            conn.close()
+
+    def worker_stats(self):
+        return {w['index']: dict(w['stats']) for w in self.workers}
+
+    async def stats_loop(self):
+        while self.running:
+            await asyncio.sleep(STATS_LOG_INTERVAL)
+            print(f"[SHARD] Worker stats: {self.worker_stats()}")
+
+    async def serve(self):
+        self.loop = asyncio.get_running_loop()
+        for index in range(self.num_workers):
+            self.spawn_worker(index)
+        server = await asyncio.start_server(self.handle_connection, self.host, self.port,
+                                            limit=MAX_HELLO_SIZE)
+        print(f"[SHARD] Front started on {self.host}:{self.port} with {self.num_workers} workers")
+        stats_task = asyncio.create_task(self.stats_loop())
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.running = False
+            stats_task.cancel()
+            for worker in self.workers:
+                worker['writer'].stop()
+                worker['process'].terminate()
+
+    def start(self):
+        asyncio.run(self.serve())
+
+
+if __name__ == "__main__":
+    front = ShardFront(HOST, PORT)
+    front.start()
@@ -0,0 +1,201 @@
+# shipstate.py
+import math
+import time
+from settings import WIDTH, HEIGHT, ORANGE, BLUE
+
+SHIP_SIZE = (50, 40)  # Размер спрайта корабля — по нему считается rect
+
+
+class ShipRect:
+    """Минимальная замена pygame.Rect для headless-сервера.
+
+    Хранит левый верхний угол и размер в целых числах, как pygame.Rect,
+    и поддерживает те атрибуты, которыми пользуется игровая логика.
+    """
+
+    def __init__(self, w, h, center=(0, 0)):
+        self.w = w
+        self.h = h
+        self.x = 0
+        self.y = 0
+        self.center = center
+
+    @property
+    def centerx(self):
+        return self.x + self.w // 2
+
+    @centerx.setter
+    def centerx(self, value):
+        self.x = int(value) - self.w // 2
+
+    @property
+    def centery(self):
+        return self.y + self.h // 2
+
+    @centery.setter
+    def centery(self, value):
+        self.y = int(value) - self.h // 2
+
+    @property
+    def center(self):
+        return self.centerx, self.centery
+
+    @center.setter
+    def center(self, value):
+        self.centerx, self.centery = value
+
+    @property
+    def topleft(self):
+        return self.x, self.y
+
+
+class ShipState:
+    """Состояние и правила одного корабля без pygame: движение, стрельба, респаун.
+
+    Используется сервером напрямую; клиентский Ship (ship.py) добавляет к нему
+    клавиши и отрисовку.
+    """
+
+    def __init__(self, number):
+        self.number = number
+
+        # Параметры корабля
+        self.angle = 0
+        self.speed = 5
+        self.radius = 20
+
+        # Параметры здоровья и стрельбы
+        self.start_hp = 3
+        self.hp = self.start_hp
+        self.start_shots = 10
+        self.shots = self.start_shots
+        self.is_reloading = False
+        self.reload_time = 1.5
+        self.reload_start_time = 0
+        self.laser_cooldown = 0.2
+        self.last_laser_time = 0
+
+        # Респаун и неуязвимость
+        self.is_respawning = False
+        self.respawn_start_time = 0
+        self.invincible_time = 0.6
+        self.invincible_until = time.time() + self.invincible_time
+
+        if number == 0:
+            self.start_pos = (WIDTH * 0.2, HEIGHT * 0.2)
+            self.start_angle = 0
+            self.color = ORANGE
+        else:
+            self.start_pos = (WIDTH * 0.8, HEIGHT * 0.8)
+            self.start_angle = 180
+            self.color = BLUE
+
+        self.rect = ShipRect(*SHIP_SIZE, center=self.start_pos)
+        self.angle = self.start_angle
+        self.vel = [0, 0]  # Смещение за последний шаг (для интерполяции на клиенте)
+
+    def set_hp(self, hp):
+        """Устанавливает новое значение HP."""
+        self.hp = hp
+
+    def reset(self):
+        """Сбрасывает состояние корабля после смерти."""
+        self.hp = self.start_hp
+        self.shots = self.start_shots
+        self.is_reloading = False
+        self.is_respawning = False
+        self.angle = self.start_angle
+        self.rect.center = self.start_pos
+        self.vel = [0, 0]
+        self.invincible_until = time.time() + self.invincible_time
+
+    def take_damage(self):
+        """Уменьшает ХП при получении урона."""
+        current_time = time.time()
+
+        # Неуязвимы при респауне?
+        if self.is_respawning or current_time < self.invincible_until:
+            return
+
+        self.hp -= 1
+        self.invincible_until = current_time + self.invincible_time
+        if self.hp <= 0:
+            # Начинаем респаун
+            self.is_respawning = True
+            self.respawn_start_time = current_time
+            print(f"[DEBUG] Ship {self.number} initiated respawn.")
+
+    def step(self, left=False, right=False, up=False, down=False):
+        """Один шаг движения корабля по флагам управления."""
+        current_time = time.time()
+
+        # Проверка, не в процессе ли корабль возрождения
+        if self.is_respawning:
+            # Обработка респауна (2 секунды)
+            elapsed = current_time - self.respawn_start_time
+            if elapsed > 2:  # 2 секунды респауна
+                self.reset()
+                print(f"[DEBUG] Ship {self.number} respawned.")
+            return
+
+        self.move(left, right, up, down)
+
+        # Перезарядка
+        if self.is_reloading:
+            elapsed = current_time - self.reload_start_time
+            if elapsed >= self.reload_time:
+                self.is_reloading = False
+                self.shots = self.start_shots
+                print(f"[DEBUG] ship_{self.number} finished reloading. Elapsed: {elapsed:.2f}s")
+
+    def move(self, left=False, right=False, up=False, down=False):
+        """Поворот и движение за один шаг (без таймеров перезарядки и респауна)."""
+        # Повороты
+        if left:
+            self.angle += 5
+        if right:
+            self.angle -= 5
+
+        # Движение вперед/назад
+        dx = int(self.speed * math.cos(math.radians(self.angle)))
+        dy = int(self.speed * math.sin(math.radians(self.angle)))
+        vx = vy = 0
+        if up:
+            vx += dx
+            vy -= dy
+        if down:
+            vx -= dx
+            vy += dy
+        self.rect.x += vx
+        self.rect.y += vy
+        self.vel = [vx, vy]
+
+        # Телепортируем за границами окна
+        self.rect.x %= WIDTH
+        self.rect.y %= HEIGHT
+
+    def try_shoot(self):
+        """Проверка возможности выстрела.
+           Возвращает (bool, (x, y)) - можно ли стрелять и координаты точки вылета лазера.
+        """
+        current_time = time.time()
+
+        if (self.shots > 0 and
+                not self.is_reloading and
+                (current_time - self.last_laser_time) >= self.laser_cooldown and
+                not self.is_respawning):
+            self.shots -= 1
+            self.last_laser_time = current_time
+
+            # Если боезапас кончился — входим в стадию перезарядки
+            if self.shots <= 0 and not self.is_reloading:
+                self.is_reloading = True
+                self.reload_start_time = current_time
+                print(f"[DEBUG] Reloading started for ship_{self.number}")
+
+            # Возвращаем координаты носа корабля
+            tip_x = self.rect.centerx + self.radius * math.cos(math.radians(self.angle))
+            tip_y = self.rect.centery - self.radius * math.sin(math.radians(self.angle))
+            return True, (tip_x, tip_y)
+
+        return False, (0, 0)
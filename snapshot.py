@@ -0,0 +1,236 @@
+# snapshot.py
+# Дельта-сжатие снимков состояния (update_state) между сервером и клиентом.
+#
+# Снимок — словарь сущностей по стабильным id для каждого вида ('ships',
+# 'asteroids', 'lasers') плюс очки и таймер. Сервер шлёт клиенту разницу
+# с последним подтверждённым (ack) снимком:
+#   {'seq': тик, 'base': тик базы или None (ключевой кадр),
+#    'asteroids': {'spawn': [...], 'change': [...], 'despawn': [id, ...]}, ...}
+# Позиция считается неизменной, если совпадает с прогнозом по скорости
+# (predict_pos): астероиды и лазеры летят по прямой и почти не попадают в дельту.
+import threading
+
+from settings import WIDTH, HEIGHT
+
+ENTITY_KINDS = ('ships', 'asteroids', 'lasers')
+WRAP_KINDS = {'asteroids'}  # Виды, которые переносятся через края поля
+POS_EPS = 0.01  # Допуск сравнения позиции с прогнозом
+KEYFRAME_INTERVAL = 120  # Тиков между принудительными ключевыми кадрами
+HISTORY_SIZE = 256  # Сколько снимков держим для баз дельт
+
+
+def predict_pos(rec, dt, wrap):
+    """Позиция сущности через dt тиков при равномерном движении."""
+    vel = rec.get('vel')
+    pos = rec['pos']
+    if not vel or not dt:
+        return pos
+    x = pos[0] + vel[0] * dt
+    y = pos[1] + vel[1] * dt
+    if wrap:
+        x %= WIDTH
+        y %= HEIGHT
+    return [x, y]
+
+
+def make_snapshot(seq, ships, asteroids, lasers, score, time_left):
+    """Собирает снимок из списков записей сущностей (у каждой есть 'id')."""
+    return {
+        'seq': seq,
+        'ships': {rec['id']: rec for rec in ships},
+        'asteroids': {rec['id']: rec for rec in asteroids},
+        'lasers': {rec['id']: rec for rec in lasers},
+        'score': list(score),
+        'time_left': time_left,
+    }
+
+
+def _pos_changed(pos, predicted):
+    return abs(pos[0] - predicted[0]) > POS_EPS or abs(pos[1] - predicted[1]) > POS_EPS
+
+
+def diff_entities(base, cur, dt, wrap):
+    """Разница двух словарей сущностей: spawn / change / despawn."""
+    spawn, change = [], []
+    for eid, rec in cur.items():
+        old = base.get(eid)
+        if old is None:
+            spawn.append(rec)
+            continue
+        fields = {}
+        for key, value in rec.items():
+            if key == 'pos':
+                if _pos_changed(value, predict_pos(old, dt, wrap)):
+                    fields['pos'] = value
+            elif old.get(key) != value:
+                fields[key] = value
+        if fields:
+            fields['id'] = eid
+            change.append(fields)
+    despawn = [eid for eid in base if eid not in cur]
+
+    delta = {}
+    if spawn:
+        delta['spawn'] = spawn
+    if change:
+        delta['change'] = change
+    if despawn:
+        delta['despawn'] = despawn
+    return delta
+
+
+def make_delta(base, snapshot):
+    """Полезная нагрузка update_state: дельта к base (или ключевой кадр, если base=None)."""
+    dt = snapshot['seq'] - base['seq'] if base is not None else 0
+    payload = {
+        'seq': snapshot['seq'],
+        'base': base['seq'] if base is not None else None,
+        'score': snapshot['score'],
+        'time_left': snapshot['time_left'],
+    }
+    for kind in ENTITY_KINDS:
+        base_entities = base[kind] if base is not None else {}
+        delta = diff_entities(base_entities, snapshot[kind], dt, kind in WRAP_KINDS)
+        if delta:
+            payload[kind] = delta
+    return payload
+
+
+def apply_entities(base, delta, dt, wrap):
+    """Восстанавливает словарь сущностей по базе и дельте."""
+    result = {}
+    despawned = set(delta.get('despawn', ()))
+    for eid, rec in base.items():
+        if eid in despawned:
+            continue
+        moved = dict(rec)
+        moved['pos'] = predict_pos(rec, dt, wrap)
+        result[eid] = moved
+    for fields in delta.get('change', ()):
+        rec = result.get(fields['id'])
+        if rec is not None:
+            rec.update(fields)
+    for rec in delta.get('spawn', ()):
+        result[rec['id']] = dict(rec)
+    return result
+
+
+def apply_delta(base, payload):
+    """Снимок по базе и полезной нагрузке update_state."""
+    dt = payload['seq'] - base['seq'] if base is not None else 0
+    snapshot = {
+        'seq': payload['seq'],
+        'score': payload.get('score', [0, 0]),
+        'time_left': payload.get('time_left', 0),
+    }
+    for kind in ENTITY_KINDS:
+        base_entities = base[kind] if base is not None else {}
+        snapshot[kind] = apply_entities(base_entities, payload.get(kind, {}), dt, kind in WRAP_KINDS)
+    return snapshot
+
+
+def snapshot_to_state(snapshot):
+    """Снимок в прежнем формате game_state клиента (списки сущностей)."""
+    return {
+        'seq': snapshot['seq'],
+        'ships': list(snapshot['ships'].values()),
+        'asteroids': list(snapshot['asteroids'].values()),
+        'lasers': list(snapshot['lasers'].values()),
+        'score': snapshot['score'],
+        'time_left': snapshot['time_left'],
+    }
+
+
+class DeltaEncoder:
+    """Серверная сторона: история снимков и выбор базы для каждого клиента."""
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, history_size=HISTORY_SIZE):
+        self.keyframe_interval = keyframe_interval
+        self.history_size = history_size
+        self.history = {}
+
+    def record(self, snapshot):
+        """Запоминает снимок как возможную базу будущих дельт."""
+        self.history[snapshot['seq']] = snapshot
+        if len(self.history) > self.history_size:
+            for seq in sorted(self.history)[:len(self.history) - self.history_size]:
+                del self.history[seq]
+
+    def encode(self, snapshot, acked_seq, keyframe_seq):
+        """Полезная нагрузка для клиента с подтверждённым снимком acked_seq.
+
+        keyframe_seq — seq последнего ключевого кадра, отправленного клиенту.
+        Возвращает (payload, is_keyframe).
+        """
+        base = self.history.get(acked_seq) if acked_seq is not None else None
+        if keyframe_seq is None or snapshot['seq'] - keyframe_seq >= self.keyframe_interval:
+            base = None
+        return make_delta(base, snapshot), base is None
+
+
+class SnapshotApplier:
+    """Клиентская сторона: хранит применённые снимки и собирает новые из дельт."""
+
+    def __init__(self, history_size=64):
+        self.history_size = history_size
+        self.history = {}
+        self.latest = None
+
+    def apply(self, payload):
+        """Применяет update_state. Возвращает снимок или None, если базы нет."""
+        base_seq = payload.get('base')
+        base = None
+        if base_seq is not None:
+            base = self.history.get(base_seq)
+            if base is None:
+                return None
+        snapshot = apply_delta(base, payload)
+        self.history[snapshot['seq']] = snapshot
+        if len(self.history) > self.history_size:
+            for seq in sorted(self.history)[:len(self.history) - self.history_size]:
+                del self.history[seq]
+        if self.latest is None or snapshot['seq'] >= self.latest['seq']:
+            self.latest = snapshot
+        return snapshot
+
+
+class LatestState:
+    """Двойной буфер между потоком приёма и отрисовкой.
+
+    Поток приёма кладёт готовое состояние в задний слот и под замком меняет
+    слоты местами; цикл отрисовки забирает передний слот, если он новый.
+    Отрисовка никогда не видит наполовину обновлённое состояние, а
+    состояния, которые она не успела забрать, просто заменяются свежими.
+
+    Счётчики в stats: published, taken, overwritten (не дошли до отрисовки).
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.front = None
+        self.back = None
+        self.fresh = False
+        self.stats = {'published': 0, 'taken': 0, 'overwritten': 0}
+
+    def publish(self, state):
+        self.back = state
+        with self.lock:
+            if self.fresh:
+                self.stats['overwritten'] += 1
+            self.front, self.back = self.back, self.front
+            self.fresh = True
+            self.stats['published'] += 1
+
+    def take(self):
+        """Новое состояние или None, если с прошлого вызова ничего не пришло."""
+        with self.lock:
+            if not self.fresh:
+                return None
+            self.fresh = False
+            self.stats['taken'] += 1
+            return self.front
+
+    def clear(self):
+        with self.lock:
+            self.front = self.back = None
+            self.fresh = False
@@ -0,0 +1,95 @@
+# spatialhash.py
+import math
+from settings import WIDTH, HEIGHT
+
+
+def torus_delta(d, size):
+    """Кратчайшая разница координат на замкнутом (тороидальном) поле."""
+    return (d + size / 2) % size - size / 2
+
+
+class SpatialHash:
+    """Равномерная сетка (broadphase) для поиска столкновений на торе.
+
+    Поле замкнуто как в asteroid.py / ship.py: объект у правого края соседствует
+    с объектами у левого. Каждый объект кладётся в ячейку своего центра,
+    а запрос просматривает все ячейки в радиусе (radius + max_radius),
+    переходя через края поля. До точной проверки кругов доходят только
+    кандидаты из соседних ячеек.
+
+    Сетка перестраивается каждый тик через rebuild(); индексы объектов —
+    те же, что у менеджера, из которого взяты позиции.
+    """
+
+    def __init__(self, cell_size=100, width=WIDTH, height=HEIGHT):
+        self.width = width
+        self.height = height
+        # Подгоняем размер ячеек так, чтобы сетка ровно делила поле — иначе шов тора "поедет"
+        self.cols = max(1, int(width // cell_size))
+        self.rows = max(1, int(height // cell_size))
+        self.cell_w = width / self.cols
+        self.cell_h = height / self.rows
+        self.cells = {}
+        self.xs = []
+        self.ys = []
+        self.radii = []
+        self.max_radius = 0
+
+    def rebuild(self, positions, radii):
+        """Перестраивает сетку по позициям [(x, y), ...] и радиусам объектов.
+
+        Принимает как списки, так и массивы numpy (см. get_bulk у менеджеров).
+        """
+        if hasattr(positions, 'tolist'):
+            positions = positions.tolist()
+        if hasattr(radii, 'tolist'):
+            radii = radii.tolist()
+        self.xs = [p[0] for p in positions]
+        self.ys = [p[1] for p in positions]
+        self.radii = radii
+        self.max_radius = max(radii, default=0)
+
+        cells = {}
+        cols, rows = self.cols, self.rows
+        cw, ch = self.cell_w, self.cell_h
+        for i, (x, y) in enumerate(zip(self.xs, self.ys)):
+            key = (int(x // cw) % cols, int(y // ch) % rows)
+            bucket = cells.get(key)
+            if bucket is None:
+                cells[key] = [i]
+            else:
+                bucket.append(i)
+        self.cells = cells
+
+    def _cell_range(self, lo, hi, cell, count):
+        """Номера ячеек по одной оси, покрывающие отрезок [lo, hi], с переходом через край."""
+        first = math.floor(lo / cell)
+        last = math.floor(hi / cell)
+        if last - first + 1 >= count:
+            return range(count)
+        return [c % count for c in range(first, last + 1)]
+
+    def candidates(self, x, y, radius):
+        """Индексы объектов из ячеек, которые может задеть круг (x, y, radius)."""
+        reach = radius + self.max_radius
+        result = []
+        cells = self.cells
+        for cx in self._cell_range(x - reach, x + reach, self.cell_w, self.cols):
+            for cy in self._cell_range(y - reach, y + reach, self.cell_h, self.rows):
+                bucket = cells.get((cx, cy))
+                if bucket:
+                    result.extend(bucket)
+        return result
+
+    def query_circle(self, x, y, radius):
+        """Индексы объектов, круги которых пересекаются с (x, y, radius) с учётом тора."""
+        hits = []
+        w, h = self.width, self.height
+        for i in self.candidates(x, y, radius):
+            dx = torus_delta(self.xs[i] - x, w)
+            dy = torus_delta(self.ys[i] - y, h)
+            reach = radius + self.radii[i]
+            if dx * dx + dy * dy < reach * reach:
+                hits.append(i)
+        hits.sort()
+        return hits
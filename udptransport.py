@@ -0,0 +1,299 @@
+# udptransport.py
+# Необязательный UDP-канал для ненадёжного трафика (снимки, кадры ввода, ack снимков).
+#
+# Клиент просит UDP в hello ("udp": true); сервер отвечает в hello_ack
+# "udp": {"port": 12355, "token": 123456789}. Дальше клиент шлёт на этот порт
+# датаграммы с токеном, пока не получит ответную, — после этого снимки идут по UDP,
+# а ввод и ack клиент шлёт тоже по UDP. Всё остальное (hello, game_over, restart,
+# ping/pong) остаётся на TCP. Если UDP не проходит, обе стороны продолжают работать по TCP.
+#
+# Датаграмма = заголовок HEADER (token, seq, ack, ack_bits) + сообщения в кодеке соединения
+# (подряд, как в TCP-потоке). ack — старший принятый seq собеседника, бит i в ack_bits —
+# принят ли seq ack-1-i. Кадры ввода (redundant=True) повторяются в следующих датаграммах,
+# пока одну из них не подтвердят, но не больше REDUNDANCY раз. Снимкам повтор не нужен:
+# дельта строится к подтверждённому клиентом снимку, и следующий снимок покрывает потерянный.
+import heapq
+import random
+import struct
+import threading
+import time
+from collections import deque
+
+HEADER = struct.Struct('!IIII')  # token, seq, ack, ack_bits
+ACK_WINDOW = 32  # Столько прошлых датаграмм подтверждает ack_bits
+REDUNDANCY = 3  # Сколько раз повторяем кадры ввода в следующих датаграммах
+MAX_DATAGRAM = 1200  # Байт: больше не шлём (фрагментация), такое сообщение уйдёт по TCP
+PROBE_INTERVAL = 0.2  # Секунд между пробными датаграммами клиента, пока UDP не подтверждён
+UDP_ACTIONS = ('input', 'ack')  # Что сервер принимает по UDP; остальное — только по TCP
+
+
+class UdpChannel:
+    """Одна сторона UDP-канала: номера датаграмм, подтверждения и повтор ввода.
+
+    sendto(data, addr) — функция отправки (сокета или NetSim). addr у сервера
+    становится известен с первой датаграммой клиента.
+
+    Счётчики в stats: sent, received, bytes_sent, bytes_received, acked, lost,
+    duplicates, stale (старше окна ACK_WINDOW), redundant (повторных копий
+    ввода), oversize (не влезло в MAX_DATAGRAM).
+    """
+
+    def __init__(self, sendto, token, codec, addr=None):
+        self.sendto = sendto
+        self.token = token
+        self.codec = codec
+        self.addr = addr
+        self.lock = threading.Lock()  # Шлют и цикл игры/тика, и потоки приёма
+        self.seq = 0  # Номер последней отправленной датаграммы
+        self.remote_seq = None  # Старший принятый номер собеседника
+        self.remote_bits = 0  # Какие из ACK_WINDOW предыдущих номеров приняты
+        self.unacked = {}  # seq -> время отправки
+        self.redundant = deque()  # [данные, номера датаграмм с ними, сколько раз отправлены]
+        self.offer = None  # {'port', 'token'} для hello_ack (на сервере)
+        self.owner = None  # (room, slot_id) на сервере
+        self.conn = None  # TCP-соединение слота на сервере
+        self.on_close = None
+        self.stats = {
+            'sent': 0,
+            'received': 0,
+            'bytes_sent': 0,
+            'bytes_received': 0,
+            'acked': 0,
+            'lost': 0,
+            'duplicates': 0,
+            'stale': 0,
+            'redundant': 0,
+            'oversize': 0,
+        }
+
+    @property
+    def confirmed(self):
+        """Собеседник подтвердил хотя бы одну нашу датаграмму — UDP проходит в обе стороны."""
+        return self.stats['acked'] > 0
+
+    def send(self, data=b'', redundant=False):
+        """Отправляет датаграмму с data (и неподтверждёнными кадрами ввода).
+
+        Возвращает False, если адреса ещё нет или data не влезает в датаграмму.
+        """
+        with self.lock:
+            if self.addr is None:
+                return False
+            stats = self.stats
+            if HEADER.size + len(data) > MAX_DATAGRAM:
+                stats['oversize'] += 1
+                return False
+            self.seq += 1
+            # Повторы ввода — самые старые первыми; что не влезло, уже не повторяем
+            room = MAX_DATAGRAM - HEADER.size - len(data)
+            while sum(len(entry[0]) for entry in self.redundant) > room:
+                self.redundant.popleft()
+            parts = []
+            for entry in self.redundant:
+                parts.append(entry[0])
+                entry[1].add(self.seq)
+                entry[2] += 1
+                stats['redundant'] += 1
+            parts.append(data)
+            if redundant:
+                self.redundant.append([data, {self.seq}, 1])
+            while self.redundant and self.redundant[0][2] > REDUNDANCY:
+                self.redundant.popleft()
+
+            packet = HEADER.pack(self.token, self.seq, self.remote_seq or 0, self.remote_bits) + b''.join(parts)
+            self.unacked[self.seq] = time.monotonic()
+            stats['sent'] += 1
+            stats['bytes_sent'] += len(packet)
+        try:
+            self.sendto(packet, self.addr)
+        except OSError as e:
+            print(f"[UDP] sendto error: {e}")
+        return True
+
+    def receive(self, packet, addr=None):
+        """Разбирает датаграмму. Возвращает тело (байты сообщений) или None, если её надо выбросить."""
+        if len(packet) < HEADER.size:
+            return None
+        token, seq, ack, ack_bits = HEADER.unpack_from(packet)
+        if token != self.token:
+            return None
+        with self.lock:
+            stats = self.stats
+            if not self.track_remote(seq):
+                return None
+            if addr is not None:
+                self.addr = addr  # Первая датаграмма (или смена адреса за NAT)
+            self.process_acks(ack, ack_bits)
+            stats['received'] += 1
+            stats['bytes_received'] += len(packet)
+        return packet[HEADER.size:]
+
+    def track_remote(self, seq):
+        """Отмечает принятый номер собеседника; False — повтор или слишком старая датаграмма."""
+        if self.remote_seq is None or seq > self.remote_seq:
+            if self.remote_seq is not None:
+                shift = seq - self.remote_seq
+                self.remote_bits = ((self.remote_bits << shift) | (1 << (shift - 1))) & 0xFFFFFFFF
+            self.remote_seq = seq
+            return True
+        back = self.remote_seq - seq
+        if back == 0 or (back <= ACK_WINDOW and self.remote_bits & (1 << (back - 1))):
+            self.stats['duplicates'] += 1
+            return False
+        if back > ACK_WINDOW:
+            self.stats['stale'] += 1
+            return False
+        self.remote_bits |= 1 << (back - 1)
+        return True
+
+    def process_acks(self, ack, ack_bits):
+        """Разбирает подтверждения собеседника: снимает подтверждённое с повтора, считает потери."""
+        if not ack:
+            return
+        stats = self.stats
+        for seq in list(self.unacked):
+            back = ack - seq
+            if back == 0 or (0 < back <= ACK_WINDOW and ack_bits & (1 << (back - 1))):
+                del self.unacked[seq]
+                stats['acked'] += 1
+                self.redundant = deque(entry for entry in self.redundant if seq not in entry[1])
+            elif back > ACK_WINDOW:
+                del self.unacked[seq]
+                stats['lost'] += 1
+
+    def close(self):
+        if self.on_close is not None:
+            self.on_close(self)
+
+
+class UdpEndpoint:
+    """Серверная сторона: UDP-сокет на порту сервера и каналы слотов по токенам.
+
+    on_message(channel, msg) вызывается для каждого сообщения из UDP_ACTIONS.
+    Транспорт подключается через attach(sendto) (поток с recvfrom в serverTCP,
+    датаграммный протокол asyncio в aioserver); датаграммы передаются в handle_datagram().
+
+    Счётчики в stats: datagrams, unknown_token, rejected (не из UDP_ACTIONS), bad.
+    """
+
+    def __init__(self, on_message, port, netsim=None):
+        self.on_message = on_message
+        self.port = port
+        self.netsim = netsim
+        self.sendto = None
+        self.channels = {}  # token -> UdpChannel
+        self.lock = threading.Lock()
+        self.stats = {'datagrams': 0, 'unknown_token': 0, 'rejected': 0, 'bad': 0}
+
+    @property
+    def ready(self):
+        return self.sendto is not None
+
+    def attach(self, sendto):
+        self.sendto = self.netsim.wrap(sendto) if self.netsim is not None else sendto
+
+    def open(self, conn, codec):
+        """Новый канал для TCP-соединения conn; его offer уходит клиенту в hello_ack."""
+        with self.lock:
+            token = random.getrandbits(32)
+            while token in self.channels or not token:
+                token = random.getrandbits(32)
+            channel = UdpChannel(self.sendto, token, codec)
+            channel.conn = conn
+            channel.offer = {'port': self.port, 'token': token}
+            channel.on_close = self.remove
+            self.channels[token] = channel
+        return channel
+
+    def remove(self, channel):
+        with self.lock:
+            self.channels.pop(channel.token, None)
+
+    def handle_datagram(self, data, addr):
+        self.stats['datagrams'] += 1
+        if len(data) < HEADER.size:
+            self.stats['bad'] += 1
+            return
+        channel = self.channels.get(HEADER.unpack_from(data)[0])
+        if channel is None or channel.owner is None:
+            self.stats['unknown_token'] += 1
+            return
+        body = channel.receive(data, addr)
+        if body is None:
+            return
+        if not channel.confirmed:
+            # Отвечаем на пробу: клиент узнает, что UDP проходит, и подтвердит нас
+            channel.send()
+        if not body:
+            return
+        try:
+            messages = channel.codec.decoder().feed(body)
+        except Exception as e:
+            print(f"[UDP] Bad datagram from {addr}: {e}")
+            self.stats['bad'] += 1
+            return
+        for msg in messages:
+            if not isinstance(msg, dict):
+                self.stats['bad'] += 1
+            elif msg.get('action') in UDP_ACTIONS:
+                try:
+                    self.on_message(channel, msg)
+                except Exception as e:
+                    # Поток приёма один на все комнаты — ошибка одного сообщения не должна его ронять
+                    print(f"[UDP] Error handling {msg.get('action')} from {addr}: {e}")
+                    self.stats['bad'] += 1
+            else:
+                self.stats['rejected'] += 1
+
+
+class NetSim:
+    """Имитатор плохой сети для проверки на loopback: теряет и задерживает датаграммы.
+
+    loss — доля потерянных датаграмм, latency — задержка в одну сторону (сек),
+    jitter — случайная добавка к задержке (из-за неё датаграммы и переставляются).
+    Подключается обёрткой функции отправки: sendto = NetSim(...).wrap(sock.sendto).
+
+    Счётчики в stats: sent, dropped, delivered.
+    """
+
+    def __init__(self, loss=0.0, latency=0.0, jitter=0.0, seed=None):
+        self.loss = loss
+        self.latency = latency
+        self.jitter = jitter
+        self.rng = random.Random(seed)
+        self.target = None
+        self.queue = []  # (время доставки, номер, data, addr)
+        self.counter = 0
+        self.cond = threading.Condition()
+        self.thread = None
+        self.stats = {'sent': 0, 'dropped': 0, 'delivered': 0}
+
+    def wrap(self, sendto):
+        self.target = sendto
+        return self.sendto
+
+    def sendto(self, data, addr):
+        self.stats['sent'] += 1
+        if self.rng.random() < self.loss:
+            self.stats['dropped'] += 1
+            return
+        delay = self.latency + self.rng.uniform(0, self.jitter)
+        with self.cond:
+            self.counter += 1
+            heapq.heappush(self.queue, (time.monotonic() + delay, self.counter, data, addr))
+            if self.thread is None:
+                self.thread = threading.Thread(target=self.deliver_loop, daemon=True)
+                self.thread.start()
+            self.cond.notify()
+
+    def deliver_loop(self):
+        while True:
+            with self.cond:
+                while not self.queue or self.queue[0][0] > time.monotonic():
+                    self.cond.wait(self.queue[0][0] - time.monotonic() if self.queue else None)
+                _, _, data, addr = heapq.heappop(self.queue)
+            try:
+                self.target(data, addr)
+                self.stats['delivered'] += 1
+            except OSError as e:
+                print(f"[UDP] NetSim delivery error: {e}")
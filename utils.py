@@ -1,21 +1,8 @@
 # utils.py
 import pygame
 
-WIDTH = 800
-HEIGHT = 600
-
-BLACK = (0, 0, 0)
-WHITE = (255, 255, 255)
-GREY = (101, 101, 101)
-RED = (235, 15, 15)
-ORANGE = (237, 118, 14)
-BLUE = (15, 15, 235)
-YELLOW = (255, 255, 0)
-
-FPS = 60
+# Константы живут в settings.py (без pygame, для сервера); здесь — клиентские объекты
+from settings import (WIDTH, HEIGHT, BLACK, WHITE, GREY, RED, ORANGE, BLUE, YELLOW,
+                      FPS, MAX_ASTEROIDS, GAME_TIME)
 
 clock = pygame.time.Clock()
-
-# Параметры астероидов и игры
-MAX_ASTEROIDS = 10
-GAME_TIME = 10
\ No newline at end of file